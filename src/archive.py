@@ -0,0 +1,491 @@
+"""
+Compact raw logs into a columnar archive, and query it by session, time and pressure.
+
+    python src/archive.py compact logs/archive/Low-Voltage logs/Low-Voltage/raw_readings.bin
+    python src/archive.py sessions logs/archive/Low-Voltage
+    python src/archive.py query logs/archive/Low-Voltage --pt 3 --pressure 500 --last-sessions 20
+
+An archive holds the raw samples of one board. Compaction reads binary raw logs, or the
+csv raw logs of older versions, and appends whatever was logged since the last compaction.
+Compacting a log compacts its rotated segments first, oldest first. Segments are recognized
+by their first bytes, so what was compacted before it was rotated (and compressed) is skipped.
+A new session starts whenever the log goes quiet for longer than the session gap. Samples
+are stored in chunks of one session, one .npy file per column (timestamp, pressure and every
+PT), and the index lists every run of samples at one pressure with its chunk, session, rows
+and time range. Queries pick the runs from the index and memory map only the columns of the
+chunks that hold them, so a query never reads the rest of the archive.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Iterator
+
+import numpy as np
+
+from logger.binary_log import HEADER_SIZE, open_log
+from logger.log_rotation import segments
+from logger.raw_log_reader import DEFAULT_CHUNK_SIZE, RawLogReader
+from replay import parse_time
+
+ARCHIVE_FILENAME = "archive.json"
+INDEX_FILENAME = "index.npy"
+CHUNKS_DIR = "chunks"
+# a pause in logging longer than this starts a new session
+DEFAULT_SESSION_GAP = 30 * 60
+# rows of a chunk, so a long session is still split into files of a few tens of MB
+ROWS_PER_CHUNK = 1_000_000
+# logs are told apart by their first bytes rather than by their path, so a log that was
+# rotated, and maybe compressed, since it was compacted is still recognized
+FINGERPRINT_BYTES = 64
+
+# one entry per run of samples at one pressure: rows [start, stop) of the chunk
+INDEX_DTYPE = np.dtype(
+    [
+        ("chunk", "<i4"),
+        ("session", "<i4"),
+        ("pressure", "<f4"),
+        ("start", "<i8"),
+        ("stop", "<i8"),
+        ("first_timestamp", "<f8"),
+        ("last_timestamp", "<f8"),
+    ]
+)
+
+
+def _pt_filename(pt: int) -> str:
+    return f"pt_{pt}.npy"
+
+
+def _save_atomically(path: str, save) -> None:
+    """write to a temporary file and move it into place, so a crash leaves the old file"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        save(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def _fingerprint(path: str, binary: bool) -> str:
+    """the first bytes of the records or lines of a log"""
+    with open_log(path) as file:
+        file.seek(HEADER_SIZE if binary else 0)
+        return file.read(FINGERPRINT_BYTES).hex()
+
+
+class LogArchive:
+    """A columnar archive of the raw samples of one board"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.metadata: dict = {
+            "board": None,
+            "num_sensors": None,
+            "session_gap": DEFAULT_SESSION_GAP,
+            "sessions": 0,
+            "chunks": 0,
+            "last_timestamp": None,
+            "sources": {},
+        }
+        self.index = np.empty(0, dtype=INDEX_DTYPE)
+
+        if os.path.exists(os.path.join(directory, ARCHIVE_FILENAME)):
+            with open(os.path.join(directory, ARCHIVE_FILENAME)) as file:
+                self.metadata.update(json.load(file))
+            self.index = np.load(os.path.join(directory, INDEX_FILENAME))
+
+        self._pending: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending_session: int | None = None
+        self._new_entries: list[np.ndarray] = []
+
+    @property
+    def num_sensors(self) -> int | None:
+        return self.metadata["num_sensors"]
+
+    def chunk_dir(self, chunk: int) -> str:
+        return os.path.join(self.directory, CHUNKS_DIR, f"{chunk:06d}")
+
+    def compact(
+        self,
+        path: str,
+        board: str | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> int:
+        """append the samples logged to `path` since its last compaction, returns how many"""
+        reader = RawLogReader(path, chunk_size=chunk_size)
+        fingerprint = _fingerprint(path, reader.binary)
+        # a log that was shorter the last time has a shorter fingerprint
+        key = next(
+            (
+                key
+                for key in self.metadata["sources"]
+                if key and fingerprint.startswith(key)
+            ),
+            fingerprint,
+        )
+        source = self.metadata["sources"].pop(key, None)
+        if source:
+            reader.position = source["position"]
+
+        added = 0
+        for timestamps, pressures, values in reader.chunks():
+            if added == 0:
+                self._check_source(path, board or reader.board_name, values.shape[1])
+            added += self._append(timestamps, pressures, values)
+
+        self._flush()
+        if fingerprint:
+            self.metadata["sources"][fingerprint] = {
+                "path": path,
+                "position": reader.position,
+                "skipped_rows": reader.skipped_rows
+                + (source["skipped_rows"] if source else 0),
+            }
+        return added
+
+    def _check_source(self, path: str, board: str | None, num_sensors: int) -> None:
+        if self.metadata["board"] is None:
+            self.metadata["board"] = board
+        elif board is not None and board != self.metadata["board"]:
+            raise ValueError(
+                f"{path} is a log of {board}, but the archive holds {self.metadata['board']}"
+            )
+
+        if self.num_sensors is None:
+            self.metadata["num_sensors"] = num_sensors
+        elif num_sensors != self.num_sensors:
+            raise ValueError(
+                f"{path} has {num_sensors} PTs, but the archive holds {self.num_sensors}"
+            )
+
+    def _append(
+        self, timestamps: np.ndarray, pressures: np.ndarray, values: np.ndarray
+    ) -> int:
+        keep = np.isfinite(timestamps)
+        timestamps, pressures, values = timestamps[keep], pressures[keep], values[keep]
+        if len(timestamps) == 0:
+            return 0
+
+        # a long pause, or the clock going backwards, starts a new session
+        last_timestamp = self.metadata["last_timestamp"]
+        gaps = np.diff(
+            timestamps,
+            prepend=timestamps[0] if last_timestamp is None else last_timestamp,
+        )
+        new_session = (gaps > self.metadata["session_gap"]) | (gaps < 0)
+        if last_timestamp is None:
+            new_session[0] = True
+        sessions = self.metadata["sessions"] - 1 + np.cumsum(new_session)
+        self.metadata["sessions"] = int(sessions[-1]) + 1
+        self.metadata["last_timestamp"] = float(timestamps[-1])
+
+        boundaries = np.flatnonzero(new_session)
+        for start, stop in zip(
+            np.r_[0, boundaries], np.r_[boundaries, len(timestamps)]
+        ):
+            if start == stop:
+                continue
+
+            session = int(sessions[start])
+            if self._pending_session != session:
+                self._flush()
+                self._pending_session = session
+            self._pending.append(
+                (timestamps[start:stop], pressures[start:stop], values[start:stop])
+            )
+            if sum(len(part[0]) for part in self._pending) >= ROWS_PER_CHUNK:
+                self._flush(full_chunks_only=True)
+
+        return len(timestamps)
+
+    def _flush(self, full_chunks_only: bool = False) -> None:
+        """write the pending samples of the session as chunks, and keep the rest
+        pending when only full chunks should be written"""
+        if not self._pending:
+            return
+
+        timestamps = np.concatenate([part[0] for part in self._pending])
+        pressures = np.concatenate([part[1] for part in self._pending])
+        values = np.concatenate([part[2] for part in self._pending])
+        written = (
+            len(timestamps) // ROWS_PER_CHUNK * ROWS_PER_CHUNK
+            if full_chunks_only
+            else len(timestamps)
+        )
+        self._pending = (
+            [(timestamps[written:], pressures[written:], values[written:])]
+            if written < len(timestamps)
+            else []
+        )
+
+        for start in range(0, written, ROWS_PER_CHUNK):
+            stop = min(start + ROWS_PER_CHUNK, written)
+            self._write_chunk(
+                self._pending_session,
+                timestamps[start:stop],
+                pressures[start:stop],
+                values[start:stop],
+            )
+
+    def _write_chunk(
+        self,
+        session: int,
+        timestamps: np.ndarray,
+        pressures: np.ndarray,
+        values: np.ndarray,
+    ) -> None:
+        chunk = self.metadata["chunks"]
+        directory = self.chunk_dir(chunk)
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "timestamp.npy"), timestamps.astype("<f8"))
+        np.save(os.path.join(directory, "pressure.npy"), pressures.astype("<f4"))
+        for pt in range(values.shape[1]):
+            np.save(
+                os.path.join(directory, _pt_filename(pt)),
+                np.ascontiguousarray(values[:, pt], dtype="<f4"),
+            )
+
+        # every run of rows at one pressure gets an entry
+        pressures = pressures.astype(np.float32)
+        starts = np.flatnonzero(np.r_[True, pressures[1:] != pressures[:-1]])
+        stops = np.r_[starts[1:], len(pressures)]
+        entries = np.empty(len(starts), dtype=INDEX_DTYPE)
+        entries["chunk"] = chunk
+        entries["session"] = session
+        entries["pressure"] = pressures[starts]
+        entries["start"] = starts
+        entries["stop"] = stops
+        entries["first_timestamp"] = timestamps[starts]
+        entries["last_timestamp"] = timestamps[stops - 1]
+        self._new_entries.append(entries)
+        self.metadata["chunks"] = chunk + 1
+
+    def save(self) -> None:
+        """publish the compacted chunks: until then, a query does not see them"""
+        self._flush()
+        self.index = np.concatenate([self.index, *self._new_entries])
+        self._new_entries = []
+
+        os.makedirs(self.directory, exist_ok=True)
+        _save_atomically(
+            os.path.join(self.directory, INDEX_FILENAME),
+            lambda file: np.save(file, self.index),
+        )
+        _save_atomically(
+            os.path.join(self.directory, ARCHIVE_FILENAME),
+            lambda file: file.write(json.dumps(self.metadata, indent=2).encode()),
+        )
+
+    def select(
+        self,
+        last_sessions: int | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        pressure: float | None = None,
+    ) -> np.ndarray:
+        """the index entries that hold samples matching every filter"""
+        keep = np.ones(len(self.index), dtype=bool)
+        if last_sessions is not None:
+            sessions = np.unique(self.index["session"])[-last_sessions:]
+            keep &= np.isin(self.index["session"], sessions)
+        if start is not None:
+            keep &= self.index["last_timestamp"] >= start
+        if end is not None:
+            keep &= self.index["first_timestamp"] <= end
+        if pressure is not None:
+            # the logs store float32 pressures, compare at that precision
+            keep &= self.index["pressure"] == np.float32(pressure)
+
+        return self.index[keep]
+
+    def load(
+        self,
+        entries: np.ndarray,
+        pts: list[int] | None = None,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> dict[str, np.ndarray]:
+        """the samples of the entries, reading only their rows of the chunks and the PTs asked for"""
+        pts = list(range(self.num_sensors or 0)) if pts is None else pts
+        for pt in pts:
+            if not 0 <= pt < (self.num_sensors or 0):
+                raise ValueError(f"The archive holds PTs 0 to {self.num_sensors - 1}")
+
+        parts = {"session": [], "timestamp": [], "pressure": [], "values": []}
+        for chunk in np.unique(entries["chunk"]):
+            directory = self.chunk_dir(int(chunk))
+            columns = {
+                name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                for name in ("timestamp", "pressure")
+            }
+            pt_columns = [
+                np.load(os.path.join(directory, _pt_filename(pt)), mmap_mode="r")
+                for pt in pts
+            ]
+
+            for entry in entries[entries["chunk"] == chunk]:
+                first, last = int(entry["start"]), int(entry["stop"])
+                # timestamps never go backwards inside a session, so the rows in range are contiguous
+                timestamps = columns["timestamp"][first:last]
+                if start is not None:
+                    first += int(np.searchsorted(timestamps, start, side="left"))
+                if end is not None:
+                    last = int(entry["start"]) + int(
+                        np.searchsorted(timestamps, end, side="right")
+                    )
+                if first >= last:
+                    continue
+
+                parts["session"].append(np.full(last - first, entry["session"]))
+                parts["timestamp"].append(np.array(columns["timestamp"][first:last]))
+                parts["pressure"].append(np.array(columns["pressure"][first:last]))
+                parts["values"].append(
+                    np.column_stack([column[first:last] for column in pt_columns])
+                    if pt_columns
+                    else np.empty((last - first, 0), dtype=np.float32)
+                )
+
+        if not parts["timestamp"]:
+            return {
+                "session": np.empty(0, dtype=np.int32),
+                "timestamp": np.empty(0),
+                "pressure": np.empty(0, dtype=np.float32),
+                "values": np.empty((0, len(pts)), dtype=np.float32),
+            }
+
+        return {name: np.concatenate(arrays) for name, arrays in parts.items()}
+
+    def sessions(self) -> Iterator[dict]:
+        """the time range, sample count and pressures of every session"""
+        for session in np.unique(self.index["session"]):
+            entries = self.index[self.index["session"] == session]
+            yield {
+                "session": int(session),
+                "first_timestamp": float(entries["first_timestamp"].min()),
+                "last_timestamp": float(entries["last_timestamp"].max()),
+                "samples": int((entries["stop"] - entries["start"]).sum()),
+                "pressures": np.unique(entries["pressure"]).tolist(),
+            }
+
+
+def _format_time(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compact raw logs into a columnar archive, and query it"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = commands.add_parser(
+        "compact", help="append what was logged since the last compaction"
+    )
+    compact_parser.add_argument("archive", help="archive directory of one board")
+    compact_parser.add_argument(
+        "logs",
+        nargs="+",
+        help="binary or csv raw logs of the board, oldest first. Their rotated segments are compacted with them",
+    )
+    compact_parser.add_argument(
+        "--board", help="board of the logs, defaults to the binary logs'"
+    )
+    compact_parser.add_argument(
+        "--session-gap",
+        type=float,
+        help=f"seconds without samples that start a new session, {DEFAULT_SESSION_GAP} by default. "
+        "Only used when the archive is created",
+    )
+    compact_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    sessions_parser = commands.add_parser("sessions", help="list the sessions")
+    sessions_parser.add_argument("archive")
+
+    query_parser = commands.add_parser("query", help="load the samples that match")
+    query_parser.add_argument("archive")
+    query_parser.add_argument(
+        "--pt",
+        type=int,
+        action="append",
+        help="PT to load, can be repeated, all by default",
+    )
+    query_parser.add_argument("--pressure", type=float)
+    query_parser.add_argument("--last-sessions", type=int)
+    query_parser.add_argument("--start", type=parse_time)
+    query_parser.add_argument("--end", type=parse_time)
+    query_parser.add_argument(
+        "--output",
+        help="save the samples as .npz (session, timestamp, pressure, values)",
+    )
+    args = parser.parse_args()
+
+    if args.command != "compact" and not os.path.exists(
+        os.path.join(args.archive, ARCHIVE_FILENAME)
+    ):
+        print(f"{args.archive} is not an archive", file=sys.stderr)
+        return 2
+
+    archive = LogArchive(args.archive)
+
+    if args.command == "compact":
+        if args.session_gap is not None and archive.metadata["chunks"] == 0:
+            archive.metadata["session_gap"] = args.session_gap
+
+        try:
+            for log in args.logs:
+                for path in [*segments(log), log]:
+                    added = archive.compact(
+                        path, board=args.board, chunk_size=args.chunk_size
+                    )
+                    print(f"{path}: {added} new samples")
+        except (OSError, ValueError) as e:
+            print(f"Could not compact: {e}", file=sys.stderr)
+            return 2
+
+        archive.save()
+        print(
+            f"{args.archive}: {archive.metadata['sessions']} sessions in {archive.metadata['chunks']} chunks"
+        )
+
+    elif args.command == "sessions":
+        print(f"{'session':>7}  {'from':<19} - {'to':<19} {'samples':>9}  pressures")
+        for session in archive.sessions():
+            print(
+                f"{session['session']:>7}  {_format_time(session['first_timestamp'])} - "
+                f"{_format_time(session['last_timestamp'])} {session['samples']:>9}  "
+                f"{' '.join(f'{pressure:g}' for pressure in session['pressures'])}"
+            )
+
+    else:
+        entries = archive.select(
+            last_sessions=args.last_sessions,
+            start=args.start,
+            end=args.end,
+            pressure=args.pressure,
+        )
+        try:
+            samples = archive.load(entries, pts=args.pt, start=args.start, end=args.end)
+        except ValueError as e:
+            print(f"Could not query: {e}", file=sys.stderr)
+            return 2
+
+        sessions, counts = np.unique(samples["session"], return_counts=True)
+        print(
+            f"{len(samples['timestamp'])} samples from {len(sessions)} sessions, "
+            f"read from {len(np.unique(entries['chunk']))} chunks"
+        )
+        for session, count in zip(sessions, counts):
+            print(f"  session {session}: {count} samples")
+
+        if args.output:
+            np.savez(args.output, **samples)
+            print(f"Saved to {args.output}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,53 @@
-from threading import Lock
-from typing import Callable, TypedDict, Union
+from typing import TYPE_CHECKING, Callable, NotRequired, TypedDict
 
-from serial import Serial
+# only imported for type checking, the prompts import these types before numpy and pyserial are needed
+if TYPE_CHECKING:
+    import numpy as np
 
-from logger.logger import Logger
+    from logger.logger import Logger
 
 
 class PTConfigs(TypedDict):
     port: str
     pt_count: int
     name: str
-    serial: Serial | None
-    serial_lock: Union[Lock, None]
-    logger: Logger
+    logger: "Logger"
     stop_sequence: bytes
-    decode_fn: Callable[[bytes], list[float]]
+    decode_batch_fn: Callable[[bytes | memoryview], "tuple[np.ndarray, np.ndarray]"]
     expected_payload_length: int
+    # directory of the board's logs, see stand_profiles.log_namespace
+    log_namespace: NotRequired[str]
 
 
 class ConfigFields(TypedDict):
     baud_rate: int
     pt_configs: list[PTConfigs]
     num_readings_per_pt: int
+    target_standard_error: float | None
+    min_readings_per_pt: NotRequired[int]
+    acquisition_backend: NotRequired[str]
+    # where the logs, calibrations and telemetry of the session go, main.LOG_DIR by default
+    log_dir: NotRequired[str]
+
+
+class BoardProfile(TypedDict):
+    name: str
+    pt_count: int
+    # a path, or "auto" (the default) to find it with port discovery
+    port: NotRequired[str]
+    # with an automatic port, only ports whose path contains this are considered
+    port_match: NotRequired[str]
+    # the board's logs go in this directory instead of one named after the board
+    log_namespace: NotRequired[str]
+
+
+class StandProfile(TypedDict):
+    baud_rate: int
+    num_readings_per_pt: int
+    boards: list[BoardProfile]
+    target_standard_error: NotRequired[float | None]
+    min_readings_per_pt: NotRequired[int]
+    # the directory of the logs, the calibration store and the telemetry of the stand
+    log_dir: NotRequired[str]
+    # one of stand_profiles.ACQUISITION_BACKENDS
+    acquisition_backend: NotRequired[str]
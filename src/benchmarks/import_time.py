@@ -0,0 +1,83 @@
+import argparse
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what has to be imported before the first prompt shows up, and how long it may take
+STARTUP_MODULE = "main"
+DEFAULT_BUDGET_MS = 400.0
+# modules that must not be imported by each entry point: the startup of main has to
+# leave the heavy dependencies for after the prompts, and the offline tools must not load any TUI library
+FORBIDDEN_IMPORTS = {
+    "main": ["numpy", "serial", "textual", "cli.cli"],
+    "headless": ["textual", "inquirer", "cli"],
+    "replay": ["textual", "inquirer", "serial", "cli"],
+    "archive": ["textual", "inquirer", "serial", "cli"],
+}
+
+
+def measure(module: str) -> list[tuple[str, int, float, float]]:
+    """(name, depth, self ms, cumulative ms) of every module imported by `import module`,
+    in a fresh interpreter so nothing is cached"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # nesting is shown by 2 spaces of indentation per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(
+            (name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000)
+        )
+
+    return imports
+
+
+def check(module: str, budget_ms: float, top: int) -> bool:
+    imports = measure(module)
+    total_ms = next(ms for name, depth, _, ms in imports if name == module)
+    imported = {name for name, *_ in imports}
+
+    print(f"import {module}: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    largest = sorted(
+        (entry for entry in imports if entry[1] <= 2 and entry[0] != module),
+        key=lambda entry: entry[3],
+        reverse=True,
+    )
+    for name, _, self_ms, cumulative_ms in largest[:top]:
+        print(f"{cumulative_ms:>14.1f} {self_ms:>9.1f}  {name}")
+
+    ok = total_ms <= budget_ms
+    if not ok:
+        print(f"Over budget by {total_ms - budget_ms:.1f} ms")
+
+    for forbidden in FORBIDDEN_IMPORTS.get(module, []):
+        if forbidden in imported:
+            print(f"{forbidden} is imported by {module}, it should be imported lazily")
+            ok = False
+
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the time it takes to import the entry point against a budget"
+    )
+    parser.add_argument("--module", default=STARTUP_MODULE)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="modules to report")
+    args = parser.parse_args()
+
+    sys.exit(0 if check(args.module, args.budget_ms, args.top) else 1)
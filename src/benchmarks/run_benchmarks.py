@@ -0,0 +1,388 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+from cal import cal
+from emulator.board_emulator import BoardEmulator, NoiseModel
+from logger.calibration_store import CalibrationStore
+from logger.log_writer import FlushPolicy, LogWriter
+from logger.logger import Logger
+from serial_reader import protocol
+from serial_reader.acquisition import BoardAcquisition, decode_buffered_frames
+from serial_reader.async_transport import AsyncSerialEngine
+from serial_reader.calibration_reader import CalibrationReader
+from serial_reader.connection_manager import SerialConnectionManager
+from serial_reader.frame_reader import FrameReader
+from serial_reader.process_acquisition import AcquisitionProcessPool
+from serial_reader.ring_buffer import RingBuffer
+
+RESULTS_DIR = "logs/benchmarks"
+NUM_SENSORS = protocol.NUM_VALUES_PER_FRAME
+FRAME_LENGTH = protocol.EXPECTED_PAYLOAD_LENGTH
+# how long the acquisition benchmark waits for a backend to decode its first frame,
+# spawning the worker of the process backend takes a few seconds on a Pi
+FIRST_BATCH_TIMEOUT = 30.0
+
+
+def _best_of(fn: Callable[[], Any], repeats: int) -> float:
+    """fastest wall time of `repeats` runs, the least noisy estimate of the cost"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _frames(num_frames: int) -> bytes:
+    return BoardEmulator(num_sensors=NUM_SENSORS, seed=0).generate(num_frames)
+
+
+def bench_decode(num_frames: int, repeats: int) -> dict:
+    """µs per frame of the per frame decode_fn and of the batch decoder"""
+    data = _frames(num_frames)
+    view = memoryview(data)
+
+    def per_frame():
+        for start in range(0, len(data), FRAME_LENGTH):
+            protocol.decode_fn(view[start : start + FRAME_LENGTH])
+
+    def batch():
+        protocol.decode_batch_fn(data)
+
+    return {
+        "frames": num_frames,
+        "decode_fn_us_per_frame": _best_of(per_frame, repeats) / num_frames * 1e6,
+        "decode_batch_fn_us_per_frame": _best_of(batch, repeats) / num_frames * 1e6,
+    }
+
+
+def bench_framing(num_frames: int, repeats: int) -> dict:
+    """frames/s of framing, decoding and storing into the ring, without any OS in the way"""
+    data = _frames(num_frames)
+
+    def run():
+        stream = io.BytesIO(data)
+        frame_reader = FrameReader(FRAME_LENGTH, protocol.CONTROL_CHARACTERS)
+        ring = RingBuffer(capacity=8192, width=NUM_SENSORS)
+        while frame_reader.fill(stream):
+            decode_buffered_frames(
+                frame_reader, protocol.decode_batch_fn, NUM_SENSORS, ring, 0.0
+            )
+
+    return {
+        "frames": num_frames,
+        "frames_per_second": num_frames / _best_of(run, repeats),
+    }
+
+
+def _count_frames(ring: RingBuffer, seconds: float) -> tuple[int, float]:
+    """frames decoded into the ring during `seconds`, and the time it took, from the first batch on.
+    Starting the backend is not counted, it is a one off cost"""
+    ring.wait_for(0, 1, timeout=FIRST_BATCH_TIMEOUT)
+    cursor = ring.cursor()
+    start = time.perf_counter()
+    time.sleep(seconds)
+    return ring.cursor() - cursor, time.perf_counter() - start
+
+
+def _acquire_for(backend: str, seconds: float) -> dict:
+    with BoardEmulator(num_sensors=NUM_SENSORS, frame_rate=None, seed=0) as emulator:
+        connection_manager = SerialConnectionManager(baudrate=115200)
+        connection_manager.register(emulator.port)
+        # the process backend's worker opens the port itself
+        if backend != "process":
+            connection_manager.open_all()
+
+        async def run_async() -> tuple[int, float]:
+            engine = AsyncSerialEngine(connection_manager)
+            board = engine.add_board(
+                emulator.port,
+                NUM_SENSORS,
+                protocol.decode_batch_fn,
+                protocol.CONTROL_CHARACTERS,
+                FRAME_LENGTH,
+            )
+            board.start()
+            emulator.start()
+            await board.wait_for(0, 1, timeout=FIRST_BATCH_TIMEOUT)
+            cursor = board.ring.cursor()
+            start = time.perf_counter()
+            await asyncio.sleep(seconds)
+            board.stop()
+            return board.ring.cursor() - cursor, time.perf_counter() - start
+
+        try:
+            if backend == "async":
+                received, elapsed = asyncio.run(run_async())
+            elif backend == "process":
+                pool = AcquisitionProcessPool(baudrate=115200)
+                board = pool.add_board(
+                    emulator.port,
+                    NUM_SENSORS,
+                    protocol.decode_batch_fn,
+                    protocol.CONTROL_CHARACTERS,
+                    FRAME_LENGTH,
+                )
+                pool.start()
+                emulator.start()
+                received, elapsed = _count_frames(board.ring, seconds)
+                pool.stop(timeout=1)
+            else:
+                acquisition = BoardAcquisition(
+                    emulator.port,
+                    connection_manager,
+                    NUM_SENSORS,
+                    protocol.decode_batch_fn,
+                    protocol.CONTROL_CHARACTERS,
+                    FRAME_LENGTH,
+                )
+                acquisition.start()
+                emulator.start()
+                received, elapsed = _count_frames(acquisition.ring, seconds)
+                acquisition.stop(timeout=1)
+        finally:
+            emulator.stop()
+            connection_manager.close_all()
+
+        return {
+            "frames_received": received,
+            "frames_per_second": received / elapsed,
+            "bytes_overrun": emulator.bytes_overrun,
+        }
+
+
+def bench_acquisition(seconds: float) -> dict:
+    """frames/s through an unthrottled emulated board, for every acquisition backend"""
+    if os.name != "posix":
+        return {"skipped": "needs a pseudo-terminal"}
+
+    return {
+        backend: _acquire_for(backend, seconds)
+        for backend in ("thread", "async", "process")
+        if backend != "async" or AsyncSerialEngine.is_supported()
+    }
+
+
+def bench_logging(num_records: int, block_size: int) -> dict:
+    """bytes/s of raw records through the log writer, including the final fsync"""
+    rng = np.random.default_rng(0)
+    values = rng.random((block_size, NUM_SENSORS), dtype=np.float32)
+    timestamps = time.monotonic() + np.arange(block_size) * 1e-3
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer = LogWriter(flush_policy=FlushPolicy(fsync_on_boundary=True))
+        store = CalibrationStore(os.path.join(directory, "cals.sqlite3"))
+        logger = Logger(
+            os.path.join(directory, "raw.bin"),
+            os.path.join(directory, "avg.csv"),
+            store,
+            NUM_SENSORS,
+            "benchmark",
+            writer,
+        )
+
+        start = time.perf_counter()
+        for _ in range(num_records // block_size):
+            logger.log_raw_data(0.0, values, timestamps)
+        submitted = time.perf_counter() - start
+        logger.mark_pressure_point_boundary()
+        writer.sync()
+        elapsed = time.perf_counter() - start
+
+        stats = writer.stats()
+        logger.close()
+        writer.close()
+        store.close()
+
+    return {
+        "records": num_records // block_size * block_size,
+        "bytes": stats["written_bytes"],
+        "bytes_per_second": stats["written_bytes"] / elapsed,
+        "submit_us_per_block": submitted / (num_records // block_size) * 1e6,
+        "full_queue_waits": stats["full_queue_waits"],
+    }
+
+
+def bench_fit(
+    sensor_counts: list[int], point_counts: list[int], repeats: int
+) -> list[dict]:
+    """fit time vs sensor count and number of pressure points, batched and one sensor at a time"""
+    rng = np.random.default_rng(0)
+    results = []
+    for num_sensors in sensor_counts:
+        for num_points in point_counts:
+            pressures = np.linspace(0, 1000, num_points)
+            readings = pressures[:, None] / 100 + rng.normal(
+                0, 1e-3, (num_points, num_sensors)
+            )
+
+            def batched():
+                cal.calculate_linear_regressions(readings, pressures)
+
+            def per_sensor():
+                for pt in range(num_sensors):
+                    cal.calculate_linear_regression(readings[:, pt], pressures)
+
+            results.append(
+                {
+                    "sensors": num_sensors,
+                    "points": num_points,
+                    "batched_seconds": _best_of(batched, repeats),
+                    "per_sensor_seconds": _best_of(per_sensor, repeats),
+                }
+            )
+
+    return results
+
+
+def bench_pressure_point(
+    num_readings: int, frame_rate: float | None, num_points: int
+) -> dict:
+    """end to end seconds per pressure point: collecting, logging, averaging"""
+    if os.name != "posix":
+        return {"skipped": "needs a pseudo-terminal"}
+
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        BoardEmulator(
+            num_sensors=NUM_SENSORS,
+            frame_rate=frame_rate,
+            noise=NoiseModel(std=1e-3),
+            seed=0,
+        ) as emulator,
+    ):
+        connection_manager = SerialConnectionManager(baudrate=115200)
+        connection_manager.register(emulator.port)
+        connection_manager.open_all()
+        writer = LogWriter()
+        store = CalibrationStore(os.path.join(directory, "cals.sqlite3"))
+        logger = Logger(
+            os.path.join(directory, "raw.bin"),
+            os.path.join(directory, "avg.csv"),
+            store,
+            NUM_SENSORS,
+            "benchmark",
+            writer,
+        )
+        acquisition = BoardAcquisition(
+            emulator.port,
+            connection_manager,
+            NUM_SENSORS,
+            protocol.decode_batch_fn,
+            protocol.CONTROL_CHARACTERS,
+            FRAME_LENGTH,
+        )
+        reader = CalibrationReader(
+            acquisition, NUM_SENSORS, "benchmark", logger, num_readings
+        )
+
+        acquisition.start()
+        emulator.start()
+        durations = []
+        try:
+            for point in range(num_points):
+                pressure = 100.0 * point
+                emulator.set_pressure(pressure)
+
+                start = time.perf_counter()
+                reader.start_pressure_point()
+                while not reader.pressure_point_complete():
+                    reader.readings_collected()
+                reader.read_from_serial(pressure)
+                reader.ready_for_avg()
+                reader.calculate_avg(pressure)
+                durations.append(time.perf_counter() - start)
+
+            reader.get_all_linear_regressions()
+        finally:
+            emulator.stop()
+            acquisition.stop(timeout=1)
+            connection_manager.close_all()
+            logger.close()
+            writer.close()
+            store.close()
+
+    return {
+        "readings_per_point": num_readings,
+        "frame_rate": frame_rate,
+        "seconds_per_point": float(np.median(durations)),
+        "max_seconds_per_point": max(durations),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(quick: bool = False) -> dict:
+    repeats = 3 if quick else 10
+    num_frames = 10_000 if quick else 100_000
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": {
+            "decode": bench_decode(num_frames, repeats),
+            "framing": bench_framing(num_frames, repeats),
+            "acquisition": bench_acquisition(seconds=0.5 if quick else 2.0),
+            "logging": bench_logging(
+                num_records=100_000 if quick else 1_000_000, block_size=1000
+            ),
+            "fit": bench_fit(
+                sensor_counts=[1, 8, 64] if quick else [1, 8, 64, 512],
+                point_counts=[5, 20] if quick else [5, 20, 100],
+                repeats=repeats,
+            ),
+            "pressure_point": [
+                bench_pressure_point(
+                    num_readings, frame_rate=None, num_points=3 if quick else 5
+                )
+                for num_readings in ([100] if quick else [100, 1000])
+            ],
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the acquisition, decode, logging and fitting hot paths"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="smaller sizes, for a fast sanity check"
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help=f"json file, defaults to {RESULTS_DIR}/<commit>.json",
+    )
+    args = parser.parse_args()
+
+    report = run(quick=args.quick)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    print(json.dumps(report["results"], indent=2))
+    print(f"Saved to {output}")
@@ -1,3 +1,5 @@
+from typing import TypedDict
+
 import numpy as np
 
 
@@ -35,3 +37,226 @@ def calculate_linear_regression(
     slope, intercept = np.polyfit(x_array, y_array, 1)
 
     return float(np.round(slope, decimals=15)), float(np.round(intercept, decimals=5))
+
+
+class LinearRegressions(TypedDict):
+    slopes: np.ndarray
+    intercepts: np.ndarray
+    residuals: np.ndarray
+    slope_standard_errors: np.ndarray
+    intercept_standard_errors: np.ndarray
+    num_points: np.ndarray
+
+
+def calculate_linear_regressions(
+    readings: np.ndarray | list[list[float]],
+    pressures: np.ndarray | list[float],
+    mask: np.ndarray | None = None,
+) -> LinearRegressions:
+    """
+    Fit y = slope * x + intercept for every sensor at once, in closed form.
+
+    Args:
+        readings: (n_points, n_sensors) averaged voltage readings
+        pressures: (n_points,) pressure of every point
+        mask: optional (n_points, n_sensors) bool array, False drops a point for that sensor only
+
+    Returns:
+        LinearRegressions: arrays with one entry per sensor, except residuals, which are
+        (n_points, n_sensors) and NaN where a point was dropped. The standard errors are NaN
+        for sensors fitted to only 2 points
+
+    Raises:
+        ValueError: If the shapes do not match, a sensor has less than 2 points, or a sensor
+        read the same value at every point
+    """
+    x = np.asarray(readings, dtype=float)
+    y = np.asarray(pressures, dtype=float)
+
+    if x.ndim != 2:
+        raise ValueError(
+            f"Readings must be a (n_points, n_sensors) matrix. Got shape {x.shape}"
+        )
+
+    if y.shape != (x.shape[0],):
+        raise ValueError(
+            f"Need one pressure per point. Got readings: {x.shape[0]}, pressures: {y.shape}"
+        )
+
+    if mask is None:
+        weights = np.ones_like(x)
+    else:
+        if np.shape(mask) != x.shape:
+            raise ValueError(
+                f"Mask must have the shape of the readings {x.shape}. Got {np.shape(mask)}"
+            )
+        weights = np.asarray(mask, dtype=float)
+
+    n = weights.sum(axis=0)
+    if np.any(n < 2):
+        raise ValueError(
+            f"At least 2 data points required for linear regression. Points per sensor: {n.astype(int).tolist()}"
+        )
+
+    # a stuck or disconnected sensor has no slope, and NaN coefficients must not be stored
+    kept = weights > 0
+    lowest = np.where(kept, x, np.inf).min(axis=0)
+    highest = np.where(kept, x, -np.inf).max(axis=0)
+    constant = lowest == highest
+    if np.any(constant):
+        raise ValueError(
+            f"Sensors {np.flatnonzero(constant).tolist()} read the same value at every point, "
+            "so they cannot be fitted. Check that they are connected"
+        )
+
+    y_column = y[:, np.newaxis]
+    # masked out readings are zeroed so that NaNs in dropped points do not spread
+    x = np.where(weights > 0, x, 0.0)
+    mean_x = (weights * x).sum(axis=0) / n
+    mean_y = (weights * y_column).sum(axis=0) / n
+    dx = x - mean_x
+    dy = y_column - mean_y
+    s_xx = (weights * dx * dx).sum(axis=0)
+    s_xy = (weights * dx * dy).sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = s_xy / s_xx
+        intercepts = mean_y - slopes * mean_x
+
+        residuals = y_column - (slopes * x + intercepts)
+        sum_squared_errors = (weights * residuals**2).sum(axis=0)
+        variance = np.where(n > 2, sum_squared_errors / (n - 2), np.nan)
+        slope_standard_errors = np.sqrt(variance / s_xx)
+        intercept_standard_errors = np.sqrt(variance * (1 / n + mean_x**2 / s_xx))
+
+    return {
+        "slopes": slopes,
+        "intercepts": intercepts,
+        "residuals": np.where(weights > 0, residuals, np.nan),
+        "slope_standard_errors": slope_standard_errors,
+        "intercept_standard_errors": intercept_standard_errors,
+        "num_points": n.astype(int),
+    }
+
+
+class IncrementalLinearRegression:
+    """
+    Running least squares fit of y = m * x + c for several sensors at once.
+
+    Keeps Welford style running means and co-moments per sensor, so adding a
+    pressure point and reading the coefficients are both O(1) per sensor, and
+    the result is numerically stable even with large offsets in x.
+
+    Args:
+        num_sensors: number of sensors, each sensor gets its own fit
+    """
+
+    def __init__(self, num_sensors: int):
+        self.num_sensors = num_sensors
+        self.n = 0
+        self._mean_x = np.zeros(num_sensors)
+        self._mean_y = 0.0
+        self._c_xx = np.zeros(num_sensors)
+        self._c_xy = np.zeros(num_sensors)
+        self._c_yy = 0.0
+        self._previous_slopes = np.full(num_sensors, np.nan)
+
+    def add(self, x_values: list[float] | np.ndarray, y_value: float) -> None:
+        """add one point: the reading of every sensor (x) at a single pressure (y)"""
+        x = np.asarray(x_values, dtype=float)
+        if x.shape != (self.num_sensors,):
+            raise ValueError(
+                f"Expected {self.num_sensors} readings, but received {x.shape[0] if x.ndim else 0}"
+            )
+
+        self._previous_slopes = self.coefficients()[0]
+
+        self.n += 1
+        dx = x - self._mean_x
+        dy = y_value - self._mean_y
+        self._mean_x += dx / self.n
+        self._mean_y += dy / self.n
+        # the second factor uses the updated means, as in Welford's algorithm
+        self._c_xx += dx * (x - self._mean_x)
+        self._c_xy += dx * (y_value - self._mean_y)
+        self._c_yy += dy * (y_value - self._mean_y)
+
+    def coefficients(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            tup [np.ndarray, np.ndarray, np.ndarray]: (slopes, intercepts, r_squared), one entry per
+            sensor. Entries are NaN until there are at least 2 distinct readings for the sensor
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            valid = (self.n >= 2) & (self._c_xx > 0)
+            slopes = np.where(valid, self._c_xy / self._c_xx, np.nan)
+            intercepts = self._mean_y - slopes * self._mean_x
+            r_squared = np.where(
+                valid & (self._c_yy > 0),
+                self._c_xy**2 / (self._c_xx * self._c_yy),
+                np.nan,
+            )
+
+        return slopes, intercepts, r_squared
+
+    def slope_change(self) -> np.ndarray:
+        """relative change of every slope caused by the last point added"""
+        slopes = self.coefficients()[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.abs(slopes - self._previous_slopes) / np.abs(slopes)
+
+    def has_converged(self, tolerance: float = 1e-3, min_points: int = 3) -> bool:
+        """True once the last point moved no slope by more than the relative tolerance"""
+        if self.n < min_points:
+            return False
+
+        change = self.slope_change()
+        return bool(np.all(np.isfinite(change)) and np.all(change <= tolerance))
+
+
+class RunningStatistics:
+    """
+    Streaming mean and variance of several sensors (Welford), updated with batches of samples.
+
+    Batches are merged with Chan's parallel update, so the cost per batch is one
+    vectorized pass over the new samples, regardless of how many came before.
+
+    Args:
+        num_sensors: number of sensors, each column of a batch is one sensor
+    """
+
+    def __init__(self, num_sensors: int):
+        self.num_sensors = num_sensors
+        self.reset()
+
+    def reset(self) -> None:
+        self.n = 0
+        self.mean = np.zeros(self.num_sensors)
+        self._m2 = np.zeros(self.num_sensors)
+
+    def add(self, samples: np.ndarray) -> None:
+        """add a (k, num_sensors) batch of samples"""
+        samples = np.asarray(samples, dtype=float).reshape(-1, self.num_sensors)
+        k = samples.shape[0]
+        if k == 0:
+            return
+
+        batch_mean = samples.mean(axis=0)
+        batch_m2 = ((samples - batch_mean) ** 2).sum(axis=0)
+
+        total = self.n + k
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * k / total
+        self._m2 = self._m2 + batch_m2 + delta**2 * self.n * k / total
+        self.n = total
+
+    def variance(self) -> np.ndarray:
+        """sample variance of every sensor, NaN until there are 2 samples"""
+        if self.n < 2:
+            return np.full(self.num_sensors, np.nan)
+
+        return self._m2 / (self.n - 1)
+
+    def standard_error(self) -> np.ndarray:
+        """standard error of the mean of every sensor, NaN until there are 2 samples"""
+        return np.sqrt(self.variance() / max(self.n, 1))
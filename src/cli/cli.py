@@ -1,11 +1,14 @@
-from threading import Lock
-from typing import cast
-
 from textual.app import App
 
 from auto_cal_types import PTConfigs
-from cli.screens import calibration_screen, test_calibration_screen
+from cli.screens import calibration_screen
+from config.stand_profiles import DEFAULT_ACQUISITION_BACKEND
+from serial_reader.acquisition import DEFAULT_RING_CAPACITY, BoardAcquisition
+from serial_reader.async_transport import AsyncSerialEngine
 from serial_reader.calibration_reader import CalibrationReader
+from serial_reader.connection_manager import SerialConnectionManager
+from serial_reader.process_acquisition import AcquisitionProcessPool
+from serial_reader.telemetry import write_snapshot
 from serial_reader.testing_reader import TestingReader
 
 
@@ -23,59 +26,123 @@ class AutoCalCli(App):
     def __init__(
         self,
         pt_configs: list[PTConfigs],
-        baudrate: int,
+        connection_manager: SerialConnectionManager,
         num_readings_per_pressure: int,
-        hv: str,
-        lv: str,
+        target_standard_error: float | None = None,
+        min_readings_per_pressure: int = 2,
+        telemetry_filename: str | None = None,
+        acquisition_backend: str = DEFAULT_ACQUISITION_BACKEND,
     ):
+        pt_configs = [pt for pt in pt_configs if pt.get("port")]
+
+        # one acquisition per board, both sets of readers take samples from its ring buffer.
+        # By default every board is read and decoded in its own worker process. The async
+        # backend services every board from Textual's event loop (POSIX only), and the
+        # thread backend gives each board a thread
+        self.connection_manager = connection_manager
+        self.acquisition_pool = (
+            AcquisitionProcessPool(baudrate=connection_manager.baudrate)
+            if acquisition_backend == "process"
+            else None
+        )
+        self.serial_engine = (
+            AsyncSerialEngine(connection_manager)
+            if acquisition_backend == "async" and AsyncSerialEngine.is_supported()
+            else None
+        )
+        if not self.acquisition_pool:
+            # the workers of the process backend open their ports themselves
+            for pt in pt_configs:
+                connection_manager.register(pt["port"])
+
+        capacity = max(DEFAULT_RING_CAPACITY, 4 * num_readings_per_pressure)
+        self.acquisitions = [
+            (
+                (self.acquisition_pool or self.serial_engine).add_board(
+                    port=pt["port"],
+                    num_sensors=pt["pt_count"],
+                    decode_batch_fn=pt["decode_batch_fn"],
+                    stop_sequence=pt["stop_sequence"],
+                    expected_payload_length=pt["expected_payload_length"],
+                    capacity=capacity,
+                )
+                if self.acquisition_pool or self.serial_engine
+                else BoardAcquisition(
+                    port=pt["port"],
+                    connection_manager=connection_manager,
+                    num_sensors=pt["pt_count"],
+                    decode_batch_fn=pt["decode_batch_fn"],
+                    stop_sequence=pt["stop_sequence"],
+                    expected_payload_length=pt["expected_payload_length"],
+                    capacity=capacity,
+                )
+            )
+            for pt in pt_configs
+        ]
+
         # dynamically load the PTs that you have to read from
         self.calibration_readers = [
             CalibrationReader(
-                port=pt["port"],
-                baudrate=baudrate,
-                serial_lock=cast(Lock, pt["serial_lock"]),
+                acquisition=acquisition,
                 num_sensors=pt["pt_count"],
                 name=pt["name"],
                 logger=pt["logger"],
-                decode_fn=pt["decode_fn"],
-                stop_sequence=pt["stop_sequence"],
-                expected_payload_length=pt["expected_payload_length"],
                 num_readings_per_pt=num_readings_per_pressure,
+                target_standard_error=target_standard_error,
+                min_readings_per_pt=min_readings_per_pressure,
             )
-            for pt in pt_configs
-            if pt.get("serial_lock")
+            for pt, acquisition in zip(pt_configs, self.acquisitions)
         ]
 
         self.testing_readers = [
             TestingReader(
-                port=pt["port"],
-                baudrate=baudrate,
-                serial_lock=cast(Lock, pt["serial_lock"]),
+                acquisition=acquisition,
                 num_sensors=pt["pt_count"],
                 name=pt["name"],
                 logger=pt["logger"],
-                decode_fn=pt["decode_fn"],
-                stop_sequence=pt["stop_sequence"],
-                expected_payload_length=pt["expected_payload_length"],
             )
-            for pt in pt_configs
-            if pt.get("serial_lock")
+            for pt, acquisition in zip(pt_configs, self.acquisitions)
         ]
 
         self.num_readings_per_pt = num_readings_per_pressure
-        self.hv = hv
-        self.lv = lv
+        # the acquisition telemetry of the session is saved here when the app exits
+        self.telemetry_filename = telemetry_filename
         super().__init__()
 
     def on_mount(self):
+        if self.acquisition_pool:
+            # the workers open the ports themselves
+            self.acquisition_pool.start()
+        else:
+            self.connection_manager.open_all()
+            for acquisition in self.acquisitions:
+                acquisition.start()
+
         self.push_screen(
             calibration_screen.CalibrationScreen(
-                self.calibration_readers, self.num_readings_per_pt, self.hv, self.lv
+                self.calibration_readers, self.num_readings_per_pt
             )
         )
 
+    def on_unmount(self):
+        if self.acquisition_pool:
+            self.acquisition_pool.stop(timeout=1)
+        else:
+            for acquisition in self.acquisitions:
+                acquisition.stop(timeout=1)
+            self.connection_manager.close_all()
+
+        if self.telemetry_filename:
+            write_snapshot(
+                self.telemetry_filename,
+                [reader.get_telemetry() for reader in self.calibration_readers],
+            )
+
     def action_test_calibrations(self):
         """bring up the interface for testing calibrations"""
+        # the test screen is only imported the first time it is opened
+        from cli.screens import test_calibration_screen
+
         if isinstance(self.screen, calibration_screen.CalibrationScreen):
             self.push_screen(
                 test_calibration_screen.TestCalibrationScreen(self.testing_readers)
@@ -83,5 +150,7 @@ class AutoCalCli(App):
 
     def action_calibrate(self):
         """bring back the interface for calibrating sensors"""
+        from cli.screens import test_calibration_screen
+
         if isinstance(self.screen, test_calibration_screen.TestCalibrationScreen):
             self.pop_screen()
@@ -11,14 +11,6 @@ class TriggerCalibrationMessageAction(Message):
         super().__init__()
 
 
-class AverageRawReadingUpdated(Message):
-    def __init__(self, pressure: float, raw_readings: list[float], pt_id: str) -> None:
-        self.pressure = pressure
-        self.raw_readings = raw_readings
-        self.pt_id = pt_id
-        super().__init__()
-
-
 class TableRowUpdated(Message):
     def __init__(self, pressure: float, raw_readings: list[float], pt_id: str) -> None:
         self.pressure = pressure
@@ -1,4 +1,6 @@
-from textual import on, work
+import math
+
+from textual import on
 from textual.app import ComposeResult
 from textual.binding import Binding
 from textual.containers import Center, Container, HorizontalGroup, Middle, VerticalGroup
@@ -12,12 +14,12 @@ from textual.widgets import DataTable, Footer, Header, Input, Label, ProgressBar
 from textual.worker import get_current_worker
 
 from cli.messages import (
-    AverageRawReadingUpdated,
     CalculateLinearRegressionAction,
     PressureUpdated,
     TableRowUpdated,
     TriggerCalibrationMessageAction,
 )
+from cli.update_coalescer import UpdateCoalescer
 from serial_reader.calibration_reader import CalibrationReader
 
 
@@ -30,19 +32,18 @@ class CalibrationScreen(Screen):
         Binding(
             "ctrl+a", "test-reading", "Test reading with calibration factor", show=False
         ),
+        Binding("ctrl+e", "toggle_telemetry", "Telemetry", show=True),
     ]
 
     def __init__(
         self,
         pts: list[CalibrationReader],
         num_readings_per_pt: int,
-        hv: str,
-        lv: str,
     ):
         self.pts = pts
         self.num_readings_per_pt = num_readings_per_pt
-        self.hv = hv
-        self.lv = lv
+        # the workers record their updates here, and they reach the widgets at a fixed rate
+        self.coalescer = UpdateCoalescer()
 
         super().__init__()
 
@@ -50,9 +51,11 @@ class CalibrationScreen(Screen):
         """Create header and footer"""
         yield Header()
         yield Footer()
-        yield FullCalibrationDisplay(
-            self.pts, self.num_readings_per_pt, self.hv, self.lv
-        )
+        yield FullCalibrationDisplay(self.pts, self.num_readings_per_pt, self.coalescer)
+        yield TelemetryDisplay(self.pts)
+
+    def on_mount(self) -> None:
+        self.set_interval(self.coalescer.refresh_interval, self.coalescer.flush)
 
     def _post_calibration_message(self) -> None:
         """Calculate the linear regression for all PTs"""
@@ -63,12 +66,76 @@ class CalibrationScreen(Screen):
         """Tell the system to calculate the linear regression"""
         self._post_calibration_message()
 
+    def action_toggle_telemetry(self) -> None:
+        telemetry_display = self.query_one(TelemetryDisplay)
+        telemetry_display.display = not telemetry_display.display
+
     def on_trigger_calibration_message_action(
         self, message: TriggerCalibrationMessageAction
     ) -> None:
         self._post_calibration_message()
 
 
+class TelemetryDisplay(VerticalGroup):
+    """Live acquisition counters of every board, refreshed once a second"""
+
+    COLUMNS = [
+        ("Board", "board"),
+        ("Frames", "frames"),
+        ("Frames/s", "rate"),
+        ("Bytes", "bytes"),
+        ("Rejected", "rejected"),
+        ("Resyncs", "resyncs"),
+        ("Port wait (ms)", "port_wait"),
+        ("Read p99 (ms)", "read_p99"),
+        ("Wait timeouts", "wait_timeouts"),
+    ]
+
+    def __init__(self, pts: list[CalibrationReader]):
+        self.pts = pts
+        super().__init__(id="telemetry-display")
+
+    def compose(self) -> ComposeResult:
+        yield DataTable(id="telemetry-table", show_cursor=False)
+
+    def on_mount(self) -> None:
+        table = self.query_one("#telemetry-table", DataTable)
+        for label, key in self.COLUMNS:
+            table.add_column(label, key=key)
+        for reader in self.pts:
+            table.add_row(
+                reader.get_pt_name(),
+                *["-"] * (len(self.COLUMNS) - 1),
+                key=reader.get_pt_id(),
+            )
+
+        self.refresh_telemetry()
+        self.set_interval(1.0, self.refresh_telemetry)
+
+    def refresh_telemetry(self) -> None:
+        try:
+            table = self.query_one("#telemetry-table", DataTable)
+        except NoMatches:
+            return
+
+        for reader in self.pts:
+            telemetry = reader.acquisition.telemetry
+            snapshot = reader.get_telemetry()
+            read_p99 = snapshot["read_latency"]["p99"]
+            values = {
+                "frames": snapshot["frames_received"],
+                "rate": f"{telemetry.frame_rate():.0f}",
+                "bytes": snapshot["bytes_read"],
+                "rejected": snapshot["rejected_frames"],
+                "resyncs": snapshot["resyncs"],
+                "port_wait": f"{snapshot['port_wait_seconds'] * 1000:.1f}",
+                "read_p99": "-" if read_p99 is None else f"{read_p99 * 1000:.2f}",
+                "wait_timeouts": snapshot["wait_timeouts"],
+            }
+            for key, value in values.items():
+                table.update_cell(reader.get_pt_id(), key, value)
+
+
 class FullCalibrationDisplay(HorizontalGroup):
     """The main container for displaying the current readings and the previously calculated readings"""
 
@@ -77,7 +144,6 @@ class FullCalibrationDisplay(HorizontalGroup):
         #previous-display {
             border: solid orange;
             layout: grid;
-            grid-size: 2 1;
         }
     """
 
@@ -85,38 +151,32 @@ class FullCalibrationDisplay(HorizontalGroup):
         self,
         pts: list[CalibrationReader],
         num_readings_per_pressure: int,
-        hv: str,
-        lv: str,
+        coalescer: UpdateCoalescer,
     ):
         self.num_readings_per_pressure = num_readings_per_pressure
         self.pts = pts
         self.total_num_pts = sum([i.get_num_pts() for i in pts])
-        self.hv = hv
-        self.lv = lv
+        self.coalescer = coalescer
         super().__init__()
 
     # current set of readings + current set of commands
     def compose(self) -> ComposeResult:
         with Container(id="main-app-container"):
             yield CurrentCalibrationDisplay(
-                self.num_readings_per_pressure, self.pts, self.hv, self.lv
+                self.num_readings_per_pressure,
+                self.pts,
+                self.coalescer,
             )
             with Container(id="previous-display"):
                 for reader in self.pts:
-                    yield PreviousCalculationDisplay(reader, self.hv, self.lv)
-
-    def on_average_raw_reading_updated(self, message: AverageRawReadingUpdated) -> None:
-        print("got the message here", message)
-        for prev_display in self.query(PreviousCalculationDisplay):
-            prev_display.post_message(
-                TableRowUpdated(message.pressure, message.raw_readings, message.pt_id)
-            )
+                    yield PreviousCalculationDisplay(reader, self.coalescer)
 
     def on_mount(self) -> None:
         prev_display_container = self.query_one("#previous-display", Container)
         prev_display_container.styles.border = ("solid", "orange")
 
-        prev_display_container.styles.grid_size_columns = 2
+        # a column for every board
+        prev_display_container.styles.grid_size_columns = len(self.pts)
         prev_display_container.styles.grid_size_rows = 1
 
         # allocate space on the number of pts that each port has
@@ -125,7 +185,6 @@ class FullCalibrationDisplay(HorizontalGroup):
         for pt in self.pts:
             container_split += f" {int( (pt.get_num_pts() + 1) / (self.total_num_pts + len(self.pts) ) * 100)}%"
 
-        print("the style is ", container_split.strip())
         prev_display_container.styles.grid_columns = container_split.strip()
 
         prev_display_container.styles.layout = "grid"
@@ -140,32 +199,29 @@ class CurrentCalibrationDisplay(VerticalGroup):
         self,
         num_readings_per_pressure: int,
         pts: list[CalibrationReader],
-        hv: str,
-        lv: str,
+        coalescer: UpdateCoalescer,
     ):
         self.num_readings_per_pressure = num_readings_per_pressure
         self.pts = pts
-        self.hv = hv
-        self.lv = lv
+        self.coalescer = coalescer
         super().__init__()
 
     def compose(self) -> ComposeResult:
         with Container(id="current-calibration-container"):
             yield CurrentCalibrationUserInputWidget().data_bind()
             yield CurrentCalibrationProgressIndicator(
-                self.num_readings_per_pressure, self.pts, self.hv, self.lv
+                self.num_readings_per_pressure,
+                self.pts,
+                self.coalescer,
             ).data_bind(CurrentCalibrationDisplay.current_pressure)
 
     def on_pressure_updated(self, message: PressureUpdated) -> None:
         """Handle pressure updates from child widgets"""
         self.current_pressure = message.pressure
 
-        # reset the progress bar as well
-        try:
-            for progress_bar in self.query(ProgressBar):
-                progress_bar.update(progress=0)
-        except NoMatches:
-            pass
+        # reset the progress bar as well, through the coalescer so no stale progress lands after it
+        for reader in self.pts:
+            self.coalescer.set_progress(reader.get_pt_id(), 0)
 
 
 class CurrentCalibrationProgressIndicator(Widget):
@@ -179,13 +235,11 @@ class CurrentCalibrationProgressIndicator(Widget):
         self,
         num_readings_per_pressure: int,
         pts: list[CalibrationReader],
-        hv: str,
-        lv: str,
+        coalescer: UpdateCoalescer,
     ):
         self.num_readings_per_pressure = num_readings_per_pressure
         self.pts = pts
-        self.hv = hv
-        self.lv = lv
+        self.coalescer = coalescer
         super().__init__()
 
     def compose(self) -> ComposeResult:
@@ -225,33 +279,42 @@ class CurrentCalibrationProgressIndicator(Widget):
         except NoMatches:
             pass
 
-    @work(thread=True, exit_on_error=True)
-    async def take_readings_from_serial(
+    def take_readings_from_serial(
+        self, reader: CalibrationReader, current_pressure: float
+    ) -> None:
+        """read simultaneously from each serial port, one worker per reader. The workers run on the
+        event loop, and a new pressure cancels the reader's previous worker if it is still running
+        """
+        self.run_worker(
+            self._take_readings_from_serial(reader, current_pressure),
+            group=f"{reader.get_pt_id()}-readings",
+            exclusive=True,
+            exit_on_error=True,
+        )
+
+    async def _take_readings_from_serial(
         self, reader: CalibrationReader, current_pressure: float
     ) -> None:
-        """reader to read simultaneously from each serial port"""
         worker = get_current_worker()
         if worker.is_cancelled:
             raise Exception("Worker errored out, aborting calibration...")
 
-        for i in range(self.num_readings_per_pressure):
-            reader.read_from_serial(
-                is_first_reading=(i == 0), current_pressure=current_pressure
-            )
-            try:
-                self.query_one(f"#{reader.get_pt_id()}-progress", ProgressBar).advance(
-                    1
-                )
-            except NoMatches:
-                pass
+        # samples are acquired in the background, only the ones after this point are used
+        reader.start_pressure_point()
+        while not reader.pressure_point_complete():
+            collected = await reader.readings_collected_async()
+            self.coalescer.set_progress(reader.get_pt_id(), collected)
+
+        # in adaptive mode the point can finish before the bar is full
+        self.coalescer.set_progress(reader.get_pt_id(), self.num_readings_per_pressure)
+
+        reader.read_from_serial(current_pressure=current_pressure)
 
         if reader.ready_for_avg():
-            self.post_message(
-                AverageRawReadingUpdated(
-                    self.current_pressure,
-                    reader.calculate_avg(self.current_pressure),
-                    reader.get_pt_id(),
-                )
+            self.coalescer.add_row(
+                reader.get_pt_id(),
+                self.current_pressure,
+                reader.calculate_avg(self.current_pressure),
             )
 
         return
@@ -266,10 +329,21 @@ class CurrentCalibrationProgressIndicator(Widget):
             pass
 
     def on_mount(self) -> None:
-        """set the progress on all bars to 0"""
+        """set the progress on all bars to 0, and hand them to the coalescer"""
         for progress_bar in self.query(ProgressBar):
             progress_bar.update(progress=0)
 
+        # a progress bar next to the other for every board
+        self.query_one("#progress-bar-container").styles.grid_size_columns = len(
+            self.pts
+        )
+
+        for reader in self.pts:
+            self.coalescer.register_progress_bar(
+                reader.get_pt_id(),
+                self.query_one(f"#{reader.get_pt_id()}-progress", ProgressBar),
+            )
+
 
 class CurrentCalibrationUserInputWidget(VerticalGroup):
     """The widget which accepts user input"""
@@ -323,10 +397,9 @@ class CurrentCalibrationUserInputWidget(VerticalGroup):
 
 
 class PreviousCalculationDisplay(VerticalGroup):
-    def __init__(self, reader: CalibrationReader, hv: str, lv: str) -> None:
+    def __init__(self, reader: CalibrationReader, coalescer: UpdateCoalescer) -> None:
         self.reader = reader
-        self.hv = hv
-        self.lv = lv
+        self.coalescer = coalescer
         super().__init__()
 
     def compose(self) -> ComposeResult:
@@ -336,6 +409,11 @@ class PreviousCalculationDisplay(VerticalGroup):
                 id=f"{self.reader.get_pt_id()}-data-table-label",
             )
             yield DataTable(id=f"{self.reader.get_pt_id()}-data-table")
+            yield Label(
+                f"Live fit for {self.reader.get_pt_name()} PTs",
+                id=f"{self.reader.get_pt_id()}-live-fit-label",
+            )
+            yield DataTable(id=f"{self.reader.get_pt_id()}-live-fit-table")
 
     def on_mount(self) -> None:
         table = self.query_one(f"#{self.reader.get_pt_id()}-data-table", DataTable)
@@ -346,19 +424,50 @@ class PreviousCalculationDisplay(VerticalGroup):
         for pt in pt_columns:
             table.add_column(pt, key=pt)
 
-    def on_table_row_updated(self, message: TableRowUpdated) -> None:
-        # only handle the message if it is meant for this table
-        print("message received: ", message)
+        # the live fit is updated after every pressure point
+        live_fit_table = self.query_one(
+            f"#{self.reader.get_pt_id()}-live-fit-table", DataTable
+        )
+        live_fit_table.add_column("Live fit", key="values")
+        for pt in pt_columns:
+            live_fit_table.add_column(pt, key=pt)
+        for row in ["m", "c", "R²"]:
+            live_fit_table.add_row(row, *["-"] * len(pt_columns), key=row)
+
+        # new averages of this reader are only ever sent to this display
+        self.coalescer.register_table(self.reader.get_pt_id(), self)
 
-        if message.pt_id != self.reader.get_pt_id():
+    def update_live_fit(self) -> None:
+        """show the running fit of the reader, which is updated in O(1) per pressure point"""
+        try:
+            live_fit_table = self.query_one(
+                f"#{self.reader.get_pt_id()}-live-fit-table", DataTable
+            )
+            label = self.query_one(f"#{self.reader.get_pt_id()}-live-fit-label", Label)
+        except NoMatches:
             return
 
+        for row, values in zip(["m", "c", "R²"], self.reader.get_live_fit()):
+            for pt, value in enumerate(values):
+                live_fit_table.update_cell(
+                    row, f"PT {pt}", "-" if math.isnan(value) else f"{value:.6g}"
+                )
+
+        label.update(
+            f"Live fit for {self.reader.get_pt_name()} PTs"
+            f"{' (converged)' if self.reader.live_fit_converged() else ''}"
+        )
+
+    def on_table_row_updated(self, message: TableRowUpdated) -> None:
+        # the coalescer only posts the rows of this reader's PTs here
         table = self.query_one(f"#{self.reader.get_pt_id()}-data-table", DataTable)
 
         # only add rows to the table if the values are valid
-        if message.pressure >= 0 and message.pressure >= 0:
+        if message.pressure >= 0:
             table.add_row(message.pressure, *message.raw_readings)
 
+        self.update_live_fit()
+
     def on_calculate_linear_regression_action(
         self, message: CalculateLinearRegressionAction
     ) -> None:
@@ -3,10 +3,15 @@ from textual.binding import Binding
 from textual.containers import Container
 from textual.css.query import NoMatches
 from textual.screen import Screen
+from textual.timer import Timer
 from textual.widgets import DataTable, Footer, Header, Label
 
 from serial_reader.testing_reader import TestingReader
 
+# the live readout is redrawn at most this many times a second, however fast the boards stream
+LIVE_REFRESH_RATE = 10.0
+ROLLING_WINDOW_SECONDS = 1.0
+
 
 class TestCalibrationScreen(Screen):
 
@@ -16,18 +21,35 @@ class TestCalibrationScreen(Screen):
         Binding("ctrl+t", "test_calibrations", "Test Calibrated Values", show=False),
         Binding("ctrl+w", "calibrate", "Switch To Calibration Mode", show=True),
         Binding("ctrl+a", "test_reading", "Read with calibration factor", show=True),
+        Binding("ctrl+l", "toggle_live_readout", "Live readout", show=True),
     ]
 
+    live_timer: Timer
+    is_live = False
+
     def __init__(self, pts: list[TestingReader]):
         self.pts = pts
-        self.cal_constants = pts[0].logger.get_latest_set_of_cals(pts[0].get_num_pts())
+        self.cal_constants: dict[str, list[tuple[float, float]]] = {}
+        self.missing_cals: list[str] = []
+        for reader in pts:
+            try:
+                self.cal_constants[reader.get_pt_id()] = reader.load_calibration()
+            except Exception as e:
+                # a board that was never calibrated should not stop the others from being tested
+                self.missing_cals.append(str(e))
+
+        # only the boards with calibrations can be tested
+        self.calibrated_pts = [
+            reader for reader in pts if reader.get_pt_id() in self.cal_constants
+        ]
         super().__init__()
 
     def compose(self):
         yield Header()
         yield Footer()
         with Container(id="Testing-Container"):
-            yield Label("Calibration Testing Screen")
+            yield Label("Calibration Testing Screen", id="test-calibration-label")
+            yield Label("\n".join(self.missing_cals), id="error-message")
             yield DataTable(id="Test-Calibration-Table")
 
     def on_mount(self) -> None:
@@ -39,10 +61,25 @@ class TestCalibrationScreen(Screen):
 
         table.add_column("Raw pressure reading", key="Raw pressure")
         table.add_column("Calibrated Pressure Reading", key="Pressure")
+        table.add_column("Mean", key="Mean")
+        table.add_column("Min", key="Min")
+        table.add_column("Max", key="Max")
+
+        for reader in self.calibrated_pts:
+            for i, constants in enumerate(self.cal_constants[reader.get_pt_id()]):
+                table.add_row(
+                    f"{reader.get_pt_name()} PT {i}",
+                    constants[0],
+                    constants[1],
+                    key=self._row_key(reader, i),
+                )
+
+        self.live_timer = self.set_interval(
+            1 / LIVE_REFRESH_RATE, self.refresh_live_readout, pause=True
+        )
 
-        pt_rows = [f"PT {i}" for i in range(self.pts[0].get_num_pts())]
-        for constants, row_key in zip(self.cal_constants, pt_rows):
-            table.add_row(row_key, constants[0], constants[1], key=row_key)
+    def _row_key(self, reader: TestingReader, pt: int) -> str:
+        return f"{reader.get_pt_id()}-PT {pt}"
 
     def action_test_reading(self):
         """Read from serial, and calculate the resultant pressure using the calibration factors saved"""
@@ -52,26 +89,58 @@ class TestCalibrationScreen(Screen):
         except NoMatches:
             pass
 
+    def action_toggle_live_readout(self) -> None:
+        """continuously show the calibrated pressure of every board, with rolling mean/min/max"""
+        label = self.query_one("#test-calibration-label", Label)
+        self.is_live = not self.is_live
+        if not self.is_live:
+            self.live_timer.pause()
+            label.update("Calibration Testing Screen")
+        else:
+            self.live_timer.resume()
+            label.update(
+                f"Calibration Testing Screen - live readout, {ROLLING_WINDOW_SECONDS:g} s rolling window"
+            )
+
+    def refresh_live_readout(self) -> None:
+        try:
+            table = self.query_one("#Test-Calibration-Table", DataTable)
+        except NoMatches:
+            return
+
+        for reader in self.calibrated_pts:
+            readout = reader.live_readout(ROLLING_WINDOW_SECONDS)
+            if readout is None:
+                continue
+
+            for i in range(reader.get_num_pts()):
+                row_key = self._row_key(reader, i)
+                table.update_cell(row_key, "Raw pressure", float(readout["raw"][i]))
+                table.update_cell(row_key, "Pressure", float(readout["calibrated"][i]))
+                table.update_cell(row_key, "Mean", f"{readout['mean'][i]:.3f}")
+                table.update_cell(row_key, "Min", f"{readout['min'][i]:.3f}")
+                table.update_cell(row_key, "Max", f"{readout['max'][i]:.3f}")
+
     @work(thread=True, exit_on_error=True)
     async def take_and_calculate_readings(self, table: DataTable):
-        raw_readings = self.pts[0].read()
-
-        assert len(raw_readings) == len(
-            self.cal_constants
-        ), f"Lengths of readings {len(raw_readings)} do not match up with calibration constants {len(self.cal_constants)}"
-        for i in range(len(raw_readings)):
-            row_key = f"PT {i}"
-            reading = float(self.cal_constants[i][0]) * raw_readings[i] + float(
-                self.cal_constants[i][1]
-            )
-            table.update_cell(
-                row_key=row_key,
-                column_key="Pressure",
-                value=reading,
-            )
-            table.update_cell(
-                row_key=row_key, column_key="Raw pressure", value=raw_readings[i]
-            )
+        for reader in self.calibrated_pts:
+            raw_readings = reader.read()
+
+            assert len(raw_readings) == len(
+                self.cal_constants[reader.get_pt_id()]
+            ), f"Lengths of readings {len(raw_readings)} do not match up with calibration constants {len(self.cal_constants[reader.get_pt_id()])}"
+            # every PT of the board is calibrated in one vectorized step
+            readings = reader.calibrate(raw_readings)
+            for i in range(len(raw_readings)):
+                row_key = self._row_key(reader, i)
+                table.update_cell(
+                    row_key=row_key,
+                    column_key="Pressure",
+                    value=float(readings[i]),
+                )
+                table.update_cell(
+                    row_key=row_key, column_key="Raw pressure", value=raw_readings[i]
+                )
 
     # plan: add a button here that can be clicked when we want to test calibrations
     # it will: (1) load calibrations from file
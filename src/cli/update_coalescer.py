@@ -0,0 +1,62 @@
+import threading
+from collections import defaultdict
+
+from textual.widget import Widget
+from textual.widgets import ProgressBar
+
+from cli.messages import TableRowUpdated
+
+DEFAULT_REFRESH_RATE = 20.0
+
+
+class UpdateCoalescer:
+    """
+    Collects the progress and table updates of the acquisition workers, and applies them at a fixed rate.
+
+    Workers only record the latest progress and the new rows of their `pt_id`, so
+    a burst of samples costs one progress bar update per refresh instead of one
+    per sample. `flush` runs on the app thread from a timer, and every update
+    goes straight to the widget registered for its `pt_id`.
+    """
+
+    def __init__(self, refresh_rate: float = DEFAULT_REFRESH_RATE):
+        self.refresh_interval = 1 / refresh_rate
+        # workers may run on other threads, the lock keeps the pending updates consistent
+        self._lock = threading.Lock()
+        self._progress: dict[str, float] = {}
+        self._rows: defaultdict[str, list[tuple[float, list[float]]]] = defaultdict(
+            list
+        )
+        self._progress_bars: dict[str, ProgressBar] = {}
+        self._tables: dict[str, Widget] = {}
+
+    def register_progress_bar(self, pt_id: str, progress_bar: ProgressBar) -> None:
+        self._progress_bars[pt_id] = progress_bar
+
+    def register_table(self, pt_id: str, widget: Widget) -> None:
+        """the widget gets a TableRowUpdated message for every row of the pt_id"""
+        self._tables[pt_id] = widget
+
+    def set_progress(self, pt_id: str, progress: float) -> None:
+        """only the latest progress of a refresh interval is shown"""
+        with self._lock:
+            self._progress[pt_id] = progress
+
+    def add_row(self, pt_id: str, pressure: float, raw_readings: list[float]) -> None:
+        with self._lock:
+            self._rows[pt_id].append((pressure, raw_readings))
+
+    def flush(self) -> None:
+        """push everything pending to the widgets, must be called from the app thread"""
+        with self._lock:
+            progress, self._progress = self._progress, {}
+            rows, self._rows = self._rows, defaultdict(list)
+
+        for pt_id, value in progress.items():
+            if progress_bar := self._progress_bars.get(pt_id):
+                progress_bar.update(progress=value)
+
+        for pt_id, pt_rows in rows.items():
+            if table := self._tables.get(pt_id):
+                for pressure, raw_readings in pt_rows:
+                    table.post_message(TableRowUpdated(pressure, raw_readings, pt_id))
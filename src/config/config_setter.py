@@ -1,10 +1,10 @@
 from typing import cast
 
 import inquirer
-import serial
 from inquirer import errors as inquirer_errors
 
-from auto_cal_types import ConfigFields
+from auto_cal_types import ConfigFields, PTConfigs, StandProfile
+from config import stand_profiles
 
 
 def validate_number(answers, current) -> bool:
@@ -15,34 +15,62 @@ def validate_number(answers, current) -> bool:
         raise inquirer_errors.ValidationError("", reason="Invalid number")
 
 
-def validate_port(answers, current) -> bool:
-    """Check that the selected port is open"""
+def validate_optional_float(answers, current) -> bool:
+    if not current:
+        return True
+
     try:
-        ser = serial.Serial(current, int(answers["baud_rate"]), timeout=1)
-        ser.close()
+        float(current)
         return True
-    except serial.SerialException:
-        raise inquirer_errors.ValidationError(
-            "", reason=f"{current} is currently in use"
-        )
+    except ValueError:
+        raise inquirer_errors.ValidationError("", reason="Invalid number")
+
+
+def validate_pt_count(board: str):
+    """validates the number of PTs of the board"""
+
+    def validate(answers, current) -> bool:
+        validate_number(answers, current)
+        try:
+            stand_profiles.check_pt_count(board, int(current))
+            return True
+        except ValueError as e:
+            raise inquirer_errors.ValidationError("", reason=str(e))
 
+    return validate
 
-PORT_HV = (
-    "/dev/serial/by-id/usb-Espressif_USB_JTAG_serial_debug_unit_B4:3A:45:B3:70:B0-if00"
-)
-# PORT_LV = (
-#     "/dev/serial/by-id/usb-Espressif_USB_JTAG_serial_debug_unit_B4:3A:45:B6:7E:D0-if00"
-# )
 
+def split_board_names(answer: str) -> list[str]:
+    return [name.strip() for name in answer.split(",") if name.strip()]
 
-# PORT_HV = "/dev/tty.usbserial-2110"
-PORT_LV = "/dev/cu.usbmodem1101"
+
+def validate_board_names(answers, current) -> bool:
+    names = split_board_names(current)
+    if not names:
+        raise inquirer_errors.ValidationError("", reason="Enter at least one board")
+
+    try:
+        stand_profiles.check_board_names(names)
+        return True
+    except ValueError as e:
+        raise inquirer_errors.ValidationError("", reason=str(e))
+
+
+# picked in the stand prompt to answer every question by hand instead
+MANUAL_SETUP = "Manual set-up"
 
 
 class Config:
-    def __init__(self, hv: str, lv: str):
-        self.HV = "High Voltage"
-        self.LV = "Low Voltage"
+    def __init__(
+        self,
+        default_boards: list[str],
+        stand_profiles_filename: str | None = None,
+        last_stand_filename: str | None = None,
+    ):
+        self.default_boards = default_boards
+        self.stand_profiles_filename = stand_profiles_filename
+        self.last_stand_filename = last_stand_filename
+        self._discovered_ports: list[str] | None = None
 
         # split the questions into multiple stages so that we can ask questions conditionally
         self.question_stage_one = [
@@ -51,62 +79,161 @@ class Config:
                 message="Controller baud rate",
                 validate=validate_number,
             ),
-            inquirer.Checkbox(
-                "ports_to_read",
-                message="Select the sets of PTs you wish to calibrate. (Click space to select, ENTER to confirm)",
-                choices=[self.HV, self.LV],
+            inquirer.Text(
+                "boards",
+                message="Names of the boards to calibrate, separated by commas",
+                validate=validate_board_names,
+                default=", ".join(self.default_boards),
             ),
         ]
 
     def prompt(self) -> ConfigFields | None:
+        """pick a stand profile (the last used one is the default), or answer every question by hand"""
+        stands = (
+            stand_profiles.load_stand_profiles(self.stand_profiles_filename)
+            if self.stand_profiles_filename
+            else {}
+        )
+        if not stands:
+            return self.prompt_manual()
+
+        last_stand = (
+            stand_profiles.load_last_stand(self.last_stand_filename)
+            if self.last_stand_filename
+            else None
+        )
         answers = inquirer.prompt(
-            self.question_stage_one, raise_keyboard_interrupt=True
+            [
+                inquirer.List(
+                    "stand",
+                    message="Stand profile",
+                    choices=[*stands, MANUAL_SETUP],
+                    default=(
+                        last_stand["stand"]
+                        if last_stand and last_stand["stand"] in stands
+                        else None
+                    ),
+                )
+            ],
+            raise_keyboard_interrupt=True,
         )
 
-        if not answers or not (pts_to_read := answers.get("ports_to_read", None)):
+        if not answers:
             return None
 
-        # clean up the answers dict
-        del answers["ports_to_read"]
+        if answers["stand"] == MANUAL_SETUP:
+            return self.prompt_manual()
 
-        pt_configs = []
-        if self.HV in pts_to_read:
-            hv_pt_count = inquirer.prompt(
+        return self.answers_from_stand(
+            answers["stand"],
+            stands[answers["stand"]],
+            (
+                last_stand["ports"]
+                if last_stand and last_stand["stand"] == answers["stand"]
+                else None
+            ),
+        )
+
+    def answers_from_stand(
+        self,
+        name: str,
+        profile: StandProfile,
+        cached_ports: dict[str, str] | None = None,
+    ) -> ConfigFields | None:
+        print(f"Looking for the boards of {name}...")
+        try:
+            ports = stand_profiles.resolve_ports(profile, cached_ports)
+        except Exception as e:
+            print(e)
+            return None
+
+        if self.last_stand_filename:
+            stand_profiles.save_last_stand(self.last_stand_filename, name, ports)
+
+        answers: ConfigFields = {
+            "baud_rate": int(profile["baud_rate"]),
+            "pt_configs": [
+                cast(
+                    PTConfigs,
+                    {
+                        "port": ports[board["name"]],
+                        "pt_count": int(board["pt_count"]),
+                        "name": board["name"],
+                        "log_namespace": stand_profiles.log_namespace(board),
+                    },
+                )
+                for board in profile["boards"]
+            ],
+            "num_readings_per_pt": int(profile["num_readings_per_pt"]),
+            "target_standard_error": profile.get("target_standard_error"),
+            "min_readings_per_pt": int(profile.get("min_readings_per_pt", 2)),
+            "acquisition_backend": profile.get(
+                "acquisition_backend", stand_profiles.DEFAULT_ACQUISITION_BACKEND
+            ),
+        }
+        if "log_dir" in profile:
+            answers["log_dir"] = profile["log_dir"]
+
+        return answers
+
+    def prompt_port(self, board: str, baud_rate: int) -> str:
+        """choose the port of a board from the ports that stream valid frames"""
+        # probing needs pyserial and numpy, which are not loaded for the first prompt
+        from serial_reader import port_discovery
+
+        if self._discovered_ports is None:
+            print("Looking for boards...")
+            self._discovered_ports = port_discovery.discover_ports(baud_rate)
+
+        # fall back to every serial port if no board answered, it may just be quiet
+        choices = self._discovered_ports or port_discovery.candidate_ports()
+        if not choices:
+            answer = inquirer.prompt(
                 [
                     inquirer.Text(
-                        "hv_pts",
-                        message="Number of PTs on HV",
-                        validate=validate_number,
+                        "port", message=f"No serial ports found, port of {board}"
                     )
                 ],
                 raise_keyboard_interrupt=True,
             )
-            if hv_pt_count:
-                pt_configs.append(
-                    {
-                        "port": PORT_HV,
-                        "pt_count": int(hv_pt_count["hv_pts"]),
-                        "name": self.HV,
-                    }
-                )
+        else:
+            answer = inquirer.prompt(
+                [inquirer.List("port", message=f"Port of {board}", choices=choices)],
+                raise_keyboard_interrupt=True,
+            )
 
-        if self.LV in pts_to_read:
-            lv_pt_count = inquirer.prompt(
+        return answer["port"] if answer else ""
+
+    def prompt_manual(self) -> ConfigFields | None:
+        answers = inquirer.prompt(
+            self.question_stage_one, raise_keyboard_interrupt=True
+        )
+
+        if not answers or not (boards := split_board_names(answers["boards"])):
+            return None
+
+        # clean up the answers dict
+        del answers["boards"]
+
+        # every board gets the same questions, one board after the other
+        pt_configs = []
+        for board in boards:
+            pt_count = inquirer.prompt(
                 [
                     inquirer.Text(
-                        "lv_pts",
-                        message="Number of PTs on LV",
-                        validate=validate_number,
+                        "pt_count",
+                        message=f"Number of PTs on {board}",
+                        validate=validate_pt_count(board),
                     )
                 ],
                 raise_keyboard_interrupt=True,
             )
-            if lv_pt_count:
+            if pt_count:
                 pt_configs.append(
                     {
-                        "port": PORT_LV,
-                        "pt_count": int(lv_pt_count["lv_pts"]),
-                        "name": self.LV,
+                        "port": self.prompt_port(board, int(answers["baud_rate"])),
+                        "pt_count": int(pt_count["pt_count"]),
+                        "name": board,
                     }
                 )
 
@@ -117,15 +244,40 @@ class Config:
             [
                 inquirer.Text(
                     "num_readings_per_pt",
-                    message="Number of readings to take per pt",
+                    message="Number of readings to take per pt (the maximum, if a target standard error is set)",
                     validate=validate_number,
                     default=10,
                 ),
+                inquirer.Text(
+                    "target_standard_error",
+                    message="Stop a pt early once the standard error of every reading is below (leave empty to always take every reading)",
+                    validate=validate_optional_float,
+                    default="",
+                ),
             ],
             raise_keyboard_interrupt=True,
         )
 
         if num_readings_per_pt:
+            target_standard_error = num_readings_per_pt.pop("target_standard_error")
             answers.update(num_readings_per_pt)
+            answers["target_standard_error"] = (
+                float(target_standard_error) if target_standard_error else None
+            )
+
+            if target_standard_error:
+                min_readings_per_pt = inquirer.prompt(
+                    [
+                        inquirer.Text(
+                            "min_readings_per_pt",
+                            message="Minimum number of readings to take per pt",
+                            validate=validate_number,
+                            default=5,
+                        ),
+                    ],
+                    raise_keyboard_interrupt=True,
+                )
+                if min_readings_per_pt:
+                    answers.update(min_readings_per_pt)
 
         return cast(ConfigFields, answers)
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+from typing import TypedDict, cast
+
+from auto_cal_types import BoardProfile, PTConfigs, StandProfile
+
+# boards without a port (or with "auto") are found by port discovery
+AUTO_PORT = "auto"
+
+# board names end up in widget ids and log directories, so they are limited to these characters
+BOARD_NAME_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9_ -]*")
+
+# a frame holds serial_reader.protocol.NUM_VALUES_PER_FRAME values, which is not imported
+# here because it loads numpy before the prompts
+MAX_PT_COUNT = 8
+
+# how every board's port is read: a worker process per board, the UI's event loop, or a thread per board
+ACQUISITION_BACKENDS = ("process", "async", "thread")
+DEFAULT_ACQUISITION_BACKEND = "process"
+
+
+class LastStand(TypedDict):
+    stand: str
+    # board name -> port it was found on
+    ports: dict[str, str]
+
+
+def check_pt_count(name: str, pt_count: int) -> None:
+    """
+    Raises:
+        ValueError: if the board has no PTs, or more than a frame holds
+    """
+    if not 0 < pt_count <= MAX_PT_COUNT:
+        raise ValueError(
+            f"Board {name} has {pt_count} PTs, a frame holds between 1 and {MAX_PT_COUNT}"
+        )
+
+
+def check_board_names(names: list[str]) -> None:
+    """
+    Raises:
+        ValueError: if a name is not allowed, or two boards have the same name
+    """
+    for name in names:
+        if not BOARD_NAME_PATTERN.fullmatch(name):
+            raise ValueError(
+                f"Invalid board name {name!r}, use letters, digits, spaces, - and _ and start with a letter"
+            )
+
+    if len(set(names)) != len(names):
+        raise ValueError(f"Board names must be unique, got {', '.join(names)}")
+
+
+def log_namespace(board: BoardProfile | PTConfigs) -> str:
+    """the directory a board's logs go in, named after the board unless it sets log_namespace"""
+    return board.get("log_namespace") or "-".join(board["name"].split(" "))
+
+
+def validate_profile(profile: dict, source: str) -> StandProfile:
+    for field in ("baud_rate", "num_readings_per_pt", "boards"):
+        if field not in profile:
+            raise ValueError(f"Profile {source} is missing {field}")
+
+    if not profile["boards"]:
+        raise ValueError(f"Profile {source} has no boards")
+
+    for board in profile["boards"]:
+        for field in ("name", "pt_count"):
+            if field not in board:
+                raise ValueError(f"Board {board} in {source} is missing {field}")
+
+        check_pt_count(board["name"], int(board["pt_count"]))
+
+    check_board_names([board["name"] for board in profile["boards"]])
+
+    backend = profile.get("acquisition_backend", DEFAULT_ACQUISITION_BACKEND)
+    if backend not in ACQUISITION_BACKENDS:
+        raise ValueError(
+            f"Profile {source} has an unknown acquisition_backend {backend}, expected one of {', '.join(ACQUISITION_BACKENDS)}"
+        )
+
+    return cast(StandProfile, profile)
+
+
+def load_profile(path: str) -> StandProfile:
+    """a single profile, eg. for the headless runner"""
+    with open(path) as file:
+        return validate_profile(json.load(file), path)
+
+
+def load_stand_profiles(path: str) -> dict[str, StandProfile]:
+    """every named profile in the stands file, empty if there is no file"""
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as file:
+        stands = json.load(file)
+
+    return {
+        name: validate_profile(profile, f"{path} ({name})")
+        for name, profile in stands.items()
+    }
+
+
+def load_last_stand(path: str) -> LastStand | None:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_last_stand(path: str, stand: str, ports: dict[str, str]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump({"stand": stand, "ports": ports}, file, indent=2)
+
+
+def resolve_ports(
+    profile: StandProfile, cached_ports: dict[str, str] | None = None
+) -> dict[str, str]:
+    """
+    Find the port of every board in the profile.
+
+    Boards with an explicit port keep it. The others first try the port they were
+    found on last time, and the rest are discovered by probing every candidate port
+    in parallel. A board with a `port_match` takes the first discovered port whose
+    path contains it, the others take the remaining ports in order.
+
+    Raises:
+        Exception: if a board could not be matched to a port
+    """
+    # probing needs pyserial and numpy, which the prompts do not load up front
+    from serial_reader import port_discovery
+
+    baudrate = int(profile["baud_rate"])
+    cached_ports = cached_ports or {}
+    ports: dict[str, str] = {}
+    auto_boards = []
+    for board in profile["boards"]:
+        port = board.get("port", AUTO_PORT)
+        if port != AUTO_PORT:
+            ports[board["name"]] = port
+        else:
+            auto_boards.append(board)
+
+    # the port a board was on last time is almost always still right, and probing it is quick
+    cached = [
+        cached_ports[board["name"]]
+        for board in auto_boards
+        if board["name"] in cached_ports
+    ]
+    responding = set(port_discovery.discover_ports(baudrate, cached))
+    for board in auto_boards:
+        if cached_ports.get(board["name"]) in responding:
+            ports[board["name"]] = cached_ports[board["name"]]
+
+    remaining_boards = [board for board in auto_boards if board["name"] not in ports]
+    if remaining_boards:
+        taken = set(ports.values())
+        discovered = port_discovery.discover_ports(
+            baudrate,
+            [port for port in port_discovery.candidate_ports() if port not in taken],
+        )
+
+        # boards that say which port they are on pick first
+        for board in sorted(remaining_boards, key=lambda b: "port_match" not in b):
+            match = board.get("port_match", "")
+            port = next((port for port in discovered if match in port), None)
+            if port is None:
+                raise Exception(f"Could not find the port of {board['name']}")
+
+            discovered.remove(port)
+            ports[board["name"]] = port
+
+    return ports
@@ -0,0 +1,354 @@
+import argparse
+import os
+import sys
+import threading
+import time
+import tty
+from typing import Callable
+
+import numpy as np
+
+from serial_reader.frame_decoder import frame_dtype
+from serial_reader.protocol import NUM_VALUES_PER_FRAME
+
+DEFAULT_STOP_SEQUENCE = b"\r\n"
+DEFAULT_NUM_SENSORS = 8
+# frames are generated and written in ticks, so high rates do not need a write per frame
+TICK_SECONDS = 0.01
+
+TransferFunction = Callable[[np.ndarray], np.ndarray]
+
+
+def linear_transfer(
+    slopes: np.ndarray | list[float], intercepts: np.ndarray | list[float]
+) -> TransferFunction:
+    """sensors that follow pressure = m * voltage + c exactly, the model the calibration fits"""
+    slopes = np.asarray(slopes, dtype=np.float64)
+    intercepts = np.asarray(intercepts, dtype=np.float64)
+
+    def transfer(pressures: np.ndarray) -> np.ndarray:
+        return (pressures[:, None] - intercepts) / slopes
+
+    return transfer
+
+
+def connected_transfer(
+    transfer_fn: TransferFunction, num_sensors: int
+) -> TransferFunction:
+    """a board with fewer PTs connected than its frames hold, the other channels read 0 V"""
+
+    def transfer(pressures: np.ndarray) -> np.ndarray:
+        connected = transfer_fn(pressures)
+        voltages = np.zeros((pressures.shape[0], num_sensors))
+        voltages[:, : connected.shape[1]] = connected
+        return voltages
+
+    return transfer
+
+
+def polynomial_transfer(
+    coefficients: np.ndarray | list[list[float]],
+) -> TransferFunction:
+    """nonlinear sensors, voltage = sum(coefficients[k] * pressure ** k) with one column per sensor"""
+    coefficients = np.asarray(coefficients, dtype=np.float64)
+
+    def transfer(pressures: np.ndarray) -> np.ndarray:
+        powers = pressures[:, None] ** np.arange(coefficients.shape[0])
+        return powers @ coefficients
+
+    return transfer
+
+
+class NoiseModel:
+    """gaussian noise on every value, plus a slow drift of the zero point"""
+
+    def __init__(self, std: float = 0.0, drift_per_second: float = 0.0):
+        self.std = std
+        self.drift_per_second = drift_per_second
+
+    def apply(
+        self, voltages: np.ndarray, elapsed: np.ndarray, rng: np.random.Generator
+    ) -> np.ndarray:
+        if self.std:
+            voltages = voltages + rng.normal(0.0, self.std, voltages.shape)
+        if self.drift_per_second:
+            voltages = voltages + (self.drift_per_second * elapsed)[:, None]
+        return voltages
+
+
+class FaultModel:
+    """
+    Per frame probabilities of the faults seen on the real link.
+
+    Args:
+        misalignment_rate: a frame loses some of its leading bytes, so the reader has to resync
+        corruption_rate: a random byte of the frame is overwritten
+        dropout_rate: the board goes quiet for `dropout_length` frames
+        dropout_length: number of frames lost in a dropout
+    """
+
+    def __init__(
+        self,
+        misalignment_rate: float = 0.0,
+        corruption_rate: float = 0.0,
+        dropout_rate: float = 0.0,
+        dropout_length: int = 10,
+    ):
+        self.misalignment_rate = misalignment_rate
+        self.corruption_rate = corruption_rate
+        self.dropout_rate = dropout_rate
+        self.dropout_length = dropout_length
+
+    def any(self) -> bool:
+        return bool(self.misalignment_rate or self.corruption_rate or self.dropout_rate)
+
+
+class BoardEmulator:
+    """
+    Emulates one board on a pseudo-terminal, streaming frames in the format `decode_fn` expects.
+
+    The slave end of the pty (`port`) is what the app opens in place of the
+    board's serial port. Every random draw comes from a seeded generator, so a
+    run with the same seed and pressures produces the same bytes.
+    """
+
+    def __init__(
+        self,
+        num_sensors: int = DEFAULT_NUM_SENSORS,
+        frame_rate: float | None = 100.0,
+        transfer_fn: TransferFunction | None = None,
+        noise: NoiseModel | None = None,
+        faults: FaultModel | None = None,
+        seed: int | None = None,
+        stop_sequence: bytes = DEFAULT_STOP_SEQUENCE,
+    ):
+        self.num_sensors = num_sensors
+        # None streams as fast as the pty accepts
+        self.frame_rate = frame_rate
+        self.transfer_fn = transfer_fn or linear_transfer(
+            np.full(num_sensors, 100.0), -100.0 * np.arange(num_sensors)
+        )
+        self.noise = noise or NoiseModel()
+        self.faults = faults or FaultModel()
+        self.stop_sequence = stop_sequence
+        self.dtype = frame_dtype(num_sensors, stop_sequence)
+        self.rng = np.random.default_rng(seed)
+
+        self.pressure = 0.0
+        self.frames_generated = 0
+        self.frames_dropped = 0
+        self.frames_corrupted = 0
+        self.frames_misaligned = 0
+        # bytes the reader was too slow for, like a UART overrun on the real board
+        self.bytes_overrun = 0
+
+        self._master: int | None = None
+        self._slave: int | None = None
+        self._dropout_remaining = 0
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def port(self) -> str:
+        if self._slave is None:
+            raise Exception("Emulator is not open")
+        return os.ttyname(self._slave)
+
+    def open(self) -> str:
+        """create the pty pair, returns the port to point the app at"""
+        if self._master is None:
+            self._master, self._slave = os.openpty()
+            # no echo or line editing, the bytes have to arrive untouched
+            tty.setraw(self._slave)
+            os.set_blocking(self._master, False)
+        return self.port
+
+    def close(self) -> None:
+        self.stop()
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def set_pressure(self, pressure: float) -> None:
+        self.pressure = float(pressure)
+
+    def generate(self, num_frames: int, elapsed: float = 0.0) -> bytes:
+        """the bytes of the next `num_frames` frames at the current pressure, faults included"""
+        pressures = np.full(num_frames, self.pressure)
+        period = 1 / self.frame_rate if self.frame_rate else 0.0
+        times = elapsed + period * np.arange(num_frames)
+        voltages = self.noise.apply(self.transfer_fn(pressures), times, self.rng)
+
+        frames = np.empty(num_frames, dtype=self.dtype)
+        frames["values"] = voltages
+        frames["stop"] = self.stop_sequence
+        self.frames_generated += num_frames
+
+        if not self.faults.any():
+            return frames.tobytes()
+
+        return self._inject_faults(frames)
+
+    def _inject_faults(self, frames: np.ndarray) -> bytes:
+        faults = self.faults
+        raw = np.frombuffer(bytearray(frames.tobytes()), dtype=np.uint8).reshape(
+            len(frames), self.dtype.itemsize
+        )
+
+        corrupted = self.rng.random(len(frames)) < faults.corruption_rate
+        positions = self.rng.integers(0, self.dtype.itemsize, corrupted.sum())
+        raw[corrupted, positions] = self.rng.integers(0, 256, corrupted.sum())
+        self.frames_corrupted += int(corrupted.sum())
+
+        misaligned = self.rng.random(len(frames)) < faults.misalignment_rate
+        cuts = self.rng.integers(1, self.dtype.itemsize, len(frames))
+        dropouts = self.rng.random(len(frames)) < faults.dropout_rate
+
+        chunks = []
+        for i in range(len(frames)):
+            if self._dropout_remaining or dropouts[i]:
+                self._dropout_remaining = (
+                    self._dropout_remaining or faults.dropout_length
+                ) - 1
+                self.frames_dropped += 1
+                continue
+
+            if misaligned[i]:
+                self.frames_misaligned += 1
+                chunks.append(raw[i, cuts[i] :].tobytes())
+            else:
+                chunks.append(raw[i].tobytes())
+
+        return b"".join(chunks)
+
+    def write(self, data: bytes) -> int:
+        """write to the master end without blocking, whatever does not fit is lost"""
+        if self._master is None:
+            raise Exception("Emulator is not open")
+
+        try:
+            written = os.write(self._master, data)
+        except BlockingIOError:
+            written = 0
+
+        self.bytes_overrun += len(data) - written
+        return written
+
+    def start(self) -> None:
+        """stream frames on a background thread until stop()"""
+        self.open()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._stream, name="board-emulator", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _stream(self) -> None:
+        start = time.monotonic()
+        sent = 0
+        while not self._stop_event.is_set():
+            elapsed = time.monotonic() - start
+            if self.frame_rate:
+                # catch up to where the clock says we should be, so the average rate is exact
+                due = int(elapsed * self.frame_rate) - sent
+            else:
+                due = max(1, 4096 // self.dtype.itemsize)
+
+            if due > 0:
+                self.write(self.generate(due, elapsed))
+                sent += due
+
+            self._stop_event.wait(TICK_SECONDS if self.frame_rate else 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Emulate a board on a pseudo-terminal. Type a pressure and press enter to change it"
+    )
+    parser.add_argument(
+        "--pts",
+        type=int,
+        default=NUM_VALUES_PER_FRAME,
+        help=f"PTs connected, every frame still holds {NUM_VALUES_PER_FRAME} values",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=100.0, help="frames per second, 0 for unthrottled"
+    )
+    parser.add_argument("--pressure", type=float, default=0.0)
+    parser.add_argument("--noise", type=float, default=0.0, help="std of the noise")
+    parser.add_argument("--drift", type=float, default=0.0, help="volts per second")
+    parser.add_argument(
+        "--quadratic",
+        type=float,
+        default=0.0,
+        help="pressure^2 term added to every sensor, for a nonlinear transfer function",
+    )
+    parser.add_argument("--misalign", type=float, default=0.0)
+    parser.add_argument("--corrupt", type=float, default=0.0)
+    parser.add_argument("--dropout", type=float, default=0.0)
+    parser.add_argument("--dropout-length", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if not 0 < args.pts <= NUM_VALUES_PER_FRAME:
+        parser.error(f"--pts must be between 1 and {NUM_VALUES_PER_FRAME}")
+
+    if args.quadratic:
+        offsets = np.arange(args.pts, dtype=np.float64)
+        transfer_fn = polynomial_transfer(
+            [offsets, np.full(args.pts, 0.01), np.full(args.pts, args.quadratic)]
+        )
+    else:
+        transfer_fn = linear_transfer(
+            np.full(args.pts, 100.0), -100.0 * np.arange(args.pts)
+        )
+
+    # the app always decodes frames of NUM_VALUES_PER_FRAME values, whatever is connected
+    emulator = BoardEmulator(
+        num_sensors=NUM_VALUES_PER_FRAME,
+        frame_rate=args.rate or None,
+        transfer_fn=connected_transfer(transfer_fn, NUM_VALUES_PER_FRAME),
+        noise=NoiseModel(std=args.noise, drift_per_second=args.drift),
+        faults=FaultModel(
+            misalignment_rate=args.misalign,
+            corruption_rate=args.corrupt,
+            dropout_rate=args.dropout,
+            dropout_length=args.dropout_length,
+        ),
+        seed=args.seed,
+    )
+    emulator.set_pressure(args.pressure)
+
+    with emulator:
+        emulator.start()
+        print(f"Emulating a {args.pts} PT board on {emulator.port}")
+        try:
+            for line in sys.stdin:
+                try:
+                    emulator.set_pressure(float(line))
+                except ValueError:
+                    print("Pressure must be a number")
+                    continue
+                print(
+                    f"Pressure {emulator.pressure}, {emulator.frames_generated} frames sent, "
+                    f"{emulator.bytes_overrun} bytes overrun"
+                )
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
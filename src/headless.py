@@ -0,0 +1,318 @@
+"""
+Scripted calibration sweeps without the TUI.
+
+    python src/headless.py profile.json setpoints.txt
+    echo "0 100 200" | python src/headless.py profile.json -
+    python src/headless.py profile.json setpoints.txt --emulate
+
+The profile is json: {"baud_rate", "num_readings_per_pt", "boards": [{"name", "pt_count"}]}
+and optionally "target_standard_error", "min_readings_per_pt", "log_dir" and
+"acquisition_backend" ("process", the default, or "thread"). Boards without a "port" are
+found with port discovery, same as a stand profile, and every board logs into its own
+directory of the log dir. Setpoints are pressures separated by whitespace or commas.
+When read from stdin every setpoint is used as soon as it arrives, so a controlling script
+can wait for the rig to reach a pressure before sending it.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Iterator
+
+from auto_cal_types import StandProfile
+from cal import cal
+from config import stand_profiles
+from logger.calibration_store import CalibrationStore
+from logger.log_rotation import LogRotator
+from logger.log_writer import FlushPolicy, LogWriter
+from logger.logger import Logger
+from serial_reader.acquisition import DEFAULT_RING_CAPACITY, BoardAcquisition
+from serial_reader.calibration_reader import CalibrationReader
+from serial_reader.connection_manager import SerialConnectionManager
+from serial_reader.process_acquisition import (
+    AcquisitionProcessPool,
+    ProcessBoardAcquisition,
+)
+from serial_reader.protocol import (
+    CONTROL_CHARACTERS,
+    EXPECTED_PAYLOAD_LENGTH,
+    NUM_VALUES_PER_FRAME,
+    batch_decoder,
+)
+
+DEFAULT_LOG_DIR = "logs"
+# how long closing waits for the segment being compressed, the rest is compressed on the next run
+LOG_ROTATOR_CLOSE_TIMEOUT = 5.0
+SUMMARY_FILENAME_FORMAT = "headless_summary_%Y%m%d_%H%M%S.json"
+
+
+def read_setpoints(source: str) -> Iterator[float]:
+    """pressures from a file, or from stdin if the source is -, yielded as soon as they are read"""
+    file = sys.stdin if source == "-" else open(source)
+    try:
+        for line in file:
+            for value in re.split(r"[\s,]+", line.strip()):
+                if value:
+                    yield float(value)
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+class HeadlessRunner:
+    """Runs a calibration sweep over every board in the profile, with the same readers as the TUI"""
+
+    def __init__(
+        self, profile: StandProfile, settle_seconds: float = 0.0, emulators=None
+    ):
+        self.profile = profile
+        self.settle_seconds = settle_seconds
+        # board name -> BoardEmulator, their pressure follows the setpoints
+        self.emulators = emulators or {}
+        log_dir = profile.get("log_dir", DEFAULT_LOG_DIR)
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+
+        num_readings = int(profile["num_readings_per_pt"])
+        self.connection_manager = SerialConnectionManager(
+            baudrate=int(profile["baud_rate"])
+        )
+        # the async backend needs an event loop, so it falls back to a thread per board here
+        self.acquisition_pool = (
+            AcquisitionProcessPool(baudrate=int(profile["baud_rate"]))
+            if profile.get(
+                "acquisition_backend", stand_profiles.DEFAULT_ACQUISITION_BACKEND
+            )
+            == "process"
+            else None
+        )
+        self.log_writer = LogWriter(flush_policy=FlushPolicy(fsync_on_boundary=True))
+        # every sweep starts new log segments, see log_rotation.RotationPolicy
+        self.log_rotator = LogRotator()
+        self.calibration_store = CalibrationStore(os.path.join(log_dir, "cals.sqlite3"))
+
+        self.acquisitions: list[BoardAcquisition | ProcessBoardAcquisition] = []
+        self.readers: list[CalibrationReader] = []
+        self.loggers: list[Logger] = []
+        capacity = max(DEFAULT_RING_CAPACITY, 4 * num_readings)
+        for board in profile["boards"]:
+            board_log_dir = os.path.join(log_dir, stand_profiles.log_namespace(board))
+            os.makedirs(board_log_dir, exist_ok=True)
+            logger = Logger(
+                raw_data_filename=os.path.join(board_log_dir, "raw_readings.bin"),
+                avg_data_filename=os.path.join(board_log_dir, "avg_readings.csv"),
+                calibration_store=self.calibration_store,
+                num_sensors=int(board["pt_count"]),
+                board_name=board["name"],
+                writer=self.log_writer,
+                rotator=self.log_rotator,
+            )
+            if self.acquisition_pool:
+                acquisition = self.acquisition_pool.add_board(
+                    port=board["port"],
+                    num_sensors=int(board["pt_count"]),
+                    decode_batch_fn=batch_decoder(int(board["pt_count"])),
+                    stop_sequence=CONTROL_CHARACTERS,
+                    expected_payload_length=EXPECTED_PAYLOAD_LENGTH,
+                    capacity=capacity,
+                )
+            else:
+                self.connection_manager.register(board["port"])
+                acquisition = BoardAcquisition(
+                    port=board["port"],
+                    connection_manager=self.connection_manager,
+                    num_sensors=int(board["pt_count"]),
+                    decode_batch_fn=batch_decoder(int(board["pt_count"])),
+                    stop_sequence=CONTROL_CHARACTERS,
+                    expected_payload_length=EXPECTED_PAYLOAD_LENGTH,
+                    capacity=capacity,
+                )
+            reader = CalibrationReader(
+                acquisition=acquisition,
+                num_sensors=int(board["pt_count"]),
+                name=board["name"],
+                logger=logger,
+                num_readings_per_pt=num_readings,
+                target_standard_error=profile.get("target_standard_error"),
+                min_readings_per_pt=int(profile.get("min_readings_per_pt", 2)),
+            )
+            self.loggers.append(logger)
+            self.acquisitions.append(acquisition)
+            self.readers.append(reader)
+
+        self.point_durations: list[float] = []
+
+    def start(self) -> None:
+        if self.acquisition_pool:
+            self.acquisition_pool.start()
+            return
+
+        self.connection_manager.open_all()
+        for acquisition in self.acquisitions:
+            acquisition.start()
+
+    def close(self) -> None:
+        if self.acquisition_pool:
+            self.acquisition_pool.stop(timeout=1)
+        else:
+            for acquisition in self.acquisitions:
+                acquisition.stop(timeout=1)
+            self.connection_manager.close_all()
+        for logger in self.loggers:
+            logger.close()
+        self.log_writer.close()
+        self.log_rotator.close(timeout=LOG_ROTATOR_CLOSE_TIMEOUT)
+        self.calibration_store.close()
+
+    def take_point(self, pressure: float) -> None:
+        """collect one pressure point on every board at once"""
+        for emulator in self.emulators.values():
+            emulator.set_pressure(pressure)
+        if self.settle_seconds:
+            time.sleep(self.settle_seconds)
+
+        start = time.monotonic()
+        for reader in self.readers:
+            reader.start_pressure_point()
+
+        pending = list(self.readers)
+        while pending:
+            for reader in pending:
+                reader.readings_collected(timeout=0.1)
+            pending = [r for r in pending if not r.pressure_point_complete()]
+
+        for reader in self.readers:
+            reader.read_from_serial(current_pressure=pressure)
+            if reader.ready_for_avg():
+                reader.calculate_avg(pressure)
+
+        self.point_durations.append(time.monotonic() - start)
+
+    def summary(self) -> dict[str, Any]:
+        """fit every board, store the coefficients, and summarise the sweep"""
+        boards = []
+        for reader in self.readers:
+            coefficients = reader.get_all_linear_regressions()
+            regressions = cal.calculate_linear_regressions(
+                reader.samples.averages, reader.samples.pressures
+            )
+            boards.append(
+                {
+                    "name": reader.get_pt_name(),
+                    "port": reader.port,
+                    "coefficients": [list(coefficients[pt]) for pt in coefficients],
+                    "residuals": regressions["residuals"].tolist(),
+                    "slope_standard_errors": regressions[
+                        "slope_standard_errors"
+                    ].tolist(),
+                    "intercept_standard_errors": regressions[
+                        "intercept_standard_errors"
+                    ].tolist(),
+                    "points": reader.samples.points.tolist(),
+                    "readings_per_point": reader.samples.counts.tolist(),
+                }
+            )
+
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "num_points": len(self.point_durations),
+            "seconds_per_point": self.point_durations,
+            "boards": boards,
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Run a calibration sweep without the TUI",
+        epilog="Setpoints are pressures separated by whitespace or commas, - reads them from stdin",
+    )
+    parser.add_argument("profile", help="json profile of the boards")
+    parser.add_argument("setpoints", help="file of setpoints, or - for stdin")
+    parser.add_argument("--summary", help="json summary, defaults to the log dir")
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=0.0,
+        help="seconds to wait at every setpoint before sampling",
+    )
+    parser.add_argument(
+        "--emulate",
+        action="store_true",
+        help="run against emulated boards that follow the setpoints (POSIX only)",
+    )
+    parser.add_argument("--noise", type=float, default=1e-3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        profile = stand_profiles.load_profile(args.profile)
+    except (OSError, ValueError) as e:
+        print(f"Invalid profile: {e}", file=sys.stderr)
+        return 2
+
+    emulators = {}
+    if args.emulate:
+        from emulator.board_emulator import BoardEmulator, NoiseModel
+
+        for board in profile["boards"]:
+            emulator = BoardEmulator(
+                num_sensors=NUM_VALUES_PER_FRAME,
+                frame_rate=1000.0,
+                noise=NoiseModel(std=args.noise),
+                seed=args.seed,
+            )
+            board["port"] = emulator.open()
+            emulators[board["name"]] = emulator
+        # frames already in flight from the previous setpoint must not be counted
+        args.settle = max(args.settle, 0.05)
+    else:
+        try:
+            ports = stand_profiles.resolve_ports(profile)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            return 2
+
+        for board in profile["boards"]:
+            board["port"] = ports[board["name"]]
+
+    runner = HeadlessRunner(profile, settle_seconds=args.settle, emulators=emulators)
+    runner.start()
+    for emulator in emulators.values():
+        emulator.start()
+
+    try:
+        for pressure in read_setpoints(args.setpoints):
+            runner.take_point(pressure)
+            print(f"{pressure}: {runner.point_durations[-1]:.3f} s", file=sys.stderr)
+
+        if len(runner.point_durations) < 2:
+            print("At least 2 setpoints are needed for a fit", file=sys.stderr)
+            return 1
+
+        summary = runner.summary()
+    finally:
+        runner.close()
+        for emulator in emulators.values():
+            emulator.close()
+
+    summary["telemetry"] = [reader.get_telemetry() for reader in runner.readers]
+    summary_filename = args.summary or os.path.join(
+        runner.log_dir, time.strftime(SUMMARY_FILENAME_FORMAT)
+    )
+    os.makedirs(os.path.dirname(summary_filename) or ".", exist_ok=True)
+    with open(summary_filename, "w") as file:
+        json.dump(summary, file, indent=2)
+
+    for board in summary["boards"]:
+        print(board["name"])
+        for pt, (m, c) in enumerate(board["coefficients"]):
+            print(f"  PT {pt}: m={m} c={c}")
+    print(f"Summary saved to {summary_filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import gzip
+import lzma
+import os
+import struct
+import sys
+from typing import IO
+
+import numpy as np
+
+MAGIC = b"ACRAWLOG"
+VERSION = 1
+# fixed size so the records always start at the same offset, which keeps memory mapping simple
+HEADER_SIZE = 128
+# magic, version, sensor count, value dtype, board name length
+_HEADER_STRUCT = struct.Struct("<8sHH8sH")
+MAX_BOARD_NAME_LENGTH = HEADER_SIZE - _HEADER_STRUCT.size
+
+VALUE_DTYPE = "<f4"
+
+
+def record_dtype(num_sensors: int, value_dtype: str = VALUE_DTYPE) -> np.dtype:
+    """one record: wall clock timestamp in seconds, the pressure it was taken at, and the raw values"""
+    return np.dtype(
+        [
+            ("timestamp", "<f8"),
+            ("pressure", "<f4"),
+            ("values", value_dtype, (num_sensors,)),
+        ]
+    )
+
+
+def _pack_header(num_sensors: int, board_name: str, value_dtype: str) -> bytes:
+    name = board_name.encode()[:MAX_BOARD_NAME_LENGTH]
+    header = _HEADER_STRUCT.pack(
+        MAGIC, VERSION, num_sensors, value_dtype.encode(), len(name)
+    )
+    return (header + name).ljust(HEADER_SIZE, b"\0")
+
+
+def open_log(path: str) -> IO[bytes]:
+    """open a log for reading, decompressing it if it is a compressed segment (see log_rotation)"""
+    if path.endswith(".xz"):
+        return lzma.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_header(path: str) -> dict:
+    """returns the header fields of a binary raw log"""
+    with open_log(path) as file:
+        header = file.read(HEADER_SIZE)
+
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{path} is too short to be a raw log")
+
+    magic, version, num_sensors, value_dtype, name_length = _HEADER_STRUCT.unpack_from(
+        header
+    )
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a raw log, bad magic {magic!r}")
+
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported raw log version {version}")
+
+    name_start = _HEADER_STRUCT.size
+    return {
+        "version": version,
+        "num_sensors": num_sensors,
+        "value_dtype": value_dtype.rstrip(b"\0").decode(),
+        "board_name": header[name_start : name_start + name_length].decode(),
+    }
+
+
+def has_layout(path: str, num_sensors: int, value_dtype: str = VALUE_DTYPE) -> bool:
+    """whether records of this layout can be appended to the log, True if there is no log yet"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return True
+
+    try:
+        header = read_header(path)
+    except ValueError:
+        return False
+
+    return header["num_sensors"] == num_sensors and header["value_dtype"] == value_dtype
+
+
+class BinaryLogWriter:
+    """Append-only raw log made of a small header followed by fixed size records.
+
+    Records are written straight from NumPy arrays, nothing is formatted as text.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        num_sensors: int,
+        board_name: str,
+        value_dtype: str = VALUE_DTYPE,
+    ):
+        self.filename = filename
+        self.num_sensors = num_sensors
+        self.dtype = record_dtype(num_sensors, value_dtype)
+
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        if size > 0:
+            header = read_header(filename)
+            if (
+                header["num_sensors"] != num_sensors
+                or header["value_dtype"] != value_dtype
+            ):
+                logged = record_dtype(header["num_sensors"], header["value_dtype"])
+                if size - HEADER_SIZE >= logged.itemsize:
+                    raise ValueError(
+                        f"{filename} holds {header['num_sensors']} {header['value_dtype']} values per record, "
+                        f"but {num_sensors} {value_dtype} values were configured"
+                    )
+
+                # nothing was logged with the old layout, so its header is replaced
+                size = 0
+
+        if size > 0:
+            self.file = open(filename, "ab")
+            # drop a partially written record left behind by a crash so the records stay aligned
+            tail = (size - HEADER_SIZE) % self.dtype.itemsize
+            if tail:
+                self.file.truncate(size - tail)
+        else:
+            self.file = open(filename, "wb")
+            self.file.write(_pack_header(num_sensors, board_name, value_dtype))
+
+    def encode(
+        self, pressure: float, values: np.ndarray, timestamps: np.ndarray | float
+    ) -> bytes:
+        """the records for a (n, num_sensors) block of readings taken at one pressure"""
+        values = np.asarray(values).reshape(-1, self.num_sensors)
+        records = np.empty(values.shape[0], dtype=self.dtype)
+        records["timestamp"] = timestamps
+        records["pressure"] = pressure
+        records["values"] = values
+        return records.tobytes()
+
+    def write(
+        self, pressure: float, values: np.ndarray, timestamps: np.ndarray | float
+    ) -> None:
+        """append a (n, num_sensors) block of readings taken at one pressure"""
+        self.file.write(self.encode(pressure, values, timestamps))
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_binary_log(path: str) -> tuple[dict, np.ndarray]:
+    """memory map a raw log, returns (header, records) where records is a structured array"""
+    header = read_header(path)
+    dtype = record_dtype(header["num_sensors"], header["value_dtype"])
+    num_records = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+
+    if num_records == 0:
+        return header, np.empty(0, dtype=dtype)
+
+    return header, np.memmap(
+        path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(num_records,)
+    )
+
+
+def export_csv(path: str, csv_path: str, chunk_size: int = 100_000) -> int:
+    """write a raw log out in the CSV layout of the text logs (time in ms, pressure, values), returns the row count"""
+    _, records = read_binary_log(path)
+    with open(csv_path, "w") as file:
+        for start in range(0, records.shape[0], chunk_size):
+            chunk = records[start : start + chunk_size]
+            rows = np.column_stack(
+                [
+                    np.floor(chunk["timestamp"] * 1000),
+                    chunk["pressure"],
+                    chunk["values"],
+                ]
+            )
+            np.savetxt(
+                file,
+                rows,
+                delimiter=",",
+                fmt=["%d", "%g"] + ["%.7g"] * chunk["values"].shape[1],
+            )
+
+    return records.shape[0]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python binary_log.py <raw log> <output csv>")
+        sys.exit(1)
+
+    print(f"Exported {export_csv(sys.argv[1], sys.argv[2])} records")
@@ -0,0 +1,157 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calibrations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    board TEXT NOT NULL,
+    timestamp_ms INTEGER NOT NULL,
+    num_sensors INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calibrations_by_board_time
+    ON calibrations (board, timestamp_ms, id);
+CREATE TABLE IF NOT EXISTS coefficients (
+    calibration_id INTEGER NOT NULL REFERENCES calibrations (id),
+    sensor INTEGER NOT NULL,
+    slope REAL NOT NULL,
+    intercept REAL NOT NULL,
+    PRIMARY KEY (calibration_id, sensor)
+) WITHOUT ROWID;
+"""
+
+
+class CalibrationStore:
+    """Indexed history of calibration coefficients for every board, backed by sqlite.
+
+    Looking up the latest (or any past) set of coefficients for a board is an
+    index seek, so it does not depend on how many calibrations were stored.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        # the store is shared between the UI and the worker threads, the lock serialises access
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def store(
+        self,
+        board: str,
+        coefficients: list[tuple[float, float]],
+        timestamp_ms: int | None = None,
+    ) -> int:
+        """store a set of (m, c) pairs, one per sensor, returns the id of the calibration"""
+        invalid = [
+            sensor
+            for sensor, (m, c) in enumerate(coefficients)
+            if not (math.isfinite(m) and math.isfinite(c))
+        ]
+        if invalid:
+            raise ValueError(
+                f"Coefficients of sensors {invalid} of {board} are not finite, the calibration was not stored"
+            )
+
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time_ns() / 1_000_000)
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO calibrations (board, timestamp_ms, num_sensors) VALUES (?, ?, ?)",
+                (board, timestamp_ms, len(coefficients)),
+            )
+            calibration_id = cursor.lastrowid
+            self._connection.executemany(
+                "INSERT INTO coefficients (calibration_id, sensor, slope, intercept) VALUES (?, ?, ?, ?)",
+                [
+                    (calibration_id, sensor, float(m), float(c))
+                    for sensor, (m, c) in enumerate(coefficients)
+                ],
+            )
+
+        return int(calibration_id)
+
+    def latest(self, board: str) -> list[tuple[float, float]] | None:
+        """the most recent set of (m, c) pairs for the board, None if it was never calibrated"""
+        return self.at(board, None)
+
+    def at(
+        self, board: str, timestamp_ms: int | None
+    ) -> list[tuple[float, float]] | None:
+        """the set of (m, c) pairs that was in use at the given time (the latest one if None)"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id FROM calibrations WHERE board = ? AND timestamp_ms <= ? "
+                "ORDER BY timestamp_ms DESC, id DESC LIMIT 1",
+                (board, timestamp_ms if timestamp_ms is not None else 2**63 - 1),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            coefficients = self._connection.execute(
+                "SELECT slope, intercept FROM coefficients WHERE calibration_id = ? ORDER BY sensor",
+                (row[0],),
+            ).fetchall()
+
+        return [(float(m), float(c)) for m, c in coefficients]
+
+    def sensor_history(self, board: str, sensor: int) -> list[tuple[int, float, float]]:
+        """every (timestamp_ms, m, c) calibration of one sensor on the board, oldest first"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT calibrations.timestamp_ms, coefficients.slope, coefficients.intercept "
+                "FROM calibrations JOIN coefficients ON coefficients.calibration_id = calibrations.id "
+                "WHERE calibrations.board = ? AND coefficients.sensor = ? "
+                "ORDER BY calibrations.timestamp_ms, calibrations.id",
+                (board, sensor),
+            ).fetchall()
+
+        return [(int(t), float(m), float(c)) for t, m, c in rows]
+
+    def has_calibrations(self, board: str) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM calibrations WHERE board = ? LIMIT 1", (board,)
+            ).fetchone()
+
+        return row is not None
+
+    def import_legacy_csv(self, board: str, filename: str) -> int:
+        """import the old cals csv, where every calibration is an x (m) line followed by a y (c) line.
+        Returns the number of calibrations imported"""
+        if not os.path.exists(filename):
+            return 0
+
+        imported = 0
+        x_line = None
+        with open(filename) as file:
+            for line in file:
+                fields = line.strip().split(",")
+                if len(fields) < 3:
+                    continue
+
+                if fields[1] == "x":
+                    x_line = fields
+                elif fields[1] == "y" and x_line is not None:
+                    try:
+                        coefficients = [
+                            (float(m), float(c))
+                            for m, c in zip(x_line[2:], fields[2:], strict=True)
+                        ]
+                        self.store(board, coefficients, timestamp_ms=int(x_line[0]))
+                        imported += 1
+                    except ValueError:
+                        # skip malformed rows rather than failing the whole import
+                        pass
+
+                    x_line = None
+
+        return imported
@@ -0,0 +1,313 @@
+import gzip
+import lzma
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from typing import IO, Callable
+
+# suffix of the compressed segments, and how to open them for writing
+COMPRESSIONS: dict[str, Callable[[str], IO]] = {
+    # a low preset: on a Pi the higher ones compress ~3x slower for a few % smaller segments
+    ".xz": lambda path: lzma.open(path, "wb", preset=1),
+    ".gz": lambda path: gzip.open(path, "wb", compresslevel=6),
+}
+SEGMENT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+# compression runs in its own process: a compressing thread would keep taking the GIL back
+# from the loggers between every block it compresses. Spawned, like the acquisition workers
+START_METHOD = "spawn"
+# the compressor gives way to the acquisition workers when the cores are busy
+COMPRESSOR_NICENESS = 19
+
+
+class RotationPolicy:
+    """When the logs are rotated, and which closed segments are kept.
+
+    Args:
+        max_bytes: start a new segment before a log grows past this size, 0 disables it
+        rotate_on_start: start a new segment whenever a log is opened, so every session has its own
+        compression: ".xz", ".gz", or None to keep the closed segments as they are
+        keep_segments: the newest segments of a log to keep, 0 keeps them all
+        max_total_bytes: remove the oldest segments of a log while they take more than this, 0 disables it
+        max_age_days: remove segments older than this, 0 disables it
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        rotate_on_start: bool = True,
+        compression: str | None = ".xz",
+        keep_segments: int = 0,
+        max_total_bytes: int = 1024 * 1024 * 1024,
+        max_age_days: float = 0,
+    ):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression {compression}, expected one of {', '.join(COMPRESSIONS)}"
+            )
+
+        self.max_bytes = max_bytes
+        self.rotate_on_start = rotate_on_start
+        self.compression = compression
+        self.keep_segments = keep_segments
+        self.max_total_bytes = max_total_bytes
+        self.max_age_days = max_age_days
+
+
+def _segment_pattern(path: str) -> re.Pattern:
+    """matches the names of the closed segments of the log, compressed or not"""
+    stem, extension = os.path.splitext(os.path.basename(path))
+    return re.compile(
+        rf"{re.escape(stem)}\.(?P<time>\d{{8}}-\d{{6}})(-(?P<count>\d+))?{re.escape(extension)}"
+        rf"({'|'.join(re.escape(suffix) for suffix in COMPRESSIONS)})?"
+    )
+
+
+def segments(path: str) -> list[str]:
+    """the closed segments of the log, oldest first"""
+    directory = os.path.dirname(path) or "."
+    pattern = _segment_pattern(path)
+    matches = [
+        (match["time"], int(match["count"] or 0), os.path.join(directory, name))
+        for name in os.listdir(directory)
+        if (match := pattern.fullmatch(name))
+    ]
+    return [segment for *_, segment in sorted(matches)]
+
+
+def _segment_path(path: str) -> str:
+    """a new, unused name for a segment of the log, named after the time it was closed"""
+    stem, extension = os.path.splitext(path)
+    name = f"{stem}.{time.strftime(SEGMENT_TIME_FORMAT)}"
+    segment = f"{name}{extension}"
+    count = 1
+    while any(os.path.exists(f"{segment}{suffix}") for suffix in ["", *COMPRESSIONS]):
+        segment = f"{name}-{count}{extension}"
+        count += 1
+
+    return segment
+
+
+class RotatingLogFile:
+    """A log file that moves itself to a new segment once it is full.
+
+    It is what the log writer writes to in place of the file, so the rotation
+    happens on the writer's I/O thread, between two whole records: the loggers
+    keep submitting and never wait on it. Closed segments are handed over to the
+    rotator to be compressed and pruned.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        open_file: Callable[[], IO],
+        rotator: "LogRotator",
+        empty_size: int = 0,
+        can_append: Callable[[str], bool] | None = None,
+    ):
+        self.path = path
+        self.rotator = rotator
+        self._open_file = open_file
+        # the size of a log without any records, eg. the header of a binary log
+        self._empty_size = empty_size
+
+        # records that cannot be appended to, eg. of a binary log with another layout, are
+        # moved to a segment even without rotate_on_start. A log without records is reused
+        if (
+            os.path.exists(path)
+            and os.path.getsize(path) > empty_size
+            and (
+                rotator.policy.rotate_on_start
+                or (can_append is not None and not can_append(path))
+            )
+        ):
+            self._move_to_segment()
+
+        self.file = open_file()
+        self.size = self.file.tell()
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    def write(self, data: bytes | str) -> None:
+        max_bytes = self.rotator.policy.max_bytes
+        if max_bytes and self.size > self._empty_size:
+            if self.size + len(data) > max_bytes:
+                self.rotate()
+
+        self.file.write(data)
+        self.size += len(data)
+
+    def rotate(self) -> None:
+        """close the current segment and start a new one"""
+        self.file.close()
+        try:
+            self._move_to_segment()
+        finally:
+            # if the log could not be moved, the records keep going to it
+            self.file = self._open_file()
+            self.size = self.file.tell()
+
+    def _move_to_segment(self) -> None:
+        segment = _segment_path(self.path)
+        os.replace(self.path, segment)
+        self.rotator.segment_closed(self.path, segment)
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _lower_priority() -> None:
+    if hasattr(os, "nice"):
+        os.nice(COMPRESSOR_NICENESS)
+
+
+def compress_segment(segment: str, compression: str) -> int:
+    """runs in the compressor process: replaces the segment by its compressed copy, returns its size"""
+    compressed = f"{segment}{compression}"
+    temporary = f"{compressed}.tmp"
+    with (
+        open(segment, "rb") as source,
+        COMPRESSIONS[compression](temporary) as destination,
+    ):
+        shutil.copyfileobj(source, destination, length=1024 * 1024)
+
+    # the uncompressed segment is only removed once its compressed copy is complete
+    os.replace(temporary, compressed)
+    os.remove(segment)
+    return os.path.getsize(compressed)
+
+
+class LogRotator(threading.Thread):
+    """Compresses the closed segments of the logs, and prunes them, in the background.
+
+    Compression is the slow part of rotating, so it never runs on the log
+    writer's I/O thread, let alone on the acquisition path: this thread hands
+    every segment to a compressor process and waits for it. The process is only
+    started once there is something to compress. Segments that were left
+    uncompressed by an earlier run are picked up when their log is opened again.
+    """
+
+    def __init__(self, policy: RotationPolicy | None = None):
+        super().__init__(name="log-rotator", daemon=True)
+        self.policy = policy if policy else RotationPolicy()
+        self._queue: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._compressor = None
+        self._stats = {
+            "rotations": 0,
+            "compressed_segments": 0,
+            "compressed_bytes": 0,
+            "removed_segments": 0,
+            "errors": 0,
+        }
+        self.start()
+
+    def open(
+        self,
+        path: str,
+        open_file: Callable[[], IO],
+        empty_size: int = 0,
+        can_append: Callable[[str], bool] | None = None,
+    ) -> RotatingLogFile:
+        """open a log, after rotating away what an earlier run left in it if the policy asks
+        for it, or if `can_append` says the new records cannot be appended to it"""
+        for segment in segments(path):
+            if self.policy.compression and not segment.endswith(tuple(COMPRESSIONS)):
+                self._queue.put((path, segment))
+
+        return RotatingLogFile(path, open_file, self, empty_size, can_append)
+
+    def segment_closed(self, path: str, segment: str) -> None:
+        """called by a rotating log, on the log writer's thread, for every segment it closes"""
+        with self._lock:
+            self._stats["rotations"] += 1
+        self._queue.put((path, segment))
+
+    def close(self, timeout: float | None = None) -> None:
+        """stop once the segment being compressed is done, or once the timeout runs out.
+        What is left is compressed on the next start"""
+        self._stopping.set()
+        self._queue.put(None)
+        self.join(timeout)
+
+        with self._lock:
+            if self._compressor:
+                # a segment cut short is compressed again from the start next time
+                self._compressor.terminate()
+                self._compressor = None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            item = self._queue.get()
+            if item is None:
+                return
+
+            path, segment = item
+            try:
+                if self.policy.compression and os.path.exists(segment):
+                    self._compress(segment)
+                self._prune(path)
+            except OSError:
+                with self._lock:
+                    self._stats["errors"] += 1
+
+    def _compress(self, segment: str) -> None:
+        with self._lock:
+            if self._stopping.is_set():
+                return
+
+            if self._compressor is None:
+                self._compressor = multiprocessing.get_context(START_METHOD).Pool(
+                    1, initializer=_lower_priority
+                )
+            result = self._compressor.apply_async(
+                compress_segment, (segment, self.policy.compression)
+            )
+
+        size = result.get()
+        with self._lock:
+            self._stats["compressed_segments"] += 1
+            self._stats["compressed_bytes"] += size
+
+    def _prune(self, path: str) -> None:
+        """remove the oldest segments of the log that the retention policy does not keep"""
+        policy = self.policy
+        remaining = segments(path)
+        removed = []
+        if policy.keep_segments and len(remaining) > policy.keep_segments:
+            removed += remaining[: -policy.keep_segments]
+            remaining = remaining[-policy.keep_segments :]
+
+        if policy.max_age_days:
+            oldest = time.time() - policy.max_age_days * 24 * 60 * 60
+            removed += [
+                segment for segment in remaining if os.path.getmtime(segment) < oldest
+            ]
+            remaining = [segment for segment in remaining if segment not in removed]
+
+        if policy.max_total_bytes:
+            total = sum(os.path.getsize(segment) for segment in remaining)
+            while remaining and total > policy.max_total_bytes:
+                total -= os.path.getsize(remaining[0])
+                removed.append(remaining.pop(0))
+
+        for segment in removed:
+            os.remove(segment)
+        with self._lock:
+            self._stats["removed_segments"] += len(removed)
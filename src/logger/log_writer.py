@@ -0,0 +1,228 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import IO, Any
+
+# control items that can be queued next to the writes
+_BOUNDARY = object()
+_STOP = object()
+
+
+class FlushPolicy:
+    """When the log writer flushes its files.
+
+    Args:
+        every_n_records: flush after this many records were written, 0 disables it
+        interval: flush when this many seconds passed since the last flush, 0 disables it
+        fsync_on_boundary: fsync the files at every pressure point boundary, not just flush them
+    """
+
+    def __init__(
+        self,
+        every_n_records: int = 1000,
+        interval: float = 1.0,
+        fsync_on_boundary: bool = True,
+    ):
+        self.every_n_records = every_n_records
+        self.interval = interval
+        self.fsync_on_boundary = fsync_on_boundary
+
+
+class LogWriter(threading.Thread):
+    """Writes queued log records in batches on a dedicated I/O thread.
+
+    Any thread can `submit` records, which never waits on the disk unless the
+    queue is full. A slow SD card then only shows up in the backpressure stats
+    instead of stalling acquisition.
+    """
+
+    def __init__(
+        self,
+        flush_policy: FlushPolicy | None = None,
+        max_queue_size: int = 10_000,
+        batch_size: int = 256,
+    ):
+        super().__init__(name="log-writer", daemon=True)
+        self.flush_policy = flush_policy if flush_policy else FlushPolicy()
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._dirty_files: set[IO] = set()
+        self._unsynced_files: set[IO] = set()
+        self._records_since_flush = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted_records": 0,
+            "written_records": 0,
+            "written_bytes": 0,
+            "max_queue_depth": 0,
+            "full_queue_waits": 0,
+            "full_queue_wait_seconds": 0.0,
+            "flushes": 0,
+            "fsyncs": 0,
+            "write_errors": 0,
+        }
+
+        self.start()
+        # drain whatever is still queued if the program exits without closing the writer
+        atexit.register(self.close)
+
+    def submit(self, file: IO, data: bytes | str) -> None:
+        """queue data to be written to the file"""
+        self._put((file, data))
+        with self._stats_lock:
+            self._stats["submitted_records"] += 1
+
+    def submit_close(self, file: IO) -> None:
+        """close the file once everything queued before this call has been written"""
+        self._put((file, None))
+
+    def mark_boundary(self) -> None:
+        """mark the end of a pressure point, the files are synced to disk here if the policy asks for it"""
+        self._put(_BOUNDARY)
+
+    def sync(self, timeout: float | None = None) -> bool:
+        """block until everything submitted so far has been written and flushed"""
+        if self._closed:
+            return True
+
+        done = threading.Event()
+        self._put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """write out everything that is queued, then stop the I/O thread"""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put(_STOP)
+        self.join(timeout)
+        atexit.unregister(self.close)
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+    def _put(self, item) -> None:
+        if self._closed:
+            raise RuntimeError("Cannot log to a closed log writer")
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # backpressure: wait for the I/O thread to catch up, and record how long it took
+            start = time.monotonic()
+            self._queue.put(item)
+            with self._stats_lock:
+                self._stats["full_queue_waits"] += 1
+                self._stats["full_queue_wait_seconds"] += time.monotonic() - start
+
+        depth = self._queue.qsize()
+        if depth > self._stats["max_queue_depth"]:
+            with self._stats_lock:
+                self._stats["max_queue_depth"] = max(
+                    self._stats["max_queue_depth"], depth
+                )
+
+    def run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self._time_until_flush())
+            except queue.Empty:
+                self._flush(fsync=False)
+                continue
+
+            # take whatever else is already queued so it is written as one batch
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for item in batch:
+                if item is _STOP:
+                    self._flush(fsync=True)
+                    return
+
+                self._handle(item)
+
+            if self._dirty_files and self._should_flush():
+                self._flush(fsync=False)
+
+    def _handle(self, item) -> None:
+        if item is _BOUNDARY:
+            self._flush(fsync=self.flush_policy.fsync_on_boundary)
+        elif isinstance(item, threading.Event):
+            self._flush(fsync=False)
+            item.set()
+        else:
+            file, data = item
+            try:
+                if data is None:
+                    self._dirty_files.discard(file)
+                    self._unsynced_files.discard(file)
+                    file.close()
+                    return
+
+                file.write(data)
+            except (OSError, ValueError):
+                with self._stats_lock:
+                    self._stats["write_errors"] += 1
+                return
+
+            self._dirty_files.add(file)
+            self._unsynced_files.add(file)
+            self._records_since_flush += 1
+            with self._stats_lock:
+                self._stats["written_records"] += 1
+                self._stats["written_bytes"] += len(data)
+
+    def _should_flush(self) -> bool:
+        policy = self.flush_policy
+        if (
+            policy.every_n_records
+            and self._records_since_flush >= policy.every_n_records
+        ):
+            return True
+
+        return bool(
+            policy.interval and time.monotonic() - self._last_flush >= policy.interval
+        )
+
+    def _time_until_flush(self) -> float | None:
+        if not self.flush_policy.interval or not self._dirty_files:
+            return None
+
+        return max(
+            0.0, self.flush_policy.interval - (time.monotonic() - self._last_flush)
+        )
+
+    def _flush(self, fsync: bool) -> None:
+        # files flushed earlier still need to be synced if they were written since the last fsync
+        for file in self._unsynced_files if fsync else self._dirty_files:
+            try:
+                file.flush()
+                if fsync:
+                    os.fsync(file.fileno())
+            except (OSError, ValueError):
+                with self._stats_lock:
+                    self._stats["write_errors"] += 1
+
+        with self._stats_lock:
+            self._stats["flushes"] += 1
+            if fsync:
+                self._stats["fsyncs"] += 1
+
+        if fsync:
+            self._unsynced_files.clear()
+        self._dirty_files.clear()
+        self._records_since_flush = 0
+        self._last_flush = time.monotonic()
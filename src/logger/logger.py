@@ -1,4 +1,12 @@
-import time, os
+import time
+from typing import IO
+
+import numpy as np
+
+from logger.binary_log import HEADER_SIZE, BinaryLogWriter, has_layout
+from logger.calibration_store import CalibrationStore
+from logger.log_rotation import LogRotator, RotatingLogFile
+from logger.log_writer import LogWriter
 
 
 class Logger:
@@ -6,107 +14,99 @@ class Logger:
         self,
         raw_data_filename: str,
         avg_data_filename: str,
-        stored_calibration_filename: str,
+        calibration_store: CalibrationStore,
+        num_sensors: int,
+        board_name: str,
+        writer: LogWriter,
+        rotator: LogRotator | None = None,
     ):
-        """raw data records all the readings, avg data records the averaged value"""
-        self.stored_cals_filename = stored_calibration_filename
-
-        # try to create the new file if it does not yet exist
-        try:
-            file = open(raw_data_filename, "x")
-            file.close()
-        except FileExistsError:
-            pass
-
-        try:
-            file = open(avg_data_filename, "x")
-            file.close()
-        except FileExistsError:
-            pass
-
-        try:
-            file = open(stored_calibration_filename, "x")
-            file.close()
-        except FileExistsError:
-            pass
-
-        self.raw_data_file = open(raw_data_filename, "a")
-        self.avg_data_file = open(avg_data_filename, "a")
-        self.stored_cals_file = open(stored_calibration_filename, "a")
-
-    def __del__(self):
-        self.raw_data_file.close()
-        self.avg_data_file.close()
-        self.stored_cals_file.close()
+        """raw data records all the readings (binary, see binary_log), avg data records the averaged value.
+        All writes go through the writer's I/O thread, so logging never waits on the disk.
+        With a rotator, both logs are rotated and their old segments compressed per its policy.
+        Calibrations are kept per board in the indexed calibration store
+        """
+        self.calibration_store = calibration_store
+        self.board_name = board_name
+        self.writer = writer
+        # readings are timestamped with the monotonic clock, this converts them to wall clock time
+        self._monotonic_offset = time.time() - time.monotonic()
+
+        self.raw_data_log: BinaryLogWriter
+
+        def open_raw_data_file() -> IO:
+            # the raw log is binary so that the hot path never formats text
+            self.raw_data_log = BinaryLogWriter(
+                raw_data_filename, num_sensors, board_name
+            )
+            return self.raw_data_log.file
+
+        def open_avg_data_file() -> IO:
+            return open(avg_data_filename, "a")
+
+        self.raw_data_file: IO | RotatingLogFile
+        self.avg_data_file: IO | RotatingLogFile
+        if rotator:
+            # every segment of the raw log starts with its own header, and a log of another
+            # PT count is rotated away rather than appended to
+            self.raw_data_file = rotator.open(
+                raw_data_filename,
+                open_raw_data_file,
+                empty_size=HEADER_SIZE,
+                can_append=lambda path: has_layout(path, num_sensors),
+            )
+            self.avg_data_file = rotator.open(avg_data_filename, open_avg_data_file)
+        else:
+            self.raw_data_file = open_raw_data_file()
+            self.avg_data_file = open_avg_data_file()
+
+    def close(self) -> None:
+        """the files are closed by the writer once everything queued for them is written"""
+        self.writer.submit_close(self.raw_data_file)
+        self.writer.submit_close(self.avg_data_file)
 
     def _get_time(self) -> int:
         return int(time.time_ns() / 1_000_000)
 
-    def log_raw_data(self, text: str):
-        self.raw_data_file.write(f"{self._get_time()},{text}\n")
-        self.raw_data_file.flush()
+    def log_raw_data(
+        self, pressure: float, values: np.ndarray, timestamps: np.ndarray
+    ) -> None:
+        """log a (n, num_sensors) block of raw readings, timestamps are from time.monotonic"""
+        self.writer.submit(
+            self.raw_data_file,
+            self.raw_data_log.encode(
+                pressure, values, timestamps + self._monotonic_offset
+            ),
+        )
 
     def log_avg_data(self, text: str):
-        self.avg_data_file.write(f"{self._get_time()},{text}\n")
-        self.avg_data_file.flush()
-
-    def log_cals(self, text: str):
-        self.stored_cals_file.write(f"{self._get_time()},{text}\n")
-        self.stored_cals_file.flush()
-
-    def get_latest_set_of_cals(self, num_sensors: int) -> list[tuple[float, float]]:
-        self.stored_cals_file.flush()
-        self.stored_cals_file.close()
-
-        x_line = None
-        y_line = None
-
-        with open(self.stored_cals_filename, "rb") as file:
-            # read the last 2 lines for calibrations
-            # start by finding the last line
-            try:
-                # -2 first to skip the newline that is at the back of the last line
-                file.seek(-2, os.SEEK_END)
-
-                # coeffs are written in 2 lines, first x then y
+        self.writer.submit(self.avg_data_file, f"{self._get_time()},{text}\n")
 
-                # this gets the last line
-                while file.read(1) != b"\n":
-                    file.seek(-2, os.SEEK_CUR)
+    def log_cals(self, coefficients: list[tuple[float, float]]) -> None:
+        """store a set of (m, c) pairs, one per sensor"""
+        self.calibration_store.store(self.board_name, coefficients, self._get_time())
 
-                file.seek(-2, os.SEEK_CUR)
-                # this gets the second last line
-                while file.read(1) != b"\n":
-                    file.seek(-2, os.SEEK_CUR)
+    def mark_pressure_point_boundary(self) -> None:
+        """everything logged for a pressure point is written, the flush policy decides if it is synced"""
+        self.writer.mark_boundary()
 
-            except OSError:
-                file.seek(0)
-
-            x_line = file.readline().decode()
-            y_line = file.readline().decode()
-
-        if not x_line or not y_line:
-            raise Exception("Cannot read calibration values")
-
-        # parse the calibration lines
-        x_vals = x_line[:-1].split(",")[2:]
-        y_vals = y_line[:-1].split(",")[2:]
-
-        assert (
-            len(x_vals) == len(y_vals)
-            and f"Number calculated coeffs does not match. Number of m_vals {x_vals} | Number of c_vals {y_vals}"
-        )
-
-        assert (
-            len(x_vals) == num_sensors
-            and f"Number of sensors does not match the number of values obtained. Num sensors {num_sensors} | Num calibrated values {x_vals}"
-        )
+    def get_latest_set_of_cals(self, num_sensors: int) -> list[tuple[float, float]]:
+        coefficients = self.calibration_store.latest(self.board_name)
+        if not coefficients:
+            raise Exception(f"No calibration values stored for {self.board_name}")
 
-        self.stored_cals_file = open(self.stored_cals_filename, "a")
+        if len(coefficients) != num_sensors:
+            raise Exception(
+                f"Number of sensors does not match the number of values obtained. Num sensors {num_sensors} | Num calibrated values {len(coefficients)}"
+            )
 
-        return [(float(m), float(c)) for m, c in zip(x_vals, y_vals)]
+        return coefficients
 
 
 if __name__ == "__main__":
-    log = Logger("../../test.csv", "../../test2.csv", "outcals.csv")
+    writer = LogWriter()
+    store = CalibrationStore("outcals.sqlite3")
+    log = Logger("../../test.bin", "../../test2.csv", store, 8, "test", writer)
     log.log_avg_data("sheesh")
+    log.close()
+    writer.close()
+    store.close()
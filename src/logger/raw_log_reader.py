@@ -0,0 +1,98 @@
+import itertools
+from typing import Iterator
+
+import numpy as np
+
+from logger.binary_log import HEADER_SIZE, MAGIC, open_log, read_header, record_dtype
+
+DEFAULT_CHUNK_SIZE = 250_000
+
+
+def is_binary_log(path: str) -> bool:
+    with open_log(path) as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def _parse_csv_lines(lines: list[str]) -> tuple[np.ndarray, int]:
+    """rows of the csv lines, and the number of malformed lines that were skipped"""
+    try:
+        return np.loadtxt(lines, delimiter=",", ndmin=2), 0
+    except ValueError:
+        pass
+
+    # a line cut short by a crash, or a line with a different number of PTs: parse line by line
+    rows = []
+    for line in lines:
+        try:
+            rows.append([float(value) for value in line.split(",")])
+        except ValueError:
+            continue
+
+    width = max((len(row) for row in rows), default=0)
+    rows = [row for row in rows if len(row) == width]
+    return np.array(rows).reshape(len(rows), width), len(lines) - len(rows)
+
+
+class RawLogReader:
+    """
+    Reads a binary or csv raw log in chunks of (timestamps in s, pressures, values).
+    Compressed segments of rotated logs are decompressed on the fly.
+
+    `offset` skips what an earlier reader already read: records of a binary log, or
+    bytes of a csv log. After every chunk, `position` is where the next reader of the
+    same log should start, so a log that keeps growing can be read a bit at a time.
+    A record or line that is still being written is left for the next reader.
+    """
+
+    def __init__(
+        self, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.binary = is_binary_log(path)
+        self.board_name: str | None = None
+        self.num_sensors: int | None = None
+        self.skipped_rows = 0
+        self.position = offset
+
+    def chunks(self) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        if self.binary:
+            yield from self._binary_chunks()
+        else:
+            yield from self._csv_chunks()
+
+    def _binary_chunks(self) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        header = read_header(self.path)
+        self.board_name = header["board_name"]
+        self.num_sensors = header["num_sensors"]
+        dtype = record_dtype(header["num_sensors"], header["value_dtype"])
+        # read rather than memory mapped, so pages of chunks already read do not stay
+        # resident, and so compressed segments are read the same way
+        with open_log(self.path) as file:
+            file.seek(HEADER_SIZE + self.position * dtype.itemsize)
+            while data := file.read(self.chunk_size * dtype.itemsize):
+                count = len(data) // dtype.itemsize
+                if count:
+                    chunk = np.frombuffer(data, dtype=dtype, count=count)
+                    self.position += count
+                    yield chunk["timestamp"], chunk["pressure"], chunk["values"]
+                if count * dtype.itemsize < len(data):
+                    # the record being written is left for the next reader
+                    return
+
+    def _csv_chunks(self) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        with open_log(self.path) as file:
+            file.seek(self.position)
+            while lines := list(itertools.islice(file, self.chunk_size)):
+                if not lines[-1].endswith(b"\n"):
+                    lines.pop()
+                    if not lines:
+                        return
+
+                self.position += sum(len(line) for line in lines)
+                rows, skipped = _parse_csv_lines([line.decode() for line in lines])
+                self.skipped_rows += skipped
+                if rows.shape[1] < 3:
+                    continue
+
+                yield rows[:, 0] / 1000, rows[:, 1], rows[:, 2:]
@@ -1,29 +1,46 @@
 import os
-import struct
 import sys
-from threading import Lock
+import time
 
-from cli import cli
-from config import config_setter
-from logger.logger import Logger
+from config import config_setter, stand_profiles
 
-HV = "High Voltage"
-LV = "Low Voltage"
+# the boards offered when the set-up is answered by hand
+DEFAULT_BOARDS = ["High Voltage", "Low Voltage"]
 
-RAW_DATA_LV_FILENAME = "logs/raw_readings_lv.csv"
-AVG_DATA_LV_FILENAME = "logs/avg_readings_lv.csv"
-CAL_COEFFS_LV_FILENAME = "logs/cals_lv.csv"
+# every board logs into its own directory under the stand's log_dir, LOG_DIR unless the
+# stand profile sets it, see stand_profiles.log_namespace
+LOG_DIR = "logs"
+RAW_DATA_FILENAME = "raw_readings.bin"
+AVG_DATA_FILENAME = "avg_readings.csv"
 
-RAW_DATA_HV_FILENAME = "logs/raw_readings_hv.csv"
-AVG_DATA_HV_FILENAME = "logs/avg_readings_hv.csv"
-CAL_COEFFS_HV_FILENAME = "logs/cals_hv.csv"
+# legacy csv calibrations of the original boards, imported into the calibration store on first run
+LEGACY_CAL_COEFFS_FILENAMES = {
+    "High Voltage": "logs/cals_hv.csv",
+    "Low Voltage": "logs/cals_lv.csv",
+}
 
-CONTROL_CHARACTERS = b"\r\n"
+# the calibrations of every board, in the log dir
+CALIBRATION_STORE_FILENAME = "cals.sqlite3"
+
+# named stand profiles, and the stand (and ports) used last time. The last stand is read
+# before a stand is picked, so it is always kept in LOG_DIR
+STAND_PROFILES_FILENAME = "stands.json"
+LAST_STAND_FILENAME = "logs/last_stand.json"
+
+# how long exiting waits for the segment being compressed, the rest is compressed on the next start
+LOG_ROTATOR_CLOSE_TIMEOUT = 5.0
+
+# acquisition counters of every session, one file per session in the log dir
+TELEMETRY_FILENAME_FORMAT = "telemetry_%Y%m%d_%H%M%S.json"
 
 
 def main() -> None:
     # first get the config params
-    config = config_setter.Config(hv=HV, lv=LV)
+    config = config_setter.Config(
+        default_boards=DEFAULT_BOARDS,
+        stand_profiles_filename=STAND_PROFILES_FILENAME,
+        last_stand_filename=LAST_STAND_FILENAME,
+    )
 
     answers = None
 
@@ -41,42 +58,97 @@ def main() -> None:
         print("No PTs to calibrate. Exiting.")
         sys.exit(1)
 
+    # numpy, pyserial and the TUI are only imported once the prompts are answered,
+    # so the first prompt is not held up by them (see benchmarks/import_time.py)
+    from cli import cli
+    from logger.calibration_store import CalibrationStore
+    from logger.log_rotation import LogRotator, RotationPolicy
+    from logger.log_writer import FlushPolicy, LogWriter
+    from logger.logger import Logger
+    from serial_reader.connection_manager import SerialConnectionManager
+    from serial_reader.protocol import (
+        CONTROL_CHARACTERS,
+        EXPECTED_PAYLOAD_LENGTH,
+        batch_decoder,
+    )
+
+    # one long-lived serial handle per port, shared by every reader of that port
+    connection_manager = SerialConnectionManager(baudrate=int(answers["baud_rate"]))
+
+    # all the log files are written on one I/O thread, synced to disk after every pressure point
+    log_writer = LogWriter(
+        flush_policy=FlushPolicy(
+            every_n_records=1000, interval=1.0, fsync_on_boundary=True
+        )
+    )
+
+    # every session starts new log segments, closed segments are compressed in the background
+    # and the oldest removed, so the logs do not fill the SD card over a season of testing
+    log_rotator = LogRotator(
+        RotationPolicy(
+            max_bytes=64 * 1024 * 1024,
+            rotate_on_start=True,
+            compression=".xz",
+            max_total_bytes=1024 * 1024 * 1024,
+        )
+    )
+
+    log_dir = answers.get("log_dir", LOG_DIR)
+    os.makedirs(log_dir, exist_ok=True)
+    calibration_store = CalibrationStore(
+        os.path.join(log_dir, CALIBRATION_STORE_FILENAME)
+    )
+
     for config in answers["pt_configs"]:
-        config["serial_lock"] = Lock()
+        if (
+            not calibration_store.has_calibrations(config["name"])
+            and config["name"] in LEGACY_CAL_COEFFS_FILENAMES
+        ):
+            calibration_store.import_legacy_csv(
+                config["name"], LEGACY_CAL_COEFFS_FILENAMES[config["name"]]
+            )
+
+        board_log_dir = os.path.join(log_dir, stand_profiles.log_namespace(config))
+        os.makedirs(board_log_dir, exist_ok=True)
+
         config["logger"] = Logger(
-            raw_data_filename=(
-                RAW_DATA_HV_FILENAME if config["name"] == HV else RAW_DATA_LV_FILENAME
-            ),
-            avg_data_filename=(
-                AVG_DATA_HV_FILENAME if config["name"] == HV else AVG_DATA_LV_FILENAME
-            ),
-            stored_calibration_filename=(
-                CAL_COEFFS_HV_FILENAME
-                if config["name"] == HV
-                else CAL_COEFFS_LV_FILENAME
-            ),
+            raw_data_filename=os.path.join(board_log_dir, RAW_DATA_FILENAME),
+            avg_data_filename=os.path.join(board_log_dir, AVG_DATA_FILENAME),
+            calibration_store=calibration_store,
+            num_sensors=config["pt_count"],
+            board_name=config["name"],
+            writer=log_writer,
+            rotator=log_rotator,
         )
         config["stop_sequence"] = CONTROL_CHARACTERS
-        config["decode_fn"] = decode_fn
-        config["expected_payload_length"] = 32 + 2  # 4 floats and 2 escape characters
+        # the boards always send full frames, only the first pt_count values are used
+        config["decode_batch_fn"] = batch_decoder(config["pt_count"])
+        config["expected_payload_length"] = EXPECTED_PAYLOAD_LENGTH
 
     app = cli.AutoCalCli(
         pt_configs=answers["pt_configs"],
+        connection_manager=connection_manager,
         num_readings_per_pressure=int(answers["num_readings_per_pt"]),
-        baudrate=answers["baud_rate"],
-        hv=HV,
-        lv=LV,
+        target_standard_error=answers.get("target_standard_error"),
+        min_readings_per_pressure=int(answers.get("min_readings_per_pt", 2)),
+        telemetry_filename=os.path.join(
+            log_dir, time.strftime(TELEMETRY_FILENAME_FORMAT)
+        ),
+        acquisition_backend=answers.get(
+            "acquisition_backend", stand_profiles.DEFAULT_ACQUISITION_BACKEND
+        ),
     )
-    app.run()
-
-
-def decode_fn(line: bytes) -> list[float]:
-    """Dont do error handling, let the callers do it, since their error handling logic is quite different"""
-    # first remove the control characters
-    line = line.removesuffix(CONTROL_CHARACTERS)
-    return list(struct.unpack("8f", line))
+    try:
+        app.run()
+    finally:
+        # drain everything that is still queued before exiting
+        for config in answers["pt_configs"]:
+            config["logger"].close()
+        log_writer.close()
+        log_rotator.close(timeout=LOG_ROTATOR_CLOSE_TIMEOUT)
+        calibration_store.close()
 
 
 if __name__ == "__main__":
-    os.makedirs("logs", exist_ok=True)
+    os.makedirs(LOG_DIR, exist_ok=True)
     main()
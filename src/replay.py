@@ -0,0 +1,294 @@
+"""
+Recompute calibrations from raw logs, eg. when a calibration looks wrong afterwards.
+
+    python src/replay.py logs/High-Voltage/raw_readings.bin
+    python src/replay.py logs/raw_readings_hv.csv --exclude-pressure 300
+    python src/replay.py raw_readings.bin --start 2026-10-18T09:00 --end 2026-10-18T10:30 \\
+        --exclude-time 2026-10-18T09:40 2026-10-18T09:45
+
+Binary raw logs (see logger/binary_log.py) and the csv raw logs of older versions (time in ms,
+pressure, values) are read in chunks, so logs of any size are replayed in constant memory.
+Every sample is grouped by the pressure it was logged at, and the groups are averaged and fitted
+the same way as during a calibration. Times are ISO dates in local time, or unix timestamps.
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+
+from cal import cal
+from logger.raw_log_reader import DEFAULT_CHUNK_SIZE, RawLogReader
+
+
+def parse_time(value: str) -> float:
+    """unix timestamp in seconds, from a timestamp or an ISO date in local time"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class PressureGroups:
+    """
+    Running per pressure statistics of the samples of a log, added one chunk at a time.
+
+    Samples are grouped by the exact pressure they were logged at, with np.unique
+    and bincount per sensor, so nothing but the count, mean and sum of squared
+    deviations (M2) of every group is kept between chunks. Chunks are merged with
+    Chan's parallel update, like cal.RunningStatistics, which stays accurate for
+    readings with a large offset and a tiny spread.
+    """
+
+    def __init__(self, num_sensors: int):
+        self.num_sensors = num_sensors
+        self.pressures = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.means = np.empty((0, num_sensors))
+        self.m2 = np.empty((0, num_sensors))
+        self.first_timestamps = np.empty(0)
+        self.last_timestamps = np.empty(0)
+
+    def add(
+        self, timestamps: np.ndarray, pressures: np.ndarray, values: np.ndarray
+    ) -> None:
+        if len(pressures) == 0:
+            return
+
+        keys, inverse = np.unique(pressures, return_inverse=True)
+        groups = len(keys)
+        values = np.asarray(values, dtype=np.float64)
+        chunk_counts = np.bincount(inverse, minlength=groups)
+        # the deviations are taken from the mean of the chunk, never squared raw readings
+        means = self._group_sums(inverse, values, groups) / chunk_counts[:, np.newaxis]
+        m2 = self._group_sums(inverse, (values - means[inverse]) ** 2, groups)
+        first = np.full(groups, np.inf)
+        np.minimum.at(first, inverse, timestamps)
+        last = np.full(groups, -np.inf)
+        np.maximum.at(last, inverse, timestamps)
+
+        # merge into the groups of the previous chunks
+        merged = np.union1d(self.pressures, keys)
+        old = np.searchsorted(merged, self.pressures)
+        new = np.searchsorted(merged, keys)
+
+        counts = np.zeros(len(merged), dtype=np.int64)
+        counts[old] = self.counts
+        merged_means = np.zeros((len(merged), self.num_sensors))
+        merged_means[old] = self.means
+        merged_m2 = np.zeros((len(merged), self.num_sensors))
+        merged_m2[old] = self.m2
+
+        # Chan's update, a group that is new in this chunk just takes the chunk's statistics
+        previous = counts[new][:, np.newaxis]
+        added = chunk_counts[:, np.newaxis]
+        total = previous + added
+        delta = means - merged_means[new]
+        merged_means[new] += delta * added / total
+        merged_m2[new] += m2 + delta**2 * previous * added / total
+        counts[new] = total[:, 0]
+        merged_first = np.full(len(merged), np.inf)
+        merged_first[old] = self.first_timestamps
+        merged_first[new] = np.minimum(merged_first[new], first)
+        merged_last = np.full(len(merged), -np.inf)
+        merged_last[old] = self.last_timestamps
+        merged_last[new] = np.maximum(merged_last[new], last)
+
+        self.pressures = merged
+        self.counts = counts
+        self.means = merged_means
+        self.m2 = merged_m2
+        self.first_timestamps = merged_first
+        self.last_timestamps = merged_last
+
+    def _group_sums(
+        self, inverse: np.ndarray, values: np.ndarray, groups: int
+    ) -> np.ndarray:
+        """(groups, num_sensors) sums of the values of every group"""
+        return np.column_stack(
+            [
+                np.bincount(inverse, weights=values[:, sensor], minlength=groups)
+                for sensor in range(self.num_sensors)
+            ]
+        )
+
+    def averages(self) -> np.ndarray:
+        """(n_points, num_sensors) mean reading of every pressure"""
+        return self.means.copy()
+
+    def standard_deviations(self) -> np.ndarray:
+        """(n_points, num_sensors) population standard deviation of the readings of every pressure"""
+        return np.sqrt(self.m2 / self.counts[:, np.newaxis])
+
+
+def replay(
+    reader: RawLogReader,
+    start: float | None = None,
+    end: float | None = None,
+    exclude_times: list[tuple[float, float]] | None = None,
+    exclude_pressures: list[float] | None = None,
+) -> PressureGroups | None:
+    """group every sample of the log that is not excluded by pressure, None if none is left"""
+    groups = None
+    for timestamps, pressures, values in reader.chunks():
+        keep = np.all(np.isfinite(values), axis=1) & np.isfinite(pressures)
+        if start is not None:
+            keep &= timestamps >= start
+        if end is not None:
+            keep &= timestamps <= end
+        for excluded_start, excluded_end in exclude_times or []:
+            keep &= (timestamps < excluded_start) | (timestamps > excluded_end)
+        if exclude_pressures:
+            # the log stores float32 pressures, compare at that precision
+            keep &= ~np.isin(
+                pressures.astype(np.float32),
+                np.asarray(exclude_pressures, dtype=np.float32),
+            )
+
+        if groups is None:
+            groups = PressureGroups(values.shape[1])
+        groups.add(timestamps[keep], pressures[keep], values[keep])
+
+    if groups is None or len(groups.pressures) == 0:
+        return None
+
+    return groups
+
+
+def fit(groups: PressureGroups) -> dict[str, Any]:
+    """fit the averages of every pressure, rounded like the calibrations taken live"""
+    averages = groups.averages()
+    regressions = cal.calculate_linear_regressions(averages, groups.pressures)
+    return {
+        "coefficients": [
+            [
+                float(np.round(m, decimals=15)),
+                float(np.round(c, decimals=5)),
+            ]
+            for m, c in zip(regressions["slopes"], regressions["intercepts"])
+        ],
+        "residuals": regressions["residuals"].tolist(),
+        "slope_standard_errors": regressions["slope_standard_errors"].tolist(),
+        "intercept_standard_errors": regressions["intercept_standard_errors"].tolist(),
+        "points": groups.pressures.tolist(),
+        "readings_per_point": groups.counts.tolist(),
+        "averages": averages.tolist(),
+        "standard_deviations": groups.standard_deviations().tolist(),
+        "first_timestamps": groups.first_timestamps.tolist(),
+        "last_timestamps": groups.last_timestamps.tolist(),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Recompute the calibration of a board from its raw log"
+    )
+    parser.add_argument("log", help="binary or csv raw log")
+    parser.add_argument("--start", type=parse_time, help="ignore samples before this")
+    parser.add_argument("--end", type=parse_time, help="ignore samples after this")
+    parser.add_argument(
+        "--exclude-time",
+        nargs=2,
+        type=parse_time,
+        action="append",
+        default=[],
+        metavar=("START", "END"),
+        help="ignore the samples between START and END, can be repeated",
+    )
+    parser.add_argument(
+        "--exclude-pressure",
+        type=float,
+        action="append",
+        default=[],
+        help="ignore every sample at this pressure, can be repeated",
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--summary", help="save the points and the fit as json")
+    parser.add_argument(
+        "--store",
+        help="calibration store to save the recomputed coefficients in, eg. logs/cals.sqlite3",
+    )
+    parser.add_argument(
+        "--board", help="board to store the coefficients for, defaults to the log's"
+    )
+    args = parser.parse_args()
+
+    try:
+        reader = RawLogReader(args.log, chunk_size=args.chunk_size)
+        groups = replay(
+            reader,
+            start=args.start,
+            end=args.end,
+            exclude_times=[tuple(times) for times in args.exclude_time],
+            exclude_pressures=args.exclude_pressure,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Could not replay {args.log}: {e}", file=sys.stderr)
+        return 2
+
+    if reader.skipped_rows:
+        print(f"Skipped {reader.skipped_rows} malformed rows", file=sys.stderr)
+
+    if groups is None:
+        print("No samples left to replay", file=sys.stderr)
+        return 1
+
+    print(f"{'pressure':>10} {'readings':>9}  from - to")
+    for pressure, count, first, last in zip(
+        groups.pressures, groups.counts, groups.first_timestamps, groups.last_timestamps
+    ):
+        print(
+            f"{pressure:>10g} {count:>9}  "
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first))} - "
+            f"{time.strftime('%H:%M:%S', time.localtime(last))}"
+        )
+
+    try:
+        result = fit(groups)
+    except ValueError as e:
+        print(f"Could not fit: {e}", file=sys.stderr)
+        return 1
+
+    for pt, (m, c) in enumerate(result["coefficients"]):
+        print(f"  PT {pt}: m={m} c={c}")
+
+    if args.summary:
+        with open(args.summary, "w") as file:
+            json.dump(
+                {
+                    "log": args.log,
+                    "board": reader.board_name,
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    **result,
+                },
+                file,
+                indent=2,
+            )
+        print(f"Summary saved to {args.summary}")
+
+    if args.store:
+        from logger.calibration_store import CalibrationStore
+
+        board = args.board or reader.board_name
+        if not board:
+            print("--board is needed to store the fit of a csv log", file=sys.stderr)
+            return 2
+
+        store = CalibrationStore(args.store)
+        store.store(
+            board,
+            [(m, c) for m, c in result["coefficients"]],
+            int(time.time_ns() / 1_000_000),
+        )
+        store.close()
+        print(f"Stored the coefficients of {board} in {args.store}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
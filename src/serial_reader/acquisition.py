@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+from serial import Serial, SerialException
+
+from serial_reader.connection_manager import SerialConnectionManager
+from serial_reader.frame_reader import FrameReader
+from serial_reader.ring_buffer import RingBuffer
+from serial_reader.telemetry import AcquisitionTelemetry
+
+DEFAULT_RING_CAPACITY = 8192
+
+
+def read_port(
+    frame_reader: FrameReader, ser: Serial, frame_length: int
+) -> tuple[int, float]:
+    """read everything that is already waiting, but at least one frame. Returns the bytes read,
+    and how long the read was blocked waiting for the board to send the rest of a frame
+    """
+    waiting = ser.in_waiting
+    start = time.perf_counter()
+    read = frame_reader.fill(ser, max_bytes=max(waiting, frame_length))
+    return read, 0.0 if waiting >= frame_length else time.perf_counter() - start
+
+
+def decode_buffered_frames(
+    frame_reader: FrameReader,
+    decode_batch_fn: Callable[[bytes | memoryview], tuple[np.ndarray, np.ndarray]],
+    num_sensors: int,
+    ring: RingBuffer,
+    timestamp: float,
+) -> int:
+    """decode every aligned frame buffered in the frame reader into the ring, returns the number of rejected frames"""
+    rejected = 0
+    while (frames := frame_reader.next_frames()) is not None:
+        values, valid = decode_batch_fn(frames)
+        if values.shape[1] != num_sensors:
+            rejected += values.shape[0]
+            continue
+
+        if not valid.all():
+            rejected += int(np.count_nonzero(~valid))
+            values = values[valid]
+
+        ring.extend(values, timestamp)
+
+    return rejected
+
+
+class BoardAcquisition(threading.Thread):
+    """Continuously reads one board's serial port and decodes every frame into a ring buffer.
+
+    The readers never touch the port themselves, they take windows or snapshots
+    from `ring`, so the OS buffer never overflows or goes stale between pressure points.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        connection_manager: SerialConnectionManager,
+        num_sensors: int,
+        decode_batch_fn: Callable[[bytes | memoryview], tuple[np.ndarray, np.ndarray]],
+        stop_sequence: bytes,
+        expected_payload_length: int,
+        capacity: int = DEFAULT_RING_CAPACITY,
+    ):
+        super().__init__(name=f"acquisition-{port}", daemon=True)
+        self.port = port
+        self.connection_manager = connection_manager
+        self.num_sensors = num_sensors
+        self.decode_batch_fn = decode_batch_fn
+        self.expected_payload_length = expected_payload_length
+        self.frame_reader = FrameReader(
+            frame_length=expected_payload_length, stop_sequence=stop_sequence
+        )
+        self.ring = RingBuffer(capacity=capacity, width=num_sensors)
+
+        self.telemetry = AcquisitionTelemetry(port, self.frame_reader)
+        self.error: Exception | None = None
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self) -> None:
+        try:
+            # this thread is the only reader of the port, so it is read without a lock
+            ser = self.connection_manager.get(self.port)
+            # drop whatever was sitting in the OS buffer before we started
+            ser.reset_input_buffer()
+
+            while not self._stop_event.is_set():
+                read, port_wait = read_port(
+                    self.frame_reader, ser, self.expected_payload_length
+                )
+                self.telemetry.record_port_wait(port_wait)
+
+                if read:
+                    now = time.monotonic()
+                    cursor = self.ring.cursor()
+                    rejected = decode_buffered_frames(
+                        self.frame_reader,
+                        self.decode_batch_fn,
+                        self.num_sensors,
+                        self.ring,
+                        now,
+                    )
+                    self.telemetry.record_batch(
+                        self.ring.cursor() - cursor, rejected, now
+                    )
+
+        except (SerialException, OSError) as e:
+            # the port went away, keep the error so the readers can surface it
+            if not self._stop_event.is_set():
+                self.error = e
+
+    async def wait_for(
+        self, cursor: int, count: int, timeout: float | None = None
+    ) -> int:
+        """wait without blocking the event loop until `count` samples were written after the cursor"""
+        # only the TUI waits asynchronously, so asyncio is not imported up front
+        import asyncio
+
+        return await asyncio.to_thread(self.ring.wait_for, cursor, count, timeout)
+
+    def check_health(self) -> None:
+        """raise the error that stopped acquisition, if any"""
+        if self.error:
+            raise Exception(
+                f"Acquisition on {self.port} stopped: {self.error}"
+            ) from self.error
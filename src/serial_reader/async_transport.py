@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+from typing import Callable
+
+import numpy as np
+
+from serial_reader.acquisition import DEFAULT_RING_CAPACITY, decode_buffered_frames
+from serial_reader.connection_manager import SerialConnectionManager
+from serial_reader.frame_reader import FrameReader
+from serial_reader.ring_buffer import RingBuffer
+from serial_reader.telemetry import AcquisitionTelemetry
+
+
+class _NonBlockingFd:
+    """readinto for a non-blocking file descriptor, so the frame reader can fill straight from it"""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def readinto(self, buffer: memoryview) -> int:
+        # pyserial configures VMIN=0, so an empty read means there is no data waiting
+        try:
+            return os.readv(self.fd, [buffer])
+        except BlockingIOError:
+            return 0
+
+
+class AsyncBoardAcquisition:
+    """Acquisition of one board driven by the event loop instead of a thread.
+
+    Has the same interface as `BoardAcquisition` (`ring`, `start`, `stop`,
+    `check_health`, `wait_for`), so the readers do not care which one they get.
+    The port is read from a reader callback whenever it becomes readable.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        connection_manager: SerialConnectionManager,
+        num_sensors: int,
+        decode_batch_fn: Callable[[bytes | memoryview], tuple[np.ndarray, np.ndarray]],
+        stop_sequence: bytes,
+        expected_payload_length: int,
+        capacity: int = DEFAULT_RING_CAPACITY,
+    ):
+        self.port = port
+        self.connection_manager = connection_manager
+        self.num_sensors = num_sensors
+        self.decode_batch_fn = decode_batch_fn
+        self.frame_reader = FrameReader(
+            frame_length=expected_payload_length, stop_sequence=stop_sequence
+        )
+        self.ring = RingBuffer(capacity=capacity, width=num_sensors)
+
+        self.telemetry = AcquisitionTelemetry(port, self.frame_reader)
+        self.error: Exception | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._fd: int | None = None
+        self._stream: _NonBlockingFd | None = None
+        self._new_data = asyncio.Event()
+
+    def start(self) -> None:
+        """start reading, must be called from the thread running the event loop"""
+        self._loop = asyncio.get_running_loop()
+        ser = self.connection_manager.get(self.port)
+        # drop whatever was sitting in the OS buffer before we started
+        ser.reset_input_buffer()
+
+        self._fd = ser.fileno()
+        os.set_blocking(self._fd, False)
+        self._stream = _NonBlockingFd(self._fd)
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def stop(self, timeout: float | None = None) -> None:
+        if self._loop is None or self._fd is None:
+            return
+
+        self._loop.remove_reader(self._fd)
+        try:
+            os.set_blocking(self._fd, True)
+        except OSError:
+            pass
+
+        self._fd = None
+        self._notify()
+
+    def is_alive(self) -> bool:
+        return self._fd is not None
+
+    def check_health(self) -> None:
+        """raise the error that stopped acquisition, if any"""
+        if self.error:
+            raise Exception(
+                f"Acquisition on {self.port} stopped: {self.error}"
+            ) from self.error
+
+    async def wait_for(
+        self, cursor: int, count: int, timeout: float | None = None
+    ) -> int:
+        """wait until `count` samples were written after the cursor, returns the number available"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.ring.available(cursor) < count and self.is_alive():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+
+            try:
+                await asyncio.wait_for(self._new_data.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        return self.ring.available(cursor)
+
+    def _on_readable(self) -> None:
+        try:
+            # the fd is non-blocking, so this reads everything that is waiting without stalling the loop
+            read = self.frame_reader.fill(self._stream) if self._stream else 0
+            if read == 0:
+                # readable with nothing to read means the other end hung up
+                raise OSError(f"{self.port} hung up")
+
+            now = time.monotonic()
+            cursor = self.ring.cursor()
+            rejected = 0
+            while read:
+                rejected += decode_buffered_frames(
+                    self.frame_reader,
+                    self.decode_batch_fn,
+                    self.num_sensors,
+                    self.ring,
+                    now,
+                )
+                read = self.frame_reader.fill(self._stream)
+
+            self.telemetry.record_batch(self.ring.cursor() - cursor, rejected, now)
+        except OSError as e:
+            self.error = e
+            self.stop()
+            return
+
+        self._notify()
+
+    def _notify(self) -> None:
+        # wake everyone that is waiting, and give later waiters a fresh event
+        event, self._new_data = self._new_data, asyncio.Event()
+        event.set()
+
+
+class AsyncSerialEngine:
+    """Services every board's port from the one asyncio event loop (Textual's), with no threads.
+
+    Each board is a reader callback on a non-blocking file descriptor, so any
+    number of ports can be multiplexed without a thread per board.
+    """
+
+    def __init__(self, connection_manager: SerialConnectionManager):
+        self.connection_manager = connection_manager
+        self.boards: list[AsyncBoardAcquisition] = []
+
+    @staticmethod
+    def is_supported() -> bool:
+        """reader callbacks on serial file descriptors need a POSIX selector event loop"""
+        return os.name == "posix"
+
+    def add_board(
+        self,
+        port: str,
+        num_sensors: int,
+        decode_batch_fn: Callable[[bytes | memoryview], tuple[np.ndarray, np.ndarray]],
+        stop_sequence: bytes,
+        expected_payload_length: int,
+        capacity: int = DEFAULT_RING_CAPACITY,
+    ) -> AsyncBoardAcquisition:
+        board = AsyncBoardAcquisition(
+            port=port,
+            connection_manager=self.connection_manager,
+            num_sensors=num_sensors,
+            decode_batch_fn=decode_batch_fn,
+            stop_sequence=stop_sequence,
+            expected_payload_length=expected_payload_length,
+            capacity=capacity,
+        )
+        self.boards.append(board)
+        return board
@@ -1,142 +1,170 @@
-import struct
-from threading import Lock
-from typing import Callable
+from typing import TYPE_CHECKING
 
 import numpy as np
 
 from cal import cal
 from logger.logger import Logger
+from serial_reader.acquisition import BoardAcquisition
+from serial_reader.calibration_samples import CalibrationSamples
 from serial_reader.serial_reader import SerialReader
 
+if TYPE_CHECKING:
+    from serial_reader.async_transport import AsyncBoardAcquisition
+    from serial_reader.process_acquisition import ProcessBoardAcquisition
+
 
 class CalibrationReader(SerialReader):
     def __init__(
         self,
-        port: str,
-        baudrate: int,
-        serial_lock: Lock,
+        acquisition: "BoardAcquisition | AsyncBoardAcquisition | ProcessBoardAcquisition",
         num_sensors: int,
         name: str,
         logger: Logger,
-        decode_fn: Callable[[bytes], list[float]],
-        stop_sequence: bytes,
-        expected_payload_length: int,
         num_readings_per_pt: int,
+        target_standard_error: float | None = None,
+        min_readings_per_pt: int = 2,
     ):
+        """num_readings_per_pt readings are taken per pressure, unless a target standard error is set.
+        Then sampling stops early once the standard error of the mean of every PT is below the target,
+        with at least min_readings_per_pt and at most num_readings_per_pt readings"""
         super().__init__(
-            port=port,
-            baudrate=baudrate,
-            serial_lock=serial_lock,
+            acquisition=acquisition,
             num_sensors=num_sensors,
             name=name,
             logger=logger,
-            decode_fn=decode_fn,
-            stop_sequence=stop_sequence,
-            expected_payload_length=expected_payload_length,
         )
 
         self.num_readings_per_pt = num_readings_per_pt
-        self.all_avgs = {i: [] for i in range(num_sensors)}
-        self.readings = {i: [] for i in range(num_sensors)}
+        self.target_standard_error = target_standard_error
+        self.min_readings_per_pt = max(2, min(min_readings_per_pt, num_readings_per_pt))
+        # streaming stats of the current pressure point, for the adaptive sample count
+        self.point_stats = cal.RunningStatistics(num_sensors)
+        self._readings_in_pt = 0
+        # readings of the current point and the averages of every point, stored as arrays
+        self.samples = CalibrationSamples(num_sensors, num_readings_per_pt)
+        # updated after every pressure point so the fit can be previewed while calibrating
+        self.live_fit = cal.IncrementalLinearRegression(num_sensors)
         # id is different from name because ID must not have spaces
         self.id = "-".join(name.split(" "))
-
-    def read_from_serial(self, is_first_reading: bool, current_pressure: float) -> None:
-        """take a reading from serial, and place it into the readings dict"""
-        # clear the current readings first
-        # for the first reading of the set, clear the buffer and the first potentially incomplete line
-        if is_first_reading:
-            self.read_raw(reset_input=True)
-
-        readings = None
-        # try to take 10 differnt set of readings to get one set of accurate readings
-        # NOTE: This function is potentially problematic, this might be the cause of errors
-        for i in range(self.num_readings_per_pt):
-            line = self.read_raw(reset_input=False)
-
-            # skip this set of readings if theere are not enough bytes
-            try:
-                line_readings = self.decode_fn(line)
-                if len(line_readings) == self.num_sensors:
-                    readings = line_readings
-                    # log the raw readings to the raw data file
-                    self.logger.log_raw_data(
-                        f"""{current_pressure},{",".join([f"{reading:.2f}" for reading in line_readings])}"""
-                    )
-                    break
-            # let the loop try for a few times before exiting
-            except struct.error:
-                pass
-            except UnicodeDecodeError:
-                pass
-
-        if not readings:
-            raise Exception(
-                f"None of the 10 readings gave the desired set of values. Aborting..."
+        self._cursor = self.ring.cursor()
+
+    def start_pressure_point(self) -> None:
+        """only samples that arrive after this call count towards the current pressure"""
+        self._cursor = self.mark()
+        self._readings_in_pt = 0
+        self.point_stats.reset()
+
+    def readings_collected(self, timeout: float = 0.5) -> int:
+        """wait for the next sample of the current pressure, returns how many have been collected"""
+        collected = self.ring.available(self._cursor)
+        if collected <= self._readings_in_pt:
+            collected = self.wait_for_samples(
+                self._cursor, self._readings_in_pt + 1, timeout=timeout
             )
 
-        if not readings:
-            raise ValueError(
-                f"Expected {self.num_sensors} readings, but received {len(readings) if readings else readings} | readings: {readings}"
+        return self._update_readings_collected(collected)
+
+    async def readings_collected_async(self, timeout: float = 0.5) -> int:
+        """same as readings_collected, but waits without blocking the event loop"""
+        collected = self.ring.available(self._cursor)
+        if collected <= self._readings_in_pt:
+            collected = await self.wait_for_samples_async(
+                self._cursor, self._readings_in_pt + 1, timeout=timeout
             )
 
-        # add the reading to the dict
-        for pt_no, reading in enumerate(readings):
-            self.readings[pt_no].append(np.float64(reading))
+        return self._update_readings_collected(collected)
+
+    def _update_readings_collected(self, collected: int) -> int:
+        collected = min(collected, self.num_readings_per_pt)
+        if self.target_standard_error is not None and collected > self._readings_in_pt:
+            # only the new samples are folded into the running stats
+            cursor = self._cursor + self._readings_in_pt
+            values, _ = self.ring.view(cursor, collected - self._readings_in_pt)
+            self.point_stats.add(values)
+            self.ring.check_overwritten(cursor)
+
+        self._readings_in_pt = collected
+        return collected
+
+    def pressure_point_complete(self) -> bool:
+        """enough readings were collected for the current pressure"""
+        if self._readings_in_pt >= self.num_readings_per_pt:
+            return True
+
+        if (
+            self.target_standard_error is None
+            or self._readings_in_pt < self.min_readings_per_pt
+        ):
+            return False
+
+        return bool(
+            np.all(self.point_stats.standard_error() <= self.target_standard_error)
+        )
+
+    def read_from_serial(self, current_pressure: float) -> None:
+        """take the window of readings for the current pressure, and place it into the sample store"""
+        values, timestamps = self.read_window(self._cursor, self._readings_in_pt)
+
+        # log the raw readings to the raw data file
+        self.logger.log_raw_data(current_pressure, values, timestamps)
+
+        self.samples.set_readings(values)
+        # the readings were read in place, make sure acquisition did not overwrite them meanwhile
+        self.ring.check_overwritten(self._cursor)
 
     def calculate_avg(self, current_pressure: float) -> list[float]:
         """calculate the average reading for the current set of values and clear the reading history"""
-        avg_readings = []
-        for pt_no, readings in self.readings.items():
-            avg_for_pt = np.mean(np.array(readings)).item()
-            avg_readings.append(avg_for_pt)
-            self.all_avgs[pt_no].append((current_pressure, avg_for_pt))
+        avg_readings = self.samples.close_point(current_pressure).tolist()
 
-            self.readings[pt_no] = []
+        self.live_fit.add(avg_readings, current_pressure)
 
         # log the average readings as well
         self.logger.log_avg_data(
             f"""{current_pressure},{",".join([f"{val:.2f}" for val in avg_readings])}"""
         )
+        self.logger.mark_pressure_point_boundary()
 
         return avg_readings
 
     def ready_for_avg(self) -> bool:
         """crudely check for"""
-        if len(self.readings) <= 0:
+        if self.samples.num_readings <= 0:
             raise Exception("No readings recorded for avg calculation")
 
-        for reding_set in self.readings.values():
-            if len(reding_set) != self.num_readings_per_pt:
-                raise Exception(
-                    f"Expected {self.num_readings_per_pt} readings, but only got {len(reding_set)} readings. Reading set: {self.readings}"
-                )
+        if self.samples.num_readings != self._readings_in_pt:
+            raise Exception(
+                f"Expected {self._readings_in_pt} readings, but only got {self.samples.num_readings} readings. Reading set: {self.samples.readings}"
+            )
 
         return True
 
     def get_all_linear_regressions(self) -> dict[int, tuple[float, float]]:
         """returns data in format pt: (m, c)"""
-        linear_regressions = {}
-        for pt, pressure_value_pair in self.all_avgs.items():
-            pressures = []
-            avg_readings = []
-            for pressure, avg_reading in pressure_value_pair:
-                pressures.append(pressure)
-                avg_readings.append(avg_reading)
-
-            linear_regressions[pt] = cal.calculate_linear_regression(
-                avg_readings, pressures
+        # every PT shares the pressures, so all of them are fitted in a single solve
+        regressions = cal.calculate_linear_regressions(
+            self.samples.averages, self.samples.pressures
+        )
+
+        linear_regressions = {
+            pt: (
+                float(np.round(regressions["slopes"][pt], decimals=15)),
+                float(np.round(regressions["intercepts"][pt], decimals=5)),
             )
+            for pt in range(self.num_sensors)
+        }
 
-        # log the calibrated values into a file
-        self.logger.log_cals(
-            f"""x,{",".join([f"{x[0]}" for x in linear_regressions.values()])}"""
-        )
-        self.logger.log_cals(
-            f"""y,{",".join([f"{x[1]}" for x in linear_regressions.values()])}"""
-        )
+        # store the calibrated values
+        self.logger.log_cals(list(linear_regressions.values()))
 
         return linear_regressions
 
+    def get_live_fit(self) -> tuple[list[float], list[float], list[float]]:
+        """current (slopes, intercepts, r_squared) of the running fit, NaN until there are 2 points"""
+        slopes, intercepts, r_squared = self.live_fit.coefficients()
+        return slopes.tolist(), intercepts.tolist(), r_squared.tolist()
+
+    def live_fit_converged(self, tolerance: float = 1e-3) -> bool:
+        return self.live_fit.has_converged(tolerance)
+
     def get_pt_id(self) -> str:
         return self.id
@@ -0,0 +1,112 @@
+import numpy as np
+
+
+class CalibrationSamples:
+    """Array-backed storage of the readings of one calibration sweep.
+
+    The readings of the current pressure point live in a preallocated
+    (num_readings, num_sensors) block, and every finished point becomes a row
+    [pressure, avg PT 0, avg PT 1, ...] of a (n_points, 1 + num_sensors) matrix.
+    Both grow by doubling, so long sweeps do not reallocate on every point.
+    """
+
+    __slots__ = (
+        "num_sensors",
+        "_readings",
+        "_num_readings",
+        "_points",
+        "_variances",
+        "_counts",
+        "_num_points",
+    )
+
+    def __init__(
+        self, num_sensors: int, readings_capacity: int, points_capacity: int = 32
+    ):
+        self.num_sensors = num_sensors
+        self._readings = np.empty((max(readings_capacity, 1), num_sensors))
+        self._num_readings = 0
+        self._points = np.empty((max(points_capacity, 1), 1 + num_sensors))
+        self._variances = np.empty((max(points_capacity, 1), num_sensors))
+        self._counts = np.empty(max(points_capacity, 1), dtype=np.int64)
+        self._num_points = 0
+
+    @property
+    def readings(self) -> np.ndarray:
+        """(num_readings, num_sensors) view of the readings of the current pressure point"""
+        return self._readings[: self._num_readings]
+
+    @property
+    def num_readings(self) -> int:
+        return self._num_readings
+
+    @property
+    def num_points(self) -> int:
+        return self._num_points
+
+    @property
+    def points(self) -> np.ndarray:
+        """(n_points, 1 + num_sensors) view, every row is [pressure, avg PT 0, avg PT 1, ...]"""
+        return self._points[: self._num_points]
+
+    @property
+    def pressures(self) -> np.ndarray:
+        return self._points[: self._num_points, 0]
+
+    @property
+    def averages(self) -> np.ndarray:
+        """(n_points, num_sensors) view of the average reading of every PT at every point"""
+        return self._points[: self._num_points, 1:]
+
+    @property
+    def variances(self) -> np.ndarray:
+        """(n_points, num_sensors) view of the sample variance of every PT at every point"""
+        return self._variances[: self._num_points]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """number of readings that every point was averaged over"""
+        return self._counts[: self._num_points]
+
+    def set_readings(self, values: np.ndarray) -> None:
+        """replace the readings of the current pressure point with a (n, num_sensors) block"""
+        n = values.shape[0]
+        if n > self._readings.shape[0]:
+            self._readings = np.empty(
+                (max(n, 2 * self._readings.shape[0]), self.num_sensors)
+            )
+
+        self._readings[:n] = values
+        self._num_readings = n
+
+    def close_point(self, pressure: float) -> np.ndarray:
+        """average the readings of the current point into a new row, clear them, and return the averages"""
+        if self._num_readings == 0:
+            raise ValueError("No readings recorded for avg calculation")
+
+        if self._num_points == self._points.shape[0]:
+            self._grow_points()
+
+        readings = self.readings
+        row = self._num_points
+        # one vectorized pass per statistic over every PT
+        self._points[row, 0] = pressure
+        self._points[row, 1:] = readings.mean(axis=0)
+        self._variances[row] = (
+            readings.var(axis=0, ddof=1)
+            if self._num_readings > 1
+            else np.full(self.num_sensors, np.nan)
+        )
+        self._counts[row] = self._num_readings
+        self._num_points += 1
+        self._num_readings = 0
+
+        return self._points[row, 1:]
+
+    def _grow_points(self) -> None:
+        capacity = 2 * self._points.shape[0]
+        for name in ("_points", "_variances", "_counts"):
+            old = getattr(self, name)
+            new = np.empty((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[: self._num_points] = old[: self._num_points]
+            setattr(self, name, new)
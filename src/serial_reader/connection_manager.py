@@ -0,0 +1,81 @@
+import threading
+from typing import Union
+
+from serial import Serial
+
+
+class SerialConnectionManager:
+    """Owns a single long-lived serial handle (and its lock) for every port.
+
+    Opening a port is expensive (driver reconfiguration, DTR toggling) and can
+    reset the ESP32 boards, so each port is opened once when the app starts and
+    shared between all the readers that need it until the app closes.
+    """
+
+    def __init__(self, baudrate: int, timeout: float = 0.5):
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self._connections: dict[str, Serial] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(
+        self, port: str, lock: Union[threading.Lock, None] = None
+    ) -> threading.Lock:
+        """register a port with the manager, returns the lock that guards it"""
+        with self._registry_lock:
+            if port not in self._locks:
+                self._locks[port] = lock if lock else threading.Lock()
+
+            return self._locks[port]
+
+    def open(self, port: str) -> Serial:
+        """open the port if it is not open yet, and return the shared handle"""
+        lock = self.register(port)
+        with lock:
+            ser = self._connections.get(port)
+            if ser is not None and ser.is_open:
+                return ser
+
+            # configure the handle before opening it so that DTR/RTS are not toggled,
+            # toggling them resets the ESP32 boards
+            ser = Serial()
+            ser.port = port
+            ser.baudrate = self.baudrate
+            ser.timeout = self.timeout
+            ser.dtr = False
+            ser.rts = False
+            ser.open()
+
+            self._connections[port] = ser
+            return ser
+
+    def open_all(self) -> None:
+        for port in list(self._locks.keys()):
+            self.open(port)
+
+    def get(self, port: str) -> Serial:
+        """get the open handle for a port, opening it lazily if needed"""
+        ser = self._connections.get(port)
+        if ser is None or not ser.is_open:
+            return self.open(port)
+
+        return ser
+
+    def close(self, port: str) -> None:
+        lock = self.register(port)
+        with lock:
+            ser = self._connections.pop(port, None)
+            if ser is not None and ser.is_open:
+                ser.close()
+
+    def close_all(self) -> None:
+        for port in list(self._connections.keys()):
+            self.close(port)
+
+    def __enter__(self) -> "SerialConnectionManager":
+        self.open_all()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close_all()
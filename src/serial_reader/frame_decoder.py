@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def frame_dtype(num_values: int, stop_sequence: bytes) -> np.dtype:
+    """structured dtype of one frame: `num_values` little endian float32s followed by the stop sequence"""
+    return np.dtype(
+        [
+            ("values", "<f4", (num_values,)),
+            ("stop", f"S{len(stop_sequence)}"),
+        ]
+    )
+
+
+def decode_frames(
+    buffer: bytes | bytearray | memoryview, num_values: int, stop_sequence: bytes
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decode a buffer of back to back frames in a single pass.
+
+    Args:
+        buffer: whole frames, any trailing partial frame is ignored
+        num_values: number of float32 values in a frame
+        stop_sequence: terminator at the end of every frame
+
+    Returns:
+        tup [np.ndarray, np.ndarray]: (values, valid) where values is a (n_frames, num_values)
+        float32 view into the buffer, and valid flags the frames that end with the stop sequence
+    """
+    dtype = frame_dtype(num_values, stop_sequence)
+    frames = np.frombuffer(buffer, dtype=dtype, count=len(buffer) // dtype.itemsize)
+
+    return frames["values"], frames["stop"] == stop_sequence
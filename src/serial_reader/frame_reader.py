@@ -0,0 +1,154 @@
+from typing import Iterator, Protocol
+
+import numpy as np
+
+
+class ReadIntoStream(Protocol):
+    def readinto(self, buffer: memoryview, /) -> int | None: ...
+
+
+class FrameReader:
+    """Splits a byte stream into fixed length frames terminated by a stop sequence.
+
+    Bytes are read in large chunks straight into a reusable receive buffer, and
+    frames are handed out as memoryview slices of that buffer, so nothing is
+    copied. A frame is only valid until the next call to `fill`.
+
+    When the terminator is not where it is expected (a partial frame after a
+    buffer reset, or corrupted bytes), the reader drops bytes up to the next stop
+    sequence and carries on from there, so only the damaged frame is lost.
+    """
+
+    def __init__(
+        self, frame_length: int, stop_sequence: bytes, capacity_frames: int = 256
+    ):
+        if frame_length <= len(stop_sequence):
+            raise ValueError(
+                f"Frame length {frame_length} must be longer than the stop sequence {stop_sequence!r}"
+            )
+
+        self.frame_length = frame_length
+        self.stop_sequence = stop_sequence
+        self._stop_bytes = np.frombuffer(stop_sequence, dtype=np.uint8)
+        self._buffer = bytearray(frame_length * capacity_frames)
+        self._view = memoryview(self._buffer)
+        # unconsumed bytes live in [self._start, self._end)
+        self._start = 0
+        self._end = 0
+        self._aligned = False
+
+        self.bytes_read = 0
+        self.resync_count = 0
+        self.discarded_bytes = 0
+
+    def reset(self) -> None:
+        """forget everything buffered, eg. after the serial input buffer was flushed"""
+        self._start = 0
+        self._end = 0
+        self._aligned = False
+
+    def fill(self, stream: ReadIntoStream, max_bytes: int | None = None) -> int:
+        """read the next chunk from the stream into the receive buffer, returns the number of bytes read"""
+        self._compact()
+
+        free = len(self._buffer) - self._end
+        if free <= 0:
+            return 0
+
+        chunk = free if max_bytes is None else max(1, min(free, max_bytes))
+        read = stream.readinto(self._view[self._end : self._end + chunk]) or 0
+        self._end += read
+        self.bytes_read += read
+        return read
+
+    def next_frame(self) -> memoryview | None:
+        """returns the next aligned frame in the buffer, or None if a full frame is not buffered yet"""
+        stop_len = len(self.stop_sequence)
+
+        while True:
+            if not self._aligned and not self._synchronise():
+                return None
+
+            if self._end - self._start < self.frame_length:
+                return None
+
+            frame_end = self._start + self.frame_length
+            if self._view[frame_end - stop_len : frame_end] == self.stop_sequence:
+                frame = self._view[self._start : frame_end]
+                self._start = frame_end
+                return frame
+
+            # the terminator is not where we expected it, look for the next one
+            self._aligned = False
+            self.resync_count += 1
+            self._start += 1
+            self.discarded_bytes += 1
+
+    def frames(self) -> Iterator[memoryview]:
+        """yields every complete frame that is currently buffered"""
+        while (frame := self.next_frame()) is not None:
+            yield frame
+
+    def next_frames(self, max_frames: int | None = None) -> memoryview | None:
+        """returns as many contiguous aligned frames as are buffered, as a single slice"""
+        if not self._aligned and not self._synchronise():
+            return None
+
+        count = (self._end - self._start) // self.frame_length
+        if max_frames is not None:
+            count = min(count, max_frames)
+        if count == 0:
+            return None
+
+        # check every terminator in the run at once, and stop at the first misaligned frame
+        stop_len = len(self.stop_sequence)
+        frames = np.frombuffer(
+            self._buffer,
+            dtype=np.uint8,
+            count=count * self.frame_length,
+            offset=self._start,
+        ).reshape(count, self.frame_length)
+        aligned = np.all(frames[:, -stop_len:] == self._stop_bytes, axis=1)
+        misaligned = np.flatnonzero(~aligned)
+        good = count if misaligned.size == 0 else int(misaligned[0])
+
+        if good == 0:
+            # let next_frame resynchronise on the misaligned frame
+            return self.next_frame()
+
+        start = self._start
+        self._start += good * self.frame_length
+        return self._view[start : self._start]
+
+    def _synchronise(self) -> bool:
+        """move the start of the buffer to the next frame boundary found from a stop sequence"""
+        index = self._buffer.find(self.stop_sequence, self._start, self._end)
+        if index < 0:
+            # keep the tail in case it is the first half of a stop sequence
+            keep_from = max(self._start, self._end - len(self.stop_sequence) + 1)
+            self.discarded_bytes += keep_from - self._start
+            self._start = keep_from
+            return False
+
+        next_start = index + len(self.stop_sequence)
+        # if a whole frame ends at this stop sequence, start from that frame instead of losing it
+        if next_start - self.frame_length >= self._start:
+            next_start -= self.frame_length
+
+        self.discarded_bytes += next_start - self._start
+        self._start = next_start
+        self._aligned = True
+        return True
+
+    def _compact(self) -> None:
+        """move the unconsumed bytes to the front of the buffer"""
+        if self._start == 0:
+            return
+
+        remaining = self._end - self._start
+        if remaining:
+            # only the partial frame at the tail is copied
+            self._buffer[:remaining] = self._view[self._start : self._end].tobytes()
+
+        self._start = 0
+        self._end = remaining
@@ -0,0 +1,81 @@
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from serial import SerialException
+from serial.tools import list_ports
+
+from serial_reader.connection_manager import SerialConnectionManager
+from serial_reader.frame_reader import FrameReader
+from serial_reader.protocol import (
+    CONTROL_CHARACTERS,
+    EXPECTED_PAYLOAD_LENGTH,
+    decode_batch_fn,
+)
+
+BY_ID_DIR = "/dev/serial/by-id"
+# a port is a board once this many consecutive frames decode to finite values
+MIN_VALID_FRAMES = 3
+DEFAULT_PROBE_TIMEOUT = 1.0
+
+
+def candidate_ports() -> list[str]:
+    """the stable /dev/serial/by-id links when the OS has them (Linux), otherwise every serial port"""
+    if os.path.isdir(BY_ID_DIR):
+        return sorted(glob.glob(os.path.join(BY_ID_DIR, "*")))
+
+    return sorted(port.device for port in list_ports.comports())
+
+
+def probe_port(
+    port: str, baudrate: int, timeout: float = DEFAULT_PROBE_TIMEOUT
+) -> bool:
+    """listen on the port until it sends MIN_VALID_FRAMES good 8f\\r\\n frames, or the timeout runs out"""
+    connection_manager = SerialConnectionManager(baudrate=baudrate, timeout=0.05)
+    frame_reader = FrameReader(EXPECTED_PAYLOAD_LENGTH, CONTROL_CHARACTERS)
+    deadline = time.monotonic() + timeout
+    valid_frames = 0
+
+    try:
+        ser = connection_manager.open(port)
+        while time.monotonic() < deadline:
+            frame_reader.fill(
+                ser, max_bytes=max(ser.in_waiting, EXPECTED_PAYLOAD_LENGTH)
+            )
+            while (frames := frame_reader.next_frames()) is not None:
+                values, valid = decode_batch_fn(frames)
+                good = valid & np.all(np.isfinite(values), axis=1)
+                # a bad frame in the middle restarts the count
+                valid_frames = (
+                    valid_frames + len(good)
+                    if good.all()
+                    else len(good) - 1 - int(np.flatnonzero(~good)[-1])
+                )
+                if valid_frames >= MIN_VALID_FRAMES:
+                    return True
+    except (SerialException, OSError):
+        return False
+    finally:
+        connection_manager.close_all()
+
+    return False
+
+
+def discover_ports(
+    baudrate: int,
+    candidates: list[str] | None = None,
+    timeout: float = DEFAULT_PROBE_TIMEOUT,
+) -> list[str]:
+    """probe every candidate at the same time, returns the ones that stream valid frames, in order"""
+    candidates = candidate_ports() if candidates is None else candidates
+    if not candidates:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        results = list(
+            executor.map(lambda port: probe_port(port, baudrate, timeout), candidates)
+        )
+
+    return [port for port, is_board in zip(candidates, results) if is_board]
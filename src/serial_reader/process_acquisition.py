@@ -0,0 +1,296 @@
+import multiprocessing
+import signal
+import threading
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable
+
+import numpy as np
+from serial import SerialException
+
+from serial_reader.acquisition import (
+    DEFAULT_RING_CAPACITY,
+    decode_buffered_frames,
+    read_port,
+)
+from serial_reader.connection_manager import SerialConnectionManager
+from serial_reader.frame_reader import FrameReader
+from serial_reader.shared_ring_buffer import SharedRingBuffer
+from serial_reader.telemetry import AcquisitionTelemetry
+
+# workers are spawned rather than forked: the coordinator already runs threads (the UI,
+# the log writer) and a forked worker could start with one of their locks held
+START_METHOD = "spawn"
+# how long a worker blocks on an idle port before checking whether it should stop
+WORKER_READ_TIMEOUT = 0.1
+
+# messages sent from a worker to the coordinator, as (kind, payload)
+BATCH = "batch"
+ERROR = "error"
+
+
+class WorkerReaderCounters:
+    """the frame reader counters of a worker, as last reported by it"""
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.resync_count = 0
+        self.discarded_bytes = 0
+
+
+def acquisition_worker(
+    port: str,
+    baudrate: int,
+    num_sensors: int,
+    decode_batch_fn: Callable[[bytes | memoryview], tuple[np.ndarray, np.ndarray]],
+    stop_sequence: bytes,
+    expected_payload_length: int,
+    ring_name: str,
+    capacity: int,
+    connection: Connection,
+    stop_event: Any,
+) -> None:
+    """runs in the worker process: reads and decodes one board straight into the shared ring,
+    and tells the coordinator about every batch it wrote"""
+    # the coordinator decides when the workers stop, ctrl+c in the terminal is for it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    connection_manager = SerialConnectionManager(
+        baudrate=baudrate, timeout=WORKER_READ_TIMEOUT
+    )
+    frame_reader = FrameReader(
+        frame_length=expected_payload_length, stop_sequence=stop_sequence
+    )
+    ring = SharedRingBuffer(capacity=capacity, width=num_sensors, name=ring_name)
+    try:
+        ser = connection_manager.open(port)
+        # drop whatever was sitting in the OS buffer before we started
+        ser.reset_input_buffer()
+
+        port_wait = 0.0
+        while not stop_event.is_set():
+            read, waited = read_port(frame_reader, ser, expected_payload_length)
+            port_wait += waited
+            if not read:
+                continue
+
+            now = time.monotonic()
+            cursor = ring.cursor()
+            rejected = decode_buffered_frames(
+                frame_reader, decode_batch_fn, num_sensors, ring, now
+            )
+            # only the counters are sent, the samples are already in shared memory
+            connection.send(
+                (
+                    BATCH,
+                    (
+                        now,
+                        ring.cursor() - cursor,
+                        rejected,
+                        frame_reader.bytes_read,
+                        frame_reader.resync_count,
+                        frame_reader.discarded_bytes,
+                        port_wait,
+                    ),
+                )
+            )
+
+    except (SerialException, OSError) as e:
+        if not stop_event.is_set():
+            try:
+                connection.send((ERROR, str(e)))
+            except OSError:
+                # the coordinator is gone already
+                pass
+
+    finally:
+        connection_manager.close_all()
+        connection.close()
+        ring.close()
+
+
+class ProcessBoardAcquisition:
+    """Acquisition of one board in a worker process, so decoding is not bound by the coordinator's GIL.
+
+    Has the same interface as `BoardAcquisition` (`ring`, `start`, `stop`,
+    `check_health`, `wait_for`, `telemetry`). The worker opens the port itself and
+    decodes into `ring`, a SharedRingBuffer, so the readers take views of the samples
+    without them ever being copied between the processes. The worker only sends the
+    counters of every batch, which `receive` uses to wake the waiters.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        baudrate: int,
+        num_sensors: int,
+        decode_batch_fn: Callable[[bytes | memoryview], tuple[np.ndarray, np.ndarray]],
+        stop_sequence: bytes,
+        expected_payload_length: int,
+        capacity: int = DEFAULT_RING_CAPACITY,
+    ):
+        self.port = port
+        self.num_sensors = num_sensors
+        self.ring = SharedRingBuffer(capacity=capacity, width=num_sensors)
+
+        self.reader_counters = WorkerReaderCounters()
+        self.telemetry = AcquisitionTelemetry(port, self.reader_counters)
+        self.error: Exception | None = None
+
+        context = multiprocessing.get_context(START_METHOD)
+        self._stop_event = context.Event()
+        self.connection, worker_connection = context.Pipe(duplex=False)
+        self._worker_connection: Connection | None = worker_connection
+        self._process = context.Process(
+            target=acquisition_worker,
+            args=(
+                port,
+                baudrate,
+                num_sensors,
+                decode_batch_fn,
+                stop_sequence,
+                expected_payload_length,
+                self.ring.name,
+                capacity,
+                worker_connection,
+                self._stop_event,
+            ),
+            name=f"acquisition-{port}",
+            daemon=True,
+        )
+        self._connection_open = True
+
+    def start(self) -> None:
+        self._process.start()
+        # the worker has its own copy, closing ours lets the pipe report when the worker exits
+        if self._worker_connection:
+            self._worker_connection.close()
+            self._worker_connection = None
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop_event.set()
+        if self._process.pid is None:
+            return
+
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self._process.is_alive() and self.error is None
+
+    def is_receiving(self) -> bool:
+        """whether the worker can still send batches"""
+        return self._connection_open
+
+    def receive(self) -> None:
+        """take the next batch report of the worker, called by the pool's collector"""
+        try:
+            kind, payload = self.connection.recv()
+        except (EOFError, OSError):
+            self._connection_open = False
+            if not self._stop_event.is_set() and self.error is None:
+                self.error = OSError(f"the acquisition worker of {self.port} exited")
+            return
+
+        if kind == ERROR:
+            self.error = OSError(payload)
+            return
+
+        (
+            timestamp,
+            frames,
+            rejected,
+            self.reader_counters.bytes_read,
+            self.reader_counters.resync_count,
+            self.reader_counters.discarded_bytes,
+            self.telemetry.port_wait_seconds,
+        ) = payload
+        self.telemetry.record_batch(frames, rejected, timestamp)
+        self.ring.notify()
+
+    async def wait_for(
+        self, cursor: int, count: int, timeout: float | None = None
+    ) -> int:
+        """wait without blocking the event loop until `count` samples were written after the cursor"""
+        # only the TUI waits asynchronously, so asyncio is not imported up front
+        import asyncio
+
+        return await asyncio.to_thread(self.ring.wait_for, cursor, count, timeout)
+
+    def check_health(self) -> None:
+        """raise the error that stopped acquisition, if any"""
+        if self.error:
+            raise Exception(
+                f"Acquisition on {self.port} stopped: {self.error}"
+            ) from self.error
+
+
+class AcquisitionProcessPool:
+    """A worker process per board, and one collector thread that wakes the readers of their rings.
+
+    The workers do all the reading and decoding, so throughput scales with the
+    number of cores. The collector only receives the counters of every batch, and
+    waits on every worker's pipe at once, so it does not need a thread per board.
+    """
+
+    def __init__(self, baudrate: int):
+        self.baudrate = baudrate
+        self.boards: list[ProcessBoardAcquisition] = []
+        self._collector: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+    def add_board(
+        self,
+        port: str,
+        num_sensors: int,
+        decode_batch_fn: Callable[[bytes | memoryview], tuple[np.ndarray, np.ndarray]],
+        stop_sequence: bytes,
+        expected_payload_length: int,
+        capacity: int = DEFAULT_RING_CAPACITY,
+    ) -> ProcessBoardAcquisition:
+        board = ProcessBoardAcquisition(
+            port=port,
+            baudrate=self.baudrate,
+            num_sensors=num_sensors,
+            decode_batch_fn=decode_batch_fn,
+            stop_sequence=stop_sequence,
+            expected_payload_length=expected_payload_length,
+            capacity=capacity,
+        )
+        self.boards.append(board)
+        return board
+
+    def start(self) -> None:
+        for board in self.boards:
+            board.start()
+
+        self._collector = threading.Thread(
+            target=self._collect, name="acquisition-collector", daemon=True
+        )
+        self._collector.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        for board in self.boards:
+            board.stop(timeout)
+
+        self._stop_event.set()
+        if self._collector and self._collector.is_alive():
+            self._collector.join(timeout)
+
+        # the workers are gone, so the shared memory can be freed
+        for board in self.boards:
+            board.ring.close()
+
+    def _collect(self) -> None:
+        while not self._stop_event.is_set():
+            receiving = {
+                board.connection: board for board in self.boards if board.is_receiving()
+            }
+            if not receiving:
+                return
+
+            # a timeout so that stopping is noticed even when every board is quiet
+            for connection in wait(list(receiving), timeout=0.1):
+                receiving[connection].receive()
@@ -0,0 +1,37 @@
+import functools
+import struct
+
+import numpy as np
+
+from serial_reader import frame_decoder
+
+# every frame the boards send is NUM_VALUES_PER_FRAME float32s followed by the control characters
+CONTROL_CHARACTERS = b"\r\n"
+NUM_VALUES_PER_FRAME = 8
+EXPECTED_PAYLOAD_LENGTH = 4 * NUM_VALUES_PER_FRAME + len(CONTROL_CHARACTERS)
+
+
+def decode_fn(line: bytes | memoryview) -> list[float]:
+    """Dont do error handling, let the callers do it, since their error handling logic is quite different"""
+    # first remove the control characters, frames from the frame reader always end with them
+    if line[-len(CONTROL_CHARACTERS) :] == CONTROL_CHARACTERS:
+        line = line[: -len(CONTROL_CHARACTERS)]
+    return list(struct.unpack(f"{NUM_VALUES_PER_FRAME}f", line))
+
+
+def decode_batch_fn(buffer: bytes | memoryview) -> tuple[np.ndarray, np.ndarray]:
+    """Decode many back to back frames at once. Returns (values, valid), valid flags the frames with the right terminator"""
+    return frame_decoder.decode_frames(buffer, NUM_VALUES_PER_FRAME, CONTROL_CHARACTERS)
+
+
+def decode_pts_batch_fn(
+    buffer: bytes | memoryview, num_pts: int = NUM_VALUES_PER_FRAME
+) -> tuple[np.ndarray, np.ndarray]:
+    """decode_batch_fn for a board with num_pts PTs in use, the boards always send full frames"""
+    values, valid = decode_batch_fn(buffer)
+    return values[:, :num_pts], valid
+
+
+def batch_decoder(num_pts: int) -> functools.partial:
+    """the decoder of a board with num_pts PTs, a partial so it can be sent to a worker process"""
+    return functools.partial(decode_pts_batch_fn, num_pts=num_pts)
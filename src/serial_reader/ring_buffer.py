@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+
+
+class RingBufferOverrun(Exception):
+    """Raised when the requested samples have already been overwritten"""
+
+
+class RingBuffer:
+    """A fixed size (capacity, width) float32 ring buffer of samples with monotonic timestamps.
+
+    Samples are addressed by a cursor: the total number of samples ever written.
+    Readers remember a cursor and later ask for everything written after it, so
+    any number of readers can consume the same stream without removing from it.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        if capacity <= 0 or width <= 0:
+            raise ValueError(
+                f"Capacity and width must be positive. Got capacity: {capacity}, width: {width}"
+            )
+
+        self.capacity = capacity
+        self.width = width
+        self._data = np.zeros((capacity, width), dtype=np.float32)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._total = 0
+        self._condition = threading.Condition()
+
+    def cursor(self) -> int:
+        """the total number of samples written so far"""
+        return self._total
+
+    def extend(self, rows: np.ndarray, timestamps: np.ndarray | float) -> None:
+        """write a (n, width) block of samples, wrapping around the end of the buffer"""
+        n = rows.shape[0]
+        if n == 0:
+            return
+
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (n,))
+        # only the newest `capacity` rows can survive the write
+        if n > self.capacity:
+            skipped = n - self.capacity
+            rows = rows[skipped:]
+            timestamps = timestamps[skipped:]
+        else:
+            skipped = 0
+
+        with self._condition:
+            start = (self._total + skipped) % self.capacity
+            first = min(rows.shape[0], self.capacity - start)
+            self._data[start : start + first] = rows[:first]
+            self._timestamps[start : start + first] = timestamps[:first]
+            if first < rows.shape[0]:
+                self._data[: rows.shape[0] - first] = rows[first:]
+                self._timestamps[: rows.shape[0] - first] = timestamps[first:]
+
+            self._total += n
+            self._condition.notify_all()
+
+    def available(self, cursor: int) -> int:
+        """number of samples written after the cursor"""
+        return self._total - cursor
+
+    def wait_for(self, cursor: int, count: int, timeout: float | None = None) -> int:
+        """block until `count` samples were written after the cursor, returns the number available"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._total - cursor >= count, timeout=timeout
+            )
+            return self._total - cursor
+
+    def check_overwritten(self, cursor: int) -> None:
+        """raise RingBufferOverrun if the sample at the cursor was overwritten, eg. once done with a view"""
+        if cursor < self._total - self.capacity:
+            raise RingBufferOverrun(
+                f"Samples from cursor {cursor} were overwritten, the buffer only holds the last {self.capacity}"
+            )
+
+    def _check_window(self, cursor: int, count: int) -> None:
+        if cursor + count > self._total:
+            raise ValueError(
+                f"Only {self._total - cursor} samples written after cursor {cursor}, but {count} were requested"
+            )
+
+        self.check_overwritten(cursor)
+
+    def window(self, cursor: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """copy out `count` samples starting at the cursor, returns (values, timestamps)"""
+        with self._condition:
+            self._check_window(cursor, count)
+            indices = np.arange(cursor, cursor + count) % self.capacity
+            return self._data[indices], self._timestamps[indices]
+
+    def view(self, cursor: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Same as window, but the samples are not copied unless they wrap around the end of the buffer.
+
+        The writer does not wait for views, so once done with one, check_overwritten(cursor)
+        tells whether it was lapped in the meantime.
+        """
+        with self._condition:
+            self._check_window(cursor, count)
+            start = cursor % self.capacity
+            if start + count > self.capacity:
+                return self.window(cursor, count)
+
+            return (
+                self._data[start : start + count],
+                self._timestamps[start : start + count],
+            )
+
+    def cursor_at(self, timestamp: float) -> int:
+        """cursor of the oldest sample still in the buffer that was taken at or after the timestamp"""
+        with self._condition:
+            total = self._total
+            oldest = max(0, total - self.capacity)
+            start = oldest % self.capacity
+            # the samples still held, oldest first, are older + newer
+            older = self._timestamps[start : start + total - oldest]
+            newer = self._timestamps[: total - oldest - len(older)]
+            if len(newer) and newer[0] <= timestamp:
+                return oldest + len(older) + int(np.searchsorted(newer, timestamp))
+
+            return oldest + int(np.searchsorted(older, timestamp))
@@ -1,43 +1,83 @@
-import threading
-from typing import Callable
+import time
+from typing import TYPE_CHECKING, Any
 
-from serial import Serial
+import numpy as np
 
 from logger import logger
+from serial_reader.acquisition import BoardAcquisition
+from serial_reader.telemetry import LatencyHistogram
+
+# the asyncio backend is only imported where it is used, the readers just need its type
+if TYPE_CHECKING:
+    from serial_reader.async_transport import AsyncBoardAcquisition
+    from serial_reader.process_acquisition import ProcessBoardAcquisition
 
 
 class SerialReader:
     def __init__(
         self,
-        port: str,
-        baudrate: int,
-        serial_lock: threading.Lock,
+        acquisition: "BoardAcquisition | AsyncBoardAcquisition | ProcessBoardAcquisition",
         num_sensors: int,
         name: str,
         logger: logger.Logger,
-        decode_fn: Callable[[bytes], list[float]],
-        stop_sequence: bytes,
-        expected_payload_length: int,
     ):
+        self.acquisition = acquisition
+        self.ring = acquisition.ring
         self.num_sensors = num_sensors
-        self.serial_lock = serial_lock
         self.name = name
         self.logger = logger
-        self.decode_fn = decode_fn
-        self.stop_sequence = stop_sequence
-        self.expected_payload_length = expected_payload_length
-        self.port = port
-        self.baudrate = baudrate
-
-    def read_raw(self, reset_input: bool) -> bytes:
-        """Implements the pure reading function"""
-        with self.serial_lock:
-            with Serial(self.port, self.baudrate, timeout=0.5) as ser:
-                line = b""
-                while (l := len(line)) < self.expected_payload_length:
-                    line += ser.read(self.expected_payload_length - l)
-
-            return line
+        self.port = acquisition.port
+        # how long the reader waited for samples, and how often it gave up and had to retry
+        self.wait_latency = LatencyHistogram()
+        self.wait_timeouts = 0
+
+    def mark(self) -> int:
+        """cursor to the newest sample, everything written after it counts as new"""
+        self.acquisition.check_health()
+        return self.ring.cursor()
+
+    def wait_for_samples(
+        self, cursor: int, count: int, timeout: float | None = None
+    ) -> int:
+        """block until `count` samples arrived after the cursor, returns the number that did"""
+        start = time.monotonic()
+        available = self.ring.wait_for(cursor, count, timeout=timeout)
+        self._record_wait(start, available < count)
+        self.acquisition.check_health()
+        return available
+
+    async def wait_for_samples_async(
+        self, cursor: int, count: int, timeout: float | None = None
+    ) -> int:
+        """same as wait_for_samples, but waits without blocking the event loop"""
+        start = time.monotonic()
+        available = await self.acquisition.wait_for(cursor, count, timeout=timeout)
+        self._record_wait(start, available < count)
+        self.acquisition.check_health()
+        return available
+
+    def _record_wait(self, start: float, timed_out: bool) -> None:
+        self.wait_latency.record(time.monotonic() - start)
+        if timed_out:
+            self.wait_timeouts += 1
+
+    def get_telemetry(self) -> dict[str, Any]:
+        """acquisition counters of the board, plus how this reader waited on it"""
+        return {
+            "name": self.name,
+            **self.acquisition.telemetry.snapshot(),
+            "wait_latency": self.wait_latency.snapshot(),
+            "wait_timeouts": self.wait_timeouts,
+        }
+
+    def read_window(self, cursor: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """(values, timestamps) for `count` samples after the cursor, waiting for them if needed.
+        They are a view of the ring, call ring.check_overwritten(cursor) once done with them
+        """
+        while self.wait_for_samples(cursor, count, timeout=0.5) < count:
+            pass
+
+        return self.ring.view(cursor, count)
 
     def get_pt_name(self) -> str:
         return self.name
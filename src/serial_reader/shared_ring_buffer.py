@@ -0,0 +1,129 @@
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from serial_reader.ring_buffer import RingBuffer, RingBufferOverrun
+
+# the header is a cache line of int64s: the write index (the cursor) and a sequence
+# counter that the writer makes odd while it writes, and even again once it is done
+HEADER_BYTES = 64
+WRITE_INDEX = 0
+SEQUENCE = 1
+# a sequence that stays odd for this long means the writer died in the middle of a write
+SETTLE_TIMEOUT = 0.1
+
+
+class SharedRingBuffer(RingBuffer):
+    """
+    A RingBuffer in shared memory: written by an acquisition worker process, read in place by the coordinator.
+
+    The memory holds the header, then the timestamps, then the samples. `view`
+    gives the readers NumPy arrays straight onto it, so samples are never copied
+    or pickled on the way from the worker to the UI. The writer does not take the
+    readers' lock, so the readers check the header once they are done with the
+    samples instead (`check_overwritten`), and `window` does so after every copy.
+
+    The coordinator creates the buffer, the worker attaches to it by name. Waiters
+    in the coordinator are woken by `notify`, which the acquisition calls whenever
+    the worker reports a write.
+    """
+
+    def __init__(self, capacity: int, width: int, name: str | None = None):
+        if capacity <= 0 or width <= 0:
+            raise ValueError(
+                f"Capacity and width must be positive. Got capacity: {capacity}, width: {width}"
+            )
+
+        self.capacity = capacity
+        self.width = width
+        self._owner = name is None
+        self._shm = (
+            SharedMemory(create=True, size=self.size(capacity, width))
+            if self._owner
+            else SharedMemory(name=name)
+        )
+        self.name = self._shm.name
+
+        self._header = np.ndarray((2,), dtype=np.int64, buffer=self._shm.buf)
+        self._timestamps = np.ndarray(
+            (capacity,), dtype=np.float64, buffer=self._shm.buf, offset=HEADER_BYTES
+        )
+        self._data = np.ndarray(
+            (capacity, width),
+            dtype=np.float32,
+            buffer=self._shm.buf,
+            offset=HEADER_BYTES + self._timestamps.nbytes,
+        )
+        self._condition = threading.Condition()
+        self._closed = False
+
+    @staticmethod
+    def size(capacity: int, width: int) -> int:
+        return HEADER_BYTES + capacity * 8 + capacity * width * 4
+
+    @property
+    def _total(self) -> int:
+        return int(self._header[WRITE_INDEX])
+
+    @_total.setter
+    def _total(self, value: int) -> None:
+        self._header[WRITE_INDEX] = value
+
+    def extend(self, rows: np.ndarray, timestamps: np.ndarray | float) -> None:
+        """write a (n, width) block of samples, only ever called by the one writer"""
+        self._header[SEQUENCE] += 1
+        try:
+            super().extend(rows, timestamps)
+        finally:
+            self._header[SEQUENCE] += 1
+
+    def notify(self) -> None:
+        """wake the waiters of this process, after the writer reported new samples"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def _settled_write_index(self) -> int:
+        """the write index once the write in progress (if any) has finished"""
+        deadline = time.monotonic() + SETTLE_TIMEOUT
+        while True:
+            sequence = int(self._header[SEQUENCE])
+            write_index = int(self._header[WRITE_INDEX])
+            if sequence % 2 == 0 and int(self._header[SEQUENCE]) == sequence:
+                return write_index
+
+            if time.monotonic() > deadline:
+                # whatever the writer was writing is lost
+                return write_index + self.capacity
+
+            time.sleep(0)
+
+    def check_overwritten(self, cursor: int) -> None:
+        if cursor < self._settled_write_index() - self.capacity:
+            raise RingBufferOverrun(
+                f"Samples from cursor {cursor} were overwritten, the buffer only holds the last {self.capacity}"
+            )
+
+    def window(self, cursor: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        values, timestamps = super().window(cursor, count)
+        # the writer may have lapped the samples while they were copied
+        self.check_overwritten(cursor)
+        return values, timestamps
+
+    def close(self) -> None:
+        """detach from the memory, and free it if this is the buffer that created it"""
+        if self._closed:
+            return
+
+        self._closed = True
+        # the memory cannot be unmapped while arrays still point into it
+        del self._header, self._timestamps, self._data
+        try:
+            self._shm.close()
+        except BufferError:
+            # a reader still holds a view, the memory is unmapped once it is gone
+            pass
+
+        if self._owner:
+            self._shm.unlink()
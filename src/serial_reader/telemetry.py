@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from typing import Any, Protocol
+
+import numpy as np
+
+# 2 buckets per decade from 10 µs to 10 s, plus an overflow bucket
+LATENCY_BUCKET_EDGES = np.logspace(-5, 1, 13)
+
+
+class LatencyHistogram:
+    """Fixed log spaced buckets of latencies in seconds, cheap enough to record from the hot path"""
+
+    def __init__(self):
+        self.counts = np.zeros(len(LATENCY_BUCKET_EDGES) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[np.searchsorted(LATENCY_BUCKET_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """upper edge of the bucket holding the q-th percentile (0 to 100), the max for the overflow bucket"""
+        if self.count == 0:
+            return float("nan")
+
+        bucket = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+        if bucket >= len(LATENCY_BUCKET_EDGES):
+            return self.max
+        return float(min(LATENCY_BUCKET_EDGES[bucket], self.max))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.max,
+            "p50": self.percentile(50) if self.count else None,
+            "p99": self.percentile(99) if self.count else None,
+            "buckets": {
+                f"<={edge:g}": int(count)
+                for edge, count in zip(LATENCY_BUCKET_EDGES, self.counts)
+            }
+            | {"overflow": int(self.counts[-1])},
+        }
+
+
+class ReaderCounters(Protocol):
+    """the counters kept by a FrameReader, or a copy of them received from a worker process"""
+
+    bytes_read: int
+    resync_count: int
+    discarded_bytes: int
+
+
+class AcquisitionTelemetry:
+    """
+    Counters of one board's acquisition, updated by whichever backend services the port.
+
+    Only the acquisition writes to it, the UI and the session end snapshot only read,
+    so the counters are plain attributes instead of being behind a lock.
+    """
+
+    def __init__(self, port: str, frame_reader: ReaderCounters):
+        self.port = port
+        # bytes read and resyncs are counted by the frame reader itself
+        self.frame_reader = frame_reader
+        self.frames_received = 0
+        self.rejected_frames = 0
+        # time the acquisition was blocked on the port waiting for the board to send. It is the
+        # time the readers used to wait on the port's lock, before they read from the ring instead.
+        # The async backend only reads ports that are readable, so it never waits
+        self.port_wait_seconds = 0.0
+        # time between consecutive batches of data off the port, a stalled link shows up in the tail
+        self.read_latency = LatencyHistogram()
+
+        self.started = time.monotonic()
+        self._last_batch: float | None = None
+        self._last_rate_sample = (self.started, 0)
+
+    def record_batch(self, frames: int, rejected: int, now: float) -> None:
+        self.frames_received += frames
+        self.rejected_frames += rejected
+        if self._last_batch is not None:
+            self.read_latency.record(now - self._last_batch)
+        self._last_batch = now
+
+    def record_port_wait(self, seconds: float) -> None:
+        self.port_wait_seconds += seconds
+
+    def frame_rate(self) -> float:
+        """frames/s since the previous call, so a live panel shows the current rate"""
+        now = time.monotonic()
+        last_time, last_frames = self._last_rate_sample
+        self._last_rate_sample = (now, self.frames_received)
+        elapsed = now - last_time
+        return (self.frames_received - last_frames) / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "port": self.port,
+            "uptime_seconds": elapsed,
+            "frames_received": self.frames_received,
+            "frames_per_second": self.frames_received / elapsed if elapsed > 0 else 0.0,
+            "bytes_read": self.frame_reader.bytes_read,
+            "rejected_frames": self.rejected_frames,
+            "resyncs": self.frame_reader.resync_count,
+            "discarded_bytes": self.frame_reader.discarded_bytes,
+            "port_wait_seconds": self.port_wait_seconds,
+            "read_latency": self.read_latency.snapshot(),
+        }
+
+
+def write_snapshot(filename: str, snapshots: list[dict[str, Any]]) -> None:
+    """save the telemetry of every board as json, eg. at the end of a session"""
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with open(filename, "w") as file:
+        json.dump(
+            {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "boards": snapshots},
+            file,
+            indent=2,
+        )
@@ -1,46 +1,106 @@
-import struct
-from threading import Lock
-from typing import Callable, cast
+from typing import TYPE_CHECKING, TypedDict
+
+import numpy as np
 
 from logger.logger import Logger
+from serial_reader.acquisition import BoardAcquisition
+from serial_reader.ring_buffer import RingBufferOverrun
 from serial_reader.serial_reader import SerialReader
 
+if TYPE_CHECKING:
+    from serial_reader.async_transport import AsyncBoardAcquisition
+    from serial_reader.process_acquisition import ProcessBoardAcquisition
+
+
+class LiveReadout(TypedDict):
+    raw: np.ndarray
+    calibrated: np.ndarray
+    mean: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    num_samples: int
+
 
 class TestingReader(SerialReader):
     def __init__(
         self,
-        port: str,
-        baudrate: int,
-        serial_lock: Lock,
+        acquisition: "BoardAcquisition | AsyncBoardAcquisition | ProcessBoardAcquisition",
         num_sensors: int,
         name: str,
         logger: Logger,
-        decode_fn: Callable[[bytes], list[float]],
-        stop_sequence: bytes,
-        expected_payload_length: int,
     ):
         super().__init__(
-            port=port,
-            baudrate=baudrate,
-            serial_lock=serial_lock,
+            acquisition=acquisition,
             num_sensors=num_sensors,
             name=name,
             logger=logger,
-            decode_fn=decode_fn,
-            stop_sequence=stop_sequence,
-            expected_payload_length=expected_payload_length,
         )
 
+        self.slopes: np.ndarray | None = None
+        self.intercepts: np.ndarray | None = None
+        # id is different from name because ID must not have spaces
+        self.id = "-".join(name.split(" "))
+
     def read(self) -> list[float]:
-        line = self.read_raw(reset_input=True)
+        """the first sample to arrive after the call, so the reading is never stale"""
+        cursor = self.mark()
+        values, _ = self.read_window(cursor, 1)
+
+        # these will be the raw voltages read
+        reading = values[0].astype(float).tolist()
+        self.ring.check_overwritten(cursor)
+        return reading
+
+    def load_calibration(self) -> list[tuple[float, float]]:
+        """load the latest (m, c) of every PT, raises if the board was never calibrated"""
+        coefficients = self.logger.get_latest_set_of_cals(self.num_sensors)
+        self.slopes = np.array([m for m, _ in coefficients])
+        self.intercepts = np.array([c for _, c in coefficients])
+        return coefficients
+
+    def calibrate(self, raw: np.ndarray) -> np.ndarray:
+        """raw voltages of every PT to pressures, for one sample or a (n, num_sensors) batch.
+        Broadcasting does raw @ diag(m) + c without building the diagonal"""
+        if self.slopes is None or self.intercepts is None:
+            raise Exception(f"No calibration loaded for {self.name}")
+
+        return raw * self.slopes + self.intercepts
+
+    def live_readout(self, window_seconds: float) -> LiveReadout | None:
+        """rolling stats of the calibrated pressure over the newest window_seconds of samples,
+        or of the samples the ring holds if the window holds more. None until the first sample
+        arrives, and when the acquisition overwrote the window while it was read. Never waits for the port
+        """
+        self.acquisition.check_health()
+        end = self.ring.cursor()
+        if end == 0:
+            return None
 
-        readings = None
         try:
-            readings = self.decode_fn(line)
-        except struct.error as e:
-            assert 0, f"Error: {str(e)}. Struct had length {len(line)}"
-        except UnicodeDecodeError as e:
-            assert 0, f"Unable to decode struct"
-
-        # if this passes, this will be the raw voltages read
-        return cast(list[float], readings)
+            # only the samples in the window are looked at, in place
+            _, latest = self.ring.view(end - 1, 1)
+            start = max(
+                self.ring.cursor_at(latest[0] - window_seconds),
+                end - self.ring.capacity,
+            )
+            if start >= end:
+                return None
+
+            values, _ = self.ring.view(start, end - start)
+            calibrated = self.calibrate(values.astype(np.float64))
+            self.ring.check_overwritten(start)
+        except RingBufferOverrun:
+            # lapped by the acquisition, the next refresh reads the newer samples
+            return None
+
+        return {
+            "raw": values[-1].copy(),
+            "calibrated": calibrated[-1],
+            "mean": calibrated.mean(axis=0),
+            "min": calibrated.min(axis=0),
+            "max": calibrated.max(axis=0),
+            "num_samples": len(calibrated),
+        }
+
+    def get_pt_id(self) -> str:
+        return self.id
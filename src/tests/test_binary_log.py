@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from logger.binary_log import (
+    HEADER_SIZE,
+    BinaryLogWriter,
+    read_binary_log,
+    read_header,
+    record_dtype,
+)
+
+
+def write_log(path, num_sensors: int, num_records: int) -> np.ndarray:
+    values = np.arange(num_records * num_sensors, dtype=np.float32).reshape(
+        num_records, num_sensors
+    )
+    writer = BinaryLogWriter(str(path), num_sensors, "High Voltage")
+    writer.write(500.0, values, 1000.0 + np.arange(num_records))
+    writer.close()
+    return values
+
+
+def test_records_round_trip(tmp_path):
+    path = tmp_path / "raw.bin"
+    values = write_log(path, num_sensors=8, num_records=5)
+
+    header, records = read_binary_log(str(path))
+    assert header["num_sensors"] == 8
+    assert header["board_name"] == "High Voltage"
+    assert np.array_equal(records["values"], values)
+    assert np.all(records["pressure"] == 500.0)
+
+
+def test_appends_to_an_existing_log(tmp_path):
+    path = tmp_path / "raw.bin"
+    write_log(path, num_sensors=4, num_records=3)
+    write_log(path, num_sensors=4, num_records=2)
+
+    _, records = read_binary_log(str(path))
+    assert records.shape == (5,)
+
+
+def test_drops_a_partial_record(tmp_path):
+    path = tmp_path / "raw.bin"
+    write_log(path, num_sensors=4, num_records=3)
+    with open(path, "ab") as file:
+        file.write(b"\0" * 5)
+
+    BinaryLogWriter(str(path), 4, "High Voltage").close()
+    assert path.stat().st_size == HEADER_SIZE + 3 * record_dtype(4).itemsize
+
+
+def test_rejects_records_of_another_layout(tmp_path):
+    path = tmp_path / "raw.bin"
+    write_log(path, num_sensors=8, num_records=1)
+
+    with pytest.raises(ValueError, match="8 <f4 values per record"):
+        BinaryLogWriter(str(path), 4, "High Voltage")
+
+
+def test_replaces_a_header_only_log_of_another_layout(tmp_path):
+    path = tmp_path / "raw.bin"
+    write_log(path, num_sensors=8, num_records=0)
+
+    write_log(path, num_sensors=4, num_records=2)
+    header, records = read_binary_log(str(path))
+    assert header["num_sensors"] == 4
+    assert records.shape == (2,)
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [(b"ACRAWLOG", "too short"), (b"NOTALOG!".ljust(HEADER_SIZE, b"\0"), "bad magic")],
+)
+def test_rejects_invalid_headers(tmp_path, content, message):
+    path = tmp_path / "raw.bin"
+    path.write_bytes(content)
+
+    with pytest.raises(ValueError, match=message):
+        read_header(str(path))
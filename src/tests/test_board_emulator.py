@@ -0,0 +1,22 @@
+import numpy as np
+
+from emulator.board_emulator import BoardEmulator, connected_transfer, linear_transfer
+from serial_reader import protocol
+
+
+def test_frames_of_a_board_with_fewer_pts_decode():
+    transfer_fn = linear_transfer(np.full(3, 100.0), -100.0 * np.arange(3))
+    emulator = BoardEmulator(
+        num_sensors=protocol.NUM_VALUES_PER_FRAME,
+        transfer_fn=connected_transfer(transfer_fn, protocol.NUM_VALUES_PER_FRAME),
+        seed=0,
+    )
+    emulator.set_pressure(300.0)
+
+    frames = emulator.generate(4)
+    assert len(frames) == 4 * protocol.EXPECTED_PAYLOAD_LENGTH
+
+    values, valid = protocol.decode_batch_fn(frames)
+    assert valid.all()
+    assert np.allclose(values[:, :3], [3.0, 4.0, 5.0])
+    assert np.all(values[:, 3:] == 0)
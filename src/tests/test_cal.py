@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from cal.cal import calculate_linear_regressions
+from logger.calibration_store import CalibrationStore
+
+
+def test_fits_every_sensor():
+    pressures = np.array([0.0, 100.0, 200.0, 300.0])
+    readings = np.column_stack([pressures / 100 + 0.5, pressures / 50 - 1.0])
+
+    regressions = calculate_linear_regressions(readings, pressures)
+    assert np.allclose(regressions["slopes"], [100.0, 50.0])
+    assert np.allclose(regressions["intercepts"], [-50.0, 50.0])
+
+
+def test_rejects_a_sensor_that_reads_a_constant():
+    pressures = np.array([0.0, 100.0, 200.0])
+    readings = np.array([[0.5, 1.2], [1.5, 1.2], [2.5, 1.2]])
+
+    with pytest.raises(ValueError, match=r"Sensors \[1\] read the same value"):
+        calculate_linear_regressions(readings, pressures)
+
+
+def test_only_the_kept_points_are_checked():
+    pressures = np.array([0.0, 100.0, 200.0])
+    readings = np.array([[0.5, 1.0], [1.5, 1.0], [2.5, 3.0]])
+    mask = np.array([[True, True], [True, True], [True, False]])
+
+    with pytest.raises(ValueError, match=r"Sensors \[1\]"):
+        calculate_linear_regressions(readings, pressures, mask)
+
+
+def test_store_rejects_non_finite_coefficients(tmp_path):
+    store = CalibrationStore(str(tmp_path / "cals.sqlite3"))
+    with pytest.raises(ValueError, match=r"sensors \[1\] of High Voltage"):
+        store.store("High Voltage", [(1.0, 0.0), (float("nan"), 0.0)])
+
+    assert store.latest("High Voltage") is None
+    store.close()
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from serial_reader.frame_reader import FrameReader
+
+STOP = b"\r\n"
+
+
+def frame(index: int) -> bytes:
+    return bytes([index]) * 6 + STOP
+
+
+def test_splits_the_stream_into_frames():
+    reader = FrameReader(frame_length=8, stop_sequence=STOP)
+    reader.fill(io.BytesIO(frame(1) + frame(2) + frame(3)))
+
+    assert [bytes(f) for f in reader.frames()] == [frame(1), frame(2), frame(3)]
+    assert reader.resync_count == 0
+    assert reader.discarded_bytes == 0
+
+
+def test_partial_frame_at_the_start_is_dropped():
+    reader = FrameReader(frame_length=8, stop_sequence=STOP)
+    reader.fill(io.BytesIO(frame(1)[3:] + frame(2) + frame(3)))
+
+    assert [bytes(f) for f in reader.frames()] == [frame(2), frame(3)]
+    assert reader.discarded_bytes == 5
+
+
+def test_resyncs_after_a_corrupted_frame():
+    reader = FrameReader(frame_length=8, stop_sequence=STOP)
+    corrupted = frame(2)[:-1] + b"x"
+    reader.fill(io.BytesIO(frame(1) + corrupted + frame(3) + frame(4)))
+
+    assert [bytes(f) for f in reader.frames()] == [frame(1), frame(3), frame(4)]
+    assert reader.resync_count == 1
+
+
+def test_next_frames_stops_at_the_first_misaligned_frame():
+    reader = FrameReader(frame_length=8, stop_sequence=STOP)
+    reader.fill(io.BytesIO(frame(1) + frame(2) + b"xx" + frame(3)))
+
+    assert bytes(reader.next_frames()) == frame(1) + frame(2)
+    assert bytes(reader.next_frames()) == frame(3)
+    assert reader.next_frames() is None
+
+
+def test_frame_split_across_reads():
+    stream = frame(1) + frame(2)
+    reader = FrameReader(frame_length=8, stop_sequence=STOP)
+
+    reader.fill(io.BytesIO(stream[:11]))
+    assert [bytes(f) for f in reader.frames()] == [frame(1)]
+
+    reader.fill(io.BytesIO(stream[11:]))
+    assert [bytes(f) for f in reader.frames()] == [frame(2)]
+
+
+def test_frame_must_be_longer_than_the_stop_sequence():
+    with pytest.raises(ValueError):
+        FrameReader(frame_length=2, stop_sequence=STOP)
@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+import pytest
+
+from logger.binary_log import read_binary_log, read_header
+from logger.calibration_store import CalibrationStore
+from logger.log_rotation import LogRotator, RotatingLogFile, RotationPolicy, segments
+from logger.log_writer import LogWriter
+from logger.logger import Logger
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CalibrationStore(str(tmp_path / "cals.sqlite3"))
+    yield store
+    store.close()
+
+
+def run_session(
+    tmp_path, store, policy: RotationPolicy, num_sensors: int, records: int
+):
+    """open the logs like a session with `num_sensors` PTs, and log `records` raw readings"""
+    writer = LogWriter()
+    rotator = LogRotator(policy)
+    logger = Logger(
+        str(tmp_path / "raw_readings.bin"),
+        str(tmp_path / "avg_readings.csv"),
+        store,
+        num_sensors,
+        "High Voltage",
+        writer,
+        rotator,
+    )
+    if records:
+        logger.log_raw_data(
+            500.0, np.ones((records, num_sensors)), np.arange(records, dtype=float)
+        )
+    logger.close()
+    writer.close()
+    rotator.close(timeout=5)
+
+
+@pytest.mark.parametrize("rotate_on_start", [True, False])
+def test_header_only_log_of_another_layout_is_replaced(
+    tmp_path, store, rotate_on_start
+):
+    policy = RotationPolicy(rotate_on_start=rotate_on_start, compression=None)
+    raw = str(tmp_path / "raw_readings.bin")
+
+    run_session(tmp_path, store, policy, num_sensors=8, records=0)
+    run_session(tmp_path, store, policy, num_sensors=4, records=3)
+
+    header, records = read_binary_log(raw)
+    assert header["num_sensors"] == 4
+    assert records.shape == (3,)
+    assert segments(raw) == []
+
+
+@pytest.mark.parametrize("rotate_on_start", [True, False])
+def test_log_of_another_layout_is_moved_to_a_segment(tmp_path, store, rotate_on_start):
+    policy = RotationPolicy(rotate_on_start=rotate_on_start, compression=None)
+    raw = str(tmp_path / "raw_readings.bin")
+
+    run_session(tmp_path, store, policy, num_sensors=8, records=2)
+    run_session(tmp_path, store, policy, num_sensors=4, records=3)
+
+    assert read_header(raw)["num_sensors"] == 4
+    [segment] = segments(raw)
+    header, records = read_binary_log(segment)
+    assert header["num_sensors"] == 8
+    assert records.shape == (2,)
+
+
+def test_log_of_the_same_layout_is_appended_to_without_rotate_on_start(tmp_path, store):
+    policy = RotationPolicy(rotate_on_start=False, compression=None)
+    raw = str(tmp_path / "raw_readings.bin")
+
+    run_session(tmp_path, store, policy, num_sensors=4, records=2)
+    run_session(tmp_path, store, policy, num_sensors=4, records=3)
+
+    assert read_binary_log(raw)[1].shape == (5,)
+    assert segments(raw) == []
+
+
+def test_rotates_before_a_segment_grows_past_max_bytes(tmp_path):
+    path = str(tmp_path / "avg_readings.csv")
+    rotator = LogRotator(RotationPolicy(max_bytes=100, compression=None))
+    log = RotatingLogFile(path, lambda: open(path, "a"), rotator)
+    for _ in range(10):
+        log.write("x" * 29 + "\n")
+    log.close()
+    rotator.close(timeout=5)
+
+    closed = segments(path)
+    assert len(closed) == 3
+    assert all(os.path.getsize(segment) <= 100 for segment in closed)
+    assert sum(os.path.getsize(file) for file in [*closed, path]) == 300
+    assert rotator.stats()["rotations"] == 3
+
+
+def test_segments_are_ordered_oldest_first(tmp_path):
+    path = str(tmp_path / "raw_readings.bin")
+    names = [
+        "raw_readings.20261018-093000.bin.xz",
+        "raw_readings.20261018-093000-1.bin",
+        "raw_readings.20261018-093000-10.bin",
+        "raw_readings.20261018-093000-2.bin.gz",
+        "raw_readings.20261019-080000.bin",
+        "avg_readings.20261018-093000.csv",
+    ]
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+
+    assert [os.path.basename(segment) for segment in segments(path)] == [
+        names[0],
+        names[1],
+        names[3],
+        names[2],
+        names[4],
+    ]
+
+
+@pytest.mark.parametrize(
+    "policy, kept",
+    [
+        (RotationPolicy(compression=None, keep_segments=2), [2, 3]),
+        (RotationPolicy(compression=None, max_total_bytes=250), [2, 3]),
+        (RotationPolicy(compression=None, max_age_days=1), [1, 2, 3]),
+    ],
+)
+def test_prunes_the_oldest_segments(tmp_path, policy, kept):
+    path = str(tmp_path / "raw_readings.bin")
+    closed = []
+    for day in range(4):
+        segment = tmp_path / f"raw_readings.2026101{day}-090000.bin"
+        segment.write_bytes(b"\0" * 100)
+        closed.append(str(segment))
+    # the oldest segment is two days old
+    old = os.path.getmtime(closed[0]) - 2 * 24 * 60 * 60
+    os.utime(closed[0], (old, old))
+
+    rotator = LogRotator(policy)
+    rotator.segment_closed(path, closed[-1])
+    rotator.close(timeout=5)
+
+    assert segments(path) == [closed[index] for index in kept]
+    assert rotator.stats()["removed_segments"] == 4 - len(kept)
@@ -0,0 +1,28 @@
+import numpy as np
+
+from replay import PressureGroups
+
+
+def test_groups_chunks_by_pressure():
+    rng = np.random.default_rng(0)
+    pressures = np.repeat([0.0, 100.0, 200.0], 1000)
+    rng.shuffle(pressures)
+    # a large offset and a tiny spread, like the raw readings of a PT
+    values = 1000.0 + pressures[:, None] / 100 + rng.normal(0, 1e-5, (3000, 2))
+    timestamps = np.arange(3000, dtype=np.float64)
+
+    groups = PressureGroups(num_sensors=2)
+    for start in range(0, 3000, 700):
+        chunk = slice(start, start + 700)
+        groups.add(timestamps[chunk], pressures[chunk], values[chunk])
+
+    assert groups.pressures.tolist() == [0.0, 100.0, 200.0]
+    assert groups.counts.tolist() == [1000, 1000, 1000]
+    for i, pressure in enumerate(groups.pressures):
+        group = values[pressures == pressure]
+        assert np.allclose(groups.averages()[i], group.mean(axis=0), rtol=1e-12, atol=0)
+        assert np.allclose(
+            groups.standard_deviations()[i], group.std(axis=0), rtol=1e-6
+        )
+        assert groups.first_timestamps[i] == timestamps[pressures == pressure][0]
+        assert groups.last_timestamps[i] == timestamps[pressures == pressure][-1]
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from serial_reader.ring_buffer import RingBuffer, RingBufferOverrun
+from serial_reader.shared_ring_buffer import SEQUENCE, SharedRingBuffer
+
+
+def rows(start: int, count: int, width: int = 2) -> np.ndarray:
+    return np.repeat(np.arange(start, start + count, dtype=np.float32), width).reshape(
+        count, width
+    )
+
+
+@pytest.fixture(params=["local", "shared"])
+def ring(request):
+    if request.param == "local":
+        yield RingBuffer(capacity=8, width=2)
+    else:
+        ring = SharedRingBuffer(capacity=8, width=2)
+        yield ring
+        ring.close()
+
+
+def test_window_wraps_around_the_end(ring):
+    ring.extend(rows(0, 6), 1.0)
+    ring.extend(rows(6, 5), 2.0)
+
+    values, timestamps = ring.window(5, 5)
+    assert values[:, 0].tolist() == [5, 6, 7, 8, 9]
+    assert timestamps.tolist() == [1.0, 2.0, 2.0, 2.0, 2.0]
+
+
+def test_view_does_not_copy_unless_it_wraps(ring):
+    ring.extend(rows(0, 6), 1.0)
+
+    values, _ = ring.view(1, 4)
+    assert np.shares_memory(values, ring._data)
+
+    ring.extend(rows(6, 4), 2.0)
+    values, _ = ring.view(6, 4)
+    assert values[:, 0].tolist() == [6, 7, 8, 9]
+    assert not np.shares_memory(values, ring._data)
+
+
+def test_block_larger_than_the_capacity_keeps_the_newest(ring):
+    ring.extend(rows(0, 20), 1.0)
+
+    assert ring.cursor() == 20
+    assert ring.window(12, 8)[0][:, 0].tolist() == list(range(12, 20))
+
+
+def test_overwritten_samples_are_detected(ring):
+    ring.extend(rows(0, 4), 1.0)
+    ring.view(0, 4)
+    ring.check_overwritten(0)
+
+    # the writer laps the view
+    ring.extend(rows(4, 6), 2.0)
+    with pytest.raises(RingBufferOverrun):
+        ring.check_overwritten(0)
+    with pytest.raises(RingBufferOverrun):
+        ring.window(1, 4)
+    ring.check_overwritten(2)
+
+
+def test_window_past_the_cursor_is_rejected(ring):
+    ring.extend(rows(0, 3), 1.0)
+
+    with pytest.raises(ValueError):
+        ring.window(1, 3)
+
+
+def test_cursor_at_finds_the_first_sample_at_or_after_a_time(ring):
+    ring.extend(rows(0, 6), np.arange(6, dtype=np.float64))
+    ring.extend(rows(6, 6), np.arange(6, 12, dtype=np.float64))
+
+    assert ring.cursor_at(7.5) == 8
+    # samples older than the buffer are gone, the oldest held is returned
+    assert ring.cursor_at(0.0) == 4
+
+
+def test_wait_for_times_out_with_what_is_available(ring):
+    ring.extend(rows(0, 2), 1.0)
+
+    assert ring.wait_for(0, 5, timeout=0.01) == 2
+
+
+def test_shared_ring_is_read_in_place_by_another_attachment():
+    writer = SharedRingBuffer(capacity=8, width=2)
+    reader = SharedRingBuffer(capacity=8, width=2, name=writer.name)
+    try:
+        writer.extend(rows(0, 3), 1.0)
+
+        assert reader.cursor() == 3
+        assert reader.window(0, 3)[0][:, 0].tolist() == [0, 1, 2]
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_write_in_progress_counts_as_overwriting_the_oldest_samples(monkeypatch):
+    monkeypatch.setattr("serial_reader.shared_ring_buffer.SETTLE_TIMEOUT", 0.01)
+    ring = SharedRingBuffer(capacity=8, width=2)
+    try:
+        ring.extend(rows(0, 8), 1.0)
+        ring.check_overwritten(0)
+
+        # a writer that died in the middle of a write leaves the sequence odd
+        ring._header[SEQUENCE] += 1
+        with pytest.raises(RingBufferOverrun):
+            ring.check_overwritten(0)
+    finally:
+        ring.close()
@@ -0,0 +1,28 @@
+import pytest
+
+from config.stand_profiles import validate_profile
+
+
+def profile(**board) -> dict:
+    return {
+        "baud_rate": 115200,
+        "num_readings_per_pt": 100,
+        "boards": [{"name": "High Voltage", "pt_count": 8, **board}],
+    }
+
+
+def test_accepts_a_valid_profile():
+    assert validate_profile(profile(), "stands.json")["boards"][0]["pt_count"] == 8
+
+
+@pytest.mark.parametrize("pt_count", [0, 9, -1])
+def test_rejects_pt_counts_a_frame_does_not_hold(pt_count):
+    with pytest.raises(ValueError, match=f"has {pt_count} PTs"):
+        validate_profile(profile(pt_count=pt_count), "stands.json")
+
+
+def test_rejects_duplicate_board_names():
+    stand = profile()
+    stand["boards"].append({"name": "High Voltage", "pt_count": 4})
+    with pytest.raises(ValueError, match="unique"):
+        validate_profile(stand, "stands.json")
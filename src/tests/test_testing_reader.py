@@ -0,0 +1,66 @@
+import numpy as np
+
+from serial_reader import testing_reader
+from serial_reader.ring_buffer import RingBuffer
+
+
+class FakeAcquisition:
+    port = "/dev/ttyUSB0"
+
+    def __init__(self, ring: RingBuffer):
+        self.ring = ring
+
+    def check_health(self) -> None:
+        pass
+
+
+class LappingRing(RingBuffer):
+    """a ring whose writer laps the window while it is being read"""
+
+    def view(self, cursor: int, count: int) -> tuple[np.ndarray, np.ndarray]:
+        values, timestamps = super().view(cursor, count)
+        if count > 1:
+            self.extend(np.zeros((self.capacity, self.width), dtype=np.float32), 100.0)
+        return values, timestamps
+
+
+def reader(ring: RingBuffer) -> testing_reader.TestingReader:
+    reader = testing_reader.TestingReader(
+        FakeAcquisition(ring), ring.width, "High Voltage", None
+    )
+    reader.slopes = np.full(ring.width, 100.0)
+    reader.intercepts = np.zeros(ring.width)
+    return reader
+
+
+def test_stats_of_the_window():
+    ring = RingBuffer(capacity=16, width=2)
+    ring.extend(np.ones((4, 2), dtype=np.float32), 1.0)
+    ring.extend(np.full((4, 2), 3.0, dtype=np.float32), 2.0)
+
+    readout = reader(ring).live_readout(window_seconds=5.0)
+    assert readout["num_samples"] == 8
+    assert np.allclose(readout["mean"], 200.0)
+    assert np.allclose(readout["min"], 100.0)
+    assert np.allclose(readout["max"], 300.0)
+
+    readout = reader(ring).live_readout(window_seconds=0.5)
+    assert readout["num_samples"] == 4
+
+
+def test_window_is_clamped_to_the_ring():
+    ring = RingBuffer(capacity=8, width=2)
+    ring.extend(np.ones((20, 2), dtype=np.float32), 1.0)
+
+    assert reader(ring).live_readout(window_seconds=5.0)["num_samples"] == 8
+
+
+def test_a_lapped_window_is_skipped():
+    ring = LappingRing(capacity=8, width=2)
+    ring.extend(np.ones((6, 2), dtype=np.float32), 1.0)
+
+    assert reader(ring).live_readout(window_seconds=5.0) is None
+
+
+def test_nothing_to_show_before_the_first_sample():
+    assert reader(RingBuffer(capacity=8, width=2)).live_readout(1.0) is None